@@ -0,0 +1,26 @@
+# admin.py
+# Rutas de administración protegidas con un token compartido (ADMIN_TOKEN),
+# enviado en la cabecera X-Admin-Token. Sin token configurado no existen.
+import hmac
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+CABECERA = "X-Admin-Token"
+
+
+def token_valido():
+    esperado = current_app.config.get("ADMIN_TOKEN")
+    recibido = request.headers.get(CABECERA, "")
+    return bool(esperado) and hmac.compare_digest(recibido.encode(), esperado.encode())
+
+
+def requiere_admin(vista):
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        if not current_app.config.get("ADMIN_TOKEN"):
+            return jsonify(error="Administración deshabilitada (configure ADMIN_TOKEN)"), 404
+        if not token_valido():
+            return jsonify(error="Token de administración inválido"), 403
+        return vista(*args, **kwargs)
+    return envoltura
@@ -1,1129 +1,426 @@
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_from_directory
 from flask_migrate import Migrate
-from db import db
+from db import db, configurar_lectura, iniciar_lectura
 from models import *
+import cambios  # registra los eventos que alimentan /api/changes
+from estadisticas import estadisticas_pedidos
+import resumenes
+import contadores  # mantiene num_canciones y duracion_total de los álbumes
+import recomendaciones
+import biblioteca
+import esquemas
+import recursos
+import respaldos
+import archivo
+import mantenimiento
+import perfilado
+import compresion
+import limites
+import idempotencia
+from admin import requiere_admin
 from datetime import datetime
 from datetime import datetime
+from sqlalchemy.orm import selectinload
+
+
+def _valores_columnas(modelo, datos, parcial=False):
+    # Valida y convierte los campos de un registro con el esquema del modelo
+    filas, errores = esquemas.validar(modelo, [datos], parcial=parcial, estricto=True)
+    if errores:
+        raise ValueError("; ".join(esquemas.describir(e) for e in errores))
+    return filas[0]
+
+
+def _resolver_refs(valor, creados):
+    # {"$ref": "nombre"} -> clave primaria del registro creado antes con ese "ref"
+    if isinstance(valor, dict):
+        if set(valor) == {"$ref"}:
+            if valor["$ref"] not in creados:
+                raise ValueError(f"Referencia desconocida '{valor['$ref']}'")
+            return creados[valor["$ref"]]
+        return {k: _resolver_refs(v, creados) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_resolver_refs(v, creados) for v in valor]
+    return valor
+
+
+def _ejecutar_operacion(operacion, creados):
+    # Ejecuta una operación del lote dentro de la transacción actual (sin commit)
+    if not isinstance(operacion, dict):
+        raise ValueError("Cada operación debe ser un objeto JSON")
+
+    tipo = operacion.get("op")
+    nombre = operacion.get("recurso")
+    modelo = recursos.MODELOS.get(nombre)
+    if modelo is None:
+        raise ValueError(f"Recurso desconocido '{nombre}'")
+
+    if tipo == "crear":
+        obj = modelo(**_valores_columnas(modelo, _resolver_refs(operacion.get("datos") or {}, creados)))
+        db.session.add(obj)
+        db.session.flush()  # asigna la clave primaria para las referencias siguientes
+        if operacion.get("ref"):
+            pk = modelo.__mapper__.primary_key_from_instance(obj)
+            creados[operacion["ref"]] = pk[0] if len(pk) == 1 else list(pk)
+        return {"op": tipo, "recurso": nombre, "status": 201, "datos": obj.to_dict()}
+
+    if tipo not in ("actualizar", "eliminar"):
+        raise ValueError(f"Operación desconocida '{tipo}' (use 'crear', 'actualizar' o 'eliminar')")
+
+    pk = _resolver_refs(operacion.get("id"), creados)
+    try:
+        pk = recursos.convertir_ids(modelo, [pk])[0]
+    except (TypeError, ValueError):
+        raise ValueError(f"Id inválido para {nombre}: {pk}")
+    obj = db.session.get(modelo, pk)
+    if obj is None:
+        raise ValueError(f"No existe {nombre} con id {pk}")
+    if "version" in operacion and getattr(obj, "version", None) != operacion["version"]:
+        raise ValueError(f"{nombre} {pk} está en la versión {obj.version}, no en la {operacion['version']}")
+
+    if tipo == "actualizar":
+        for campo, valor in _valores_columnas(modelo, _resolver_refs(operacion.get("datos") or {}, creados), parcial=True).items():
+            setattr(obj, campo, valor)
+        db.session.flush()
+        return {"op": tipo, "recurso": nombre, "status": 200, "datos": obj.to_dict()}
+
+    db.session.delete(obj)
+    db.session.flush()
+    return {"op": tipo, "recurso": nombre, "status": 200, "datos": {"ok": True}}
+
+
+def _tracklists(album, asociacion, ids):
+    # Una sola consulta: álbum -> asociación -> canción, con la duración total
+    # del álbum calculada en SQL como función de ventana
+    pk_album = album.__mapper__.primary_key[0]
+    total = db.func.sum(segundos_sql(Cancion.duracion)).over(partition_by=pk_album)
+    filas = (
+        db.session.query(pk_album, Cancion, total)
+        .outerjoin(asociacion, getattr(asociacion, pk_album.key) == pk_album)
+        .outerjoin(Cancion, Cancion.id_cancion == asociacion.id_cancion)
+        .filter(pk_album.in_(ids))
+        .order_by(pk_album, Cancion.id_cancion)
+        .all()
+    )
+
+    resultado = {}
+    for id_album, cancion, segundos in filas:
+        r = resultado.setdefault(id_album, {
+            pk_album.key: id_album,
+            "canciones": [],
+            "num_canciones": 0,
+            "duracion_total": formato_duracion(segundos),
+        })
+        if cancion is not None:
+            r["canciones"].append(cancion.to_dict())
+            r["num_canciones"] += 1
+    return resultado
+
 
 def create_app():
     app = Flask(__name__)
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///app.db"
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
+    app.config["MAX_IDS_LOTE"] = 5000  # máximo de ids aceptados en una consulta por lote
+    app.config["BATCH_MAX_OPERACIONES"] = 1000  # máximo de operaciones en /api/batch
+    app.config["MAX_CAMBIOS"] = 5000  # máximo de cambios devueltos por /api/changes
+    # Réplica para las peticiones GET, p. ej. "sqlite:///app-lectura.db" (None: todo a app.db)
+    app.config["LECTURA_DATABASE_URI"] = None
+    app.config["ADMIN_TOKEN"] = None  # token de las rutas /api/admin (None: deshabilitadas)
+    app.config.from_prefixed_env()  # FLASK_<CLAVE> en el entorno sobrescribe la configuración
+
+    configurar_lectura(app)
     db.init_app(app)
+    iniciar_lectura(app)  # réplica en solo consulta y "flask replica refrescar"
     Migrate(app, db)  # habilita migraciones (Alembic)
+    resumenes.init_app(app)  # comandos "flask resumenes reconstruir/verificar"
+    recomendaciones.init_app(app)  # índice de canciones similares
+    biblioteca.init_app(app)  # caché por usuario de /api/usuarios/<id>/biblioteca
+    recursos.init_app(app)  # rutas CRUD de todos los recursos (recursos.RECURSOS)
+    respaldos.init_app(app)  # "flask respaldos crear/listar" y respaldo periódico
+    archivo.init_app(app)  # "flask archivo mover/estado" (con ARCHIVO_DATABASE)
+    mantenimiento.init_app(app)  # "flask mantenimiento ejecutar/estado" y optimize/vacuum periódico
+    perfilado.init_app(app)  # ?__profile=1 con token de administración o PERFILADO_TASA
+    compresion.init_app(app)  # gzip/deflate/br y caché de catálogos comprimidos
+    limites.init_app(app)  # 429 por cubetas de fichas y 503 con demasiadas escrituras a la vez
+    idempotencia.init_app(app)  # Idempotency-Key en las altas y en /api/batch
+
+    def _respuesta_tracklists(album, asociacion):
+        # Variante por lote: ?ids=1,2,3 (se conserva el orden pedido)
+        try:
+            ids = recursos.leer_ids(album)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return recursos.respuesta_lote(ids, _tracklists(album, asociacion, ids), lambda r: r)
 
     # -------- Health --------
     @app.get("/api/health")
     def health():
         return {"ok": True}
 
-    # =====================================================
-    #                  USUARIOS CRUD
-    # =====================================================
-    @app.post("/api/usuarios")
-    def create_usuarios():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-
-        # Verificar si es lista o un solo objeto
-        if isinstance(data, dict):
-            data = [data]  # lo convertimos en lista para manejar ambos casos igual
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro en formato JSON"), 400
-
-        usuarios_creados = []
-
-        # Validar todos antes de insertar
-        for i, item in enumerate(data, start=1):
-            nombre = item.get("nombre")
-            contrasena = item.get("contrasena")
-
-            if not nombre or not contrasena:
-                return jsonify(
-                    error=f"El registro #{i} no tiene todos los campos requeridos ('nombre', 'contrasena')"
-                ), 400
-
-            u = Usuario(nombre=nombre, contrasena=contrasena)
-            usuarios_creados.append(u)
-
-        # Si todos son válidos, se insertan de una vez
-        try:
-            db.session.add_all(usuarios_creados)
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar en la base de datos: {str(e)}"), 500
-
-        return jsonify([u.to_dict() for u in usuarios_creados]), 201
-
-
-    @app.get("/api/usuarios")
-    def list_usuarios():
-        usuarios = Usuario.query.order_by(Usuario.id_usuario.desc()).all()
-        return jsonify([u.to_dict() for u in usuarios])
-
-    @app.get("/api/usuarios/<int:id_usuario>")
-    def get_usuario(id_usuario):
-        u = Usuario.query.get_or_404(id_usuario)
-        return jsonify(u.to_dict())
-
-    @app.patch("/api/usuarios/<int:id_usuario>")
-    def update_usuario(id_usuario):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-        u = Usuario.query.get_or_404(id_usuario)
-        data = request.get_json() or {}
-        if "nombre" in data and data["nombre"]:
-            u.nombre = data["nombre"]
-        if "contrasena" in data and data["contrasena"]:
-            u.contrasena = data["contrasena"]
-        db.session.commit()
-        return jsonify(u.to_dict())
-
-    @app.delete("/api/usuarios/<int:id_usuario>")
-    def delete_usuario(id_usuario):
-        u = Usuario.query.get_or_404(id_usuario)
-        db.session.delete(u)
-        db.session.commit()
-        return jsonify(ok=True)
-
-    # =====================================================
-    #                  TELEFONOS CRUD
-    # =====================================================
-    @app.post("/api/telefonos")
-    def create_telefonos():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro JSON"), 400
-
-        telefonos = []
-        for i, item in enumerate(data, start=1):
-            telefono = item.get("telefono")
-            id_us = item.get("id_us")
-
-            if not telefono or not id_us:
-                return jsonify(
-                    error=f"El registro #{i} no tiene los campos requeridos ('telefono', 'id_us')"
-                ), 400
-
-            telefonos.append(Telefono(telefono=telefono, id_us=id_us))
-
-        try:
-            db.session.add_all(telefonos)
-            db.session.commit()
-            return jsonify([t.to_dict() for t in telefonos]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar teléfonos: {str(e)}"), 500
-
-    @app.get("/api/telefonos")
-    def list_telefonos():
-        telefonos = Telefono.query.all()
-        return jsonify([t.to_dict() for t in telefonos])
-
-    @app.get("/api/telefonos/<string:telefono>")
-    def get_telefono(telefono):
-        t = Telefono.query.get_or_404(telefono)
-        return jsonify(t.to_dict())
-
-    @app.patch("/api/telefonos/<string:telefono>")
-    def update_telefono(telefono):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-        t = Telefono.query.get_or_404(telefono)
-        data = request.get_json() or {}
-        if "id_us" in data and data["id_us"]:
-            t.id_us = data["id_us"]
-        db.session.commit()
-        return jsonify(t.to_dict())
-
-    @app.delete("/api/telefonos/<string:telefono>")
-    def delete_telefono(telefono):
-        t = Telefono.query.get_or_404(telefono)
-        db.session.delete(t)
-        db.session.commit()
-        return jsonify(ok=True)
-
-    # =====================================================
-    #                  CORREOS CRUD
-    # =====================================================
-    @app.post("/api/correos")
-    def create_correos():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro JSON"), 400
-
-        correos = []
-        for i, item in enumerate(data, start=1):
-            correo = item.get("correo")
-            id_us = item.get("id_us")
-
-            if not correo or not id_us:
-                return jsonify(
-                    error=f"El registro #{i} no tiene los campos requeridos ('correo', 'id_us')"
-                ), 400
-
-            correos.append(Correo(correo=correo, id_us=id_us))
-
-        try:
-            db.session.add_all(correos)
-            db.session.commit()
-            return jsonify([c.to_dict() for c in correos]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar correos: {str(e)}"), 500
-
-
-    @app.get("/api/correos")
-    def list_correos():
-        correos = Correo.query.all()
-        return jsonify([c.to_dict() for c in correos])
-
-    @app.get("/api/correos/<string:correo>")
-    def get_correo(correo):
-        c = Correo.query.get_or_404(correo)
-        return jsonify(c.to_dict())
-    #comentari de prueba
-
-    @app.patch("/api/correos/<string:correo>")
-    def update_correo(correo):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-        c = Correo.query.get_or_404(correo)
-        data = request.get_json() or {}
-        if "id_us" in data and data["id_us"]:
-            c.id_us = data["id_us"]
-        db.session.commit()
-        return jsonify(c.to_dict())
-
-    @app.delete("/api/correos/<string:correo>")
-    def delete_correo(correo):
-        c = Correo.query.get_or_404(correo)
-        db.session.delete(c)
-        db.session.commit()
-        return jsonify(ok=True)
-
-    # =====================================================
-    #                  VALORACIONES CRUD
-    # =====================================================
-    @app.post("/api/valoraciones")
-    def create_valoraciones():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro JSON"), 400
-
-        valoraciones = []
-        for i, item in enumerate(data, start=1):
-            id_pedido = item.get("id_pedido")
-            id_us = item.get("id_us")
-            descripcion = item.get("descripcion")
-
-            # Validar campos obligatorios (no nulos)
-            if not id_pedido or not id_us:
-                return jsonify(
-                    error=f"El registro #{i} no tiene los campos requeridos ('id_pedido', 'id_us')"
-                ), 400
-
-            valoraciones.append(
-                Valoracion(id_pedido=id_pedido, id_us=id_us, descripcion=descripcion)
-            )
-
-        try:
-            db.session.add_all(valoraciones)
-            db.session.commit()
-            return jsonify([v.to_dict() for v in valoraciones]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar valoraciones: {str(e)}"), 500
-
-    @app.get("/api/valoraciones")
-    def list_valoraciones():
-        vals = Valoracion.query.all()
-        return jsonify([v.to_dict() for v in vals])
-
-    @app.get("/api/valoraciones/<int:id_val>")
-    def get_valoracion(id_val):
-        v = Valoracion.query.get_or_404(id_val)
-        return jsonify(v.to_dict())
-
-    @app.patch("/api/valoraciones/<int:id_val>")
-    def update_valoracion(id_val):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-        v = Valoracion.query.get_or_404(id_val)
-        data = request.get_json() or {}
-        if "descripcion" in data and data["descripcion"]:
-            v.descripcion = data["descripcion"]
-        if "id_pedido" in data and data["id_pedido"]:
-            v.id_pedido = data["id_pedido"]
-        if "id_us" in data and data["id_us"]:
-            v.id_us = data["id_us"]
-        db.session.commit()
-        return jsonify(v.to_dict())
-
-    @app.delete("/api/valoraciones/<int:id_val>")
-    def delete_valoracion(id_val):
-        v = Valoracion.query.get_or_404(id_val)
-        db.session.delete(v)
-        db.session.commit()
-        return jsonify(ok=True)
-
-
-    # =====================================================
-    #                  DiscoMp3 CRUD
-    # =====================================================
-    @app.post("/api/discomp3")
-    def create_discomp3():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro JSON"), 400
-
-        discos = []
-        for i, item in enumerate(data, start=1):
-            nombre = item.get("nombre")
-            duracion = item.get("duracion")
-            tamano = item.get("tamano")
-            precio = item.get("precio")
-            id_item = item.get("id_item")
-
-            # Validar campos obligatorios
-            if not all([nombre, duracion, tamano, precio, id_item]):
-                return jsonify(
-                    error=f"El registro #{i} no tiene todos los campos requeridos ('nombre', 'duracion', 'tamano', 'precio', 'id_item')"
-                ), 400
-
-            # 🔹 Conversión de cadena a objeto time
-            try:
-                if isinstance(duracion, str):
-                    duracion = datetime.strptime(duracion, "%H:%M:%S").time()
-            except ValueError:
-                return jsonify(error=f"Formato de duración inválido en el registro #{i}. Usa el formato HH:MM:SS"), 400
-
-            discos.append(
-                DiscoMp3(
-                    nombre=nombre,
-                    duracion=duracion,
-                    tamano=tamano,
-                    precio=precio,
-                    id_item=id_item,
-                )
-            )
-
+    # -------- Registro de cambios (sincronización incremental) --------
+    @app.get("/api/changes")
+    def list_changes():
+        since = request.args.get("since", 0, type=int)
+        limit = min(request.args.get("limit", 1000, type=int), app.config["MAX_CAMBIOS"])
+        if limit < 1:
+            return jsonify(error="'limit' debe ser mayor que 0"), 400
+
+        # Búsqueda por rango sobre la clave primaria: O(cambios), no O(tamaño de las tablas)
+        filas = Cambio.query.filter(Cambio.seq > since).order_by(Cambio.seq).limit(limit).all()
+        return jsonify(
+            cambios=[c.to_dict() for c in filas],
+            siguiente=filas[-1].seq if filas else since,
+            hay_mas=len(filas) == limit,
+        )
+
+    # -------- Estadísticas de ventas --------
+    @app.get("/api/stats/pedidos")
+    def stats_pedidos():
+        # ?group_by=month,estado&desde=2024-01-01&hasta=2024-12-31&top=5
+        group_by = [g.strip() for g in request.args.get("group_by", "day").split(",") if g.strip()]
         try:
-            db.session.add_all(discos)
-            db.session.commit()
-            return jsonify([v.to_dict() for v in discos]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar el discomp3: {str(e)}"), 500
-
-    @app.get("/api/discomp3")
-    def list_discos():
-        vals = DiscoMp3.query.all()
-        return jsonify([v.to_dict() for v in vals])    
-    
-    @app.get("/api/discomp3/<int:id_discoMp3>")
-    def get_discomp3(id_discoMp3):
-        d = DiscoMp3.query.get_or_404(id_discoMp3)
-        return jsonify(d.to_dict())
-    
-    @app.patch("/api/discomp3/<int:id_discoMp3>")
-    def update_discomp3(id_discoMp3):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-        d = DiscoMp3.query.get_or_404(id_discoMp3)
-        data = request.get_json() or {}
-        if "nombre" in data and data["nombre"]:
-            d.nombre = data["nombre"]
-        if "duracion" in data and data["duracion"]:
-            d.duracion = data["duracion"]
-        if "tamano" in data and data["tamano"]:
-            d.tamano = data["tamano"]
-        if "precio" in data and data["precio"]:
-            d.precio=data["precio"]
-        if "id_item" in data and data["id_item"]:
-            d.id_item=data["id_item"]
-        db.session.commit()
-        return jsonify(d.to_dict())
-
-    @app.delete("/api/discomp3/<int:id_discoMp3>")
-    def delete_discomp3(id_discoMp3):
-        d = DiscoMp3.query.get_or_404(id_discoMp3)
-        db.session.delete(d)
-        db.session.commit()
-        return jsonify(ok=True)
-    
-       
-# =====================================================
-#                 VINILO CRUD
-# =====================================================
-    
-
-    @app.post("/api/vinilo")
-    def create_vinilo():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro JSON"), 400
+            desde = request.args.get("desde")
+            hasta = request.args.get("hasta")
+            desde = datetime.strptime(desde, "%Y-%m-%d").date() if desde else None
+            hasta = datetime.strptime(hasta, "%Y-%m-%d").date() if hasta else None
+        except ValueError:
+            return jsonify(error="Formato de fecha inválido en 'desde'/'hasta'. Use 'YYYY-MM-DD'"), 400
 
-        vinilos = []
-        for i, item in enumerate(data, start=1):
-            nombre = item.get("nombre")
-            artista = item.get("artista")
-            anio_salida = item.get("anio_salida")
-            precio_unitario = item.get("precio_unitario")
-            id_cancion = item.get("id_cancion")
-            id_proveedor = item.get("id_proveedor")
-            id_item = item.get("id_item")
-
-            # Validar campos obligatorios
-            if not all([nombre, artista, anio_salida, precio_unitario, id_cancion, id_proveedor, id_item]):
-                return jsonify(
-                    error=f"El registro #{i} no tiene todos los campos requeridos ('nombre', 'artista', 'anio_salida', 'precio_unitario', 'id_cancion', 'id_proveedor', 'id_item')"
-                ), 400
-
-            vinilos.append(
-                Vinilo(
-                    nombre=nombre,
-                    artista=artista,
-                    anio_salida=anio_salida,
-                    precio_unitario=precio_unitario,
-                    id_cancion=id_cancion,
-                    id_proveedor=id_proveedor,
-                    id_item=id_item
-                )
-            )
+        top = request.args.get("top", type=int)
+        if top is not None and top < 1:
+            return jsonify(error="'top' debe ser mayor que 0"), 400
 
         try:
-            db.session.add_all(vinilos)
-            db.session.commit()
-            return jsonify([v.to_dict() for v in vinilos]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar el vinilo: {str(e)}"), 500
-
-
-    @app.get("/api/vinilo")
-    def list_vinilos():
-        vals = Vinilo.query.all()
-        return jsonify([v.to_dict() for v in vals])
-
-
-    @app.get("/api/vinilo/<int:id_vinilo>")
-    def get_vinilo(id_vinilo):
-        v = Vinilo.query.get_or_404(id_vinilo)
-        return jsonify(v.to_dict())
-
-
-    @app.patch("/api/vinilo/<int:id_vinilo>")
-    def update_vinilo(id_vinilo):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        v = Vinilo.query.get_or_404(id_vinilo)
-        data = request.get_json() or {}
-
-        if "nombre" in data and data["nombre"]:
-            v.nombre = data["nombre"]
-        if "artista" in data and data["artista"]:
-            v.artista = data["artista"]
-        if "anio_salida" in data and data["anio_salida"]:
-            v.anio_salida = data["anio_salida"]
-        if "precio_unitario" in data and data["precio_unitario"]:
-            v.precio_unitario = data["precio_unitario"]
-        if "id_cancion" in data and data["id_cancion"]:
-            v.id_cancion = data["id_cancion"]
-        if "id_proveedor" in data and data["id_proveedor"]:
-            v.id_proveedor = data["id_proveedor"]
-        if "id_item" in data and data["id_item"]:
-            v.id_item = data["id_item"]
-
-        db.session.commit()
-        return jsonify(v.to_dict())
-
-
-    @app.delete("/api/vinilo/<int:id_vinilo>")
-    def delete_vinilo(id_vinilo):
-        v = Vinilo.query.get_or_404(id_vinilo)
-        db.session.delete(v)
-        db.session.commit()
-        return jsonify(ok=True)
-
-    # --------------------------
-    # CRUD PEDIDO
-    # --------------------------
-    @app.post("/api/pedido")
-    def create_pedido():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro JSON"), 400
-
-        pedidos = []
-        for i, item in enumerate(data, start=1):
-            id_us = item.get("id_us")
-            fecha_pedido = item.get("fecha_pedido")
-            estado = item.get("estado")
-            medio_pago = item.get("medio_pago")
-            id_item = item.get("id_item")
-
-            # Validar campos obligatorios
-            if not all([id_us, fecha_pedido, estado, medio_pago, id_item]):
-                return jsonify(
-                    error=f"El registro #{i} no tiene todos los campos requeridos ('id_us', 'fecha_pedido', 'estado', 'medio_pago', 'id_item')"
-                ), 400
-
-            # 🔹 Convertir la fecha (string → datetime.date)
+            return jsonify(estadisticas_pedidos(group_by, desde, hasta, top))
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+
+    @app.get("/api/resumenes/<nombre>")
+    def get_resumen(nombre):
+        # Lectura de tablas de resumen: pedidos_dia, valoraciones_pedido, valoraciones_usuario.
+        # Acepta filtros por igualdad sobre las claves (?id_item=3) y desde/hasta en pedidos_dia.
+        resumen = resumenes.RESUMENES.get(nombre)
+        if resumen is None:
+            return jsonify(error=f"Resumen desconocido '{nombre}'"), 404
+
+        modelo = resumen.modelo
+        consulta = modelo.query
+        for clave in resumen.claves:
+            if clave in request.args:
+                consulta = consulta.filter(getattr(modelo, clave) == request.args[clave])
+        if hasattr(modelo, "fecha_pedido"):
             try:
-                if isinstance(fecha_pedido, str):
-                    fecha_pedido = datetime.strptime(fecha_pedido, "%Y-%m-%d").date()
+                if request.args.get("desde"):
+                    consulta = consulta.filter(modelo.fecha_pedido >= datetime.strptime(request.args["desde"], "%Y-%m-%d").date())
+                if request.args.get("hasta"):
+                    consulta = consulta.filter(modelo.fecha_pedido <= datetime.strptime(request.args["hasta"], "%Y-%m-%d").date())
             except ValueError:
-                return jsonify(error=f"Formato de fecha inválido en el registro #{i}. Use 'YYYY-MM-DD'"), 400
-
-            pedidos.append(
-                Pedido(
-                    id_us=id_us,
-                    fecha_pedido=fecha_pedido,
-                    estado=estado,
-                    medio_pago=medio_pago,
-                    id_item=id_item
-                )
-            )
-
-        try:
-            db.session.add_all(pedidos)
-            db.session.commit()
-            return jsonify([p.to_dict() for p in pedidos]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar el pedido: {str(e)}"), 500
-
-    @app.get("/api/pedido")
-    def list_pedidos():
-        vals = Pedido.query.all()
-        return jsonify([p.to_dict() for p in vals])
-
-
-    @app.get("/api/pedido/<int:id_pedido>")
-    def get_pedido(id_pedido):
-        p = Pedido.query.get_or_404(id_pedido)
-        return jsonify(p.to_dict())
-
-
-    @app.patch("/api/pedido/<int:id_pedido>")
-    def update_pedido(id_pedido):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        p = Pedido.query.get_or_404(id_pedido)
-        data = request.get_json() or {}
-
-        if "id_us" in data and data["id_us"]:
-            p.id_us = data["id_us"]
-        if "fecha_pedido" in data and data["fecha_pedido"]:
-            p.fecha_pedido = data["fecha_pedido"]
-        if "estado" in data and data["estado"]:
-            p.estado = data["estado"]
-        if "medio_pago" in data and data["medio_pago"]:
-            p.medio_pago = data["medio_pago"]
-        if "id_item" in data and data["id_item"]:
-            p.id_item = data["id_item"]
-
-        db.session.commit()
-        return jsonify(p.to_dict())
-
-
-    @app.delete("/api/pedido/<int:id_pedido>")
-    def delete_pedido(id_pedido):
-        p = Pedido.query.get_or_404(id_pedido)
-        db.session.delete(p)
-        db.session.commit()
-        return jsonify(ok=True)
-    
-    # =====================================================
-    #              DISCO MP3 - CANCIÓN CRUD
-    # =====================================================
-    @app.post("/api/discomp3cancion")
-    def create_discomp3cancion():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        relaciones = []
-        for i, item in enumerate(data, start=1):
-            id_discoMp3 = item.get("id_discoMp3")
-            id_cancion = item.get("id_cancion")
-
-            if not id_discoMp3 or not id_cancion:
-                return jsonify(error=f"El registro #{i} no tiene los campos requeridos ('id_discoMp3', 'id_cancion')"), 400
-
-            relaciones.append(DiscoMp3Cancion(id_discoMp3=id_discoMp3, id_cancion=id_cancion))
-
-        try:
-            db.session.add_all(relaciones)
-            db.session.commit()
-            return jsonify([{"id_discoMp3": r.id_discoMp3, "id_cancion": r.id_cancion} for r in relaciones]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar DiscoMp3-Canción: {str(e)}"), 500
-
-    @app.get("/api/discomp3cancion")
-    def list_discomp3cancion():
-        relaciones = DiscoMp3Cancion.query.all()
-        return jsonify([{"id_discoMp3": r.id_discoMp3, "id_cancion": r.id_cancion} for r in relaciones])
-
-    @app.delete("/api/discomp3cancion/<int:id_discoMp3>/<int:id_cancion>")
-    def delete_discomp3cancion(id_discoMp3, id_cancion):
-        r = DiscoMp3Cancion.query.get_or_404((id_discoMp3, id_cancion))
-        db.session.delete(r)
-        db.session.commit()
-        return jsonify(ok=True)
-
-
-    # =====================================================
-    #                     ITEMS CRUD
-    # =====================================================
-    @app.post("/api/items")
-    def create_items():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        items = []
-        for i, item in enumerate(data, start=1):
-            tipo_item = item.get("tipo_item")
-            cantidad = item.get("cantidad")
-
-            if not tipo_item or cantidad is None:
-                return jsonify(error=f"El registro #{i} no tiene los campos requeridos ('tipo_item', 'cantidad')"), 400
-
-            items.append(Item(tipo_item=tipo_item, cantidad=cantidad))
-
-        try:
-            db.session.add_all(items)
-            db.session.commit()
-            return jsonify([i.to_dict() for i in items]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar items: {str(e)}"), 500
-
-    @app.get("/api/items")
-    def list_items():
-        items = Item.query.all()
-        return jsonify([i.to_dict() for i in items])
-
-    @app.get("/api/items/<int:id>")
-    def get_item(id):
-        i = Item.query.get_or_404(id)
-        return jsonify(i.to_dict())
-
-    @app.patch("/api/items/<int:id>")
-    def update_item(id):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        i = Item.query.get_or_404(id)
-        data = request.get_json() or {}
-
-        if "tipo_item" in data and data["tipo_item"]:
-            i.tipo_item = data["tipo_item"]
-        if "cantidad" in data and data["cantidad"] is not None:
-            i.cantidad = data["cantidad"]
-
-        db.session.commit()
-        return jsonify(i.to_dict())
-
-    @app.delete("/api/items/<int:id>")
-    def delete_item(id):
-        i = Item.query.get_or_404(id)
-        db.session.delete(i)
-        db.session.commit()
-        return jsonify(ok=True)
+                return jsonify(error="Formato de fecha inválido en 'desde'/'hasta'. Use 'YYYY-MM-DD'"), 400
 
+        return jsonify([r.to_dict() for r in consulta.all()])
 
     # =====================================================
-    #              RECOPILACIÓN - CANCIÓN CRUD
+    #                  OPERACIONES POR LOTE
     # =====================================================
-    @app.post("/api/recopilacioncancion")
-    def create_recopilacioncancion():
+    @app.post("/api/batch")
+    def batch():
+        # Lista ordenada de operaciones sobre cualquier recurso, en una sola transacción:
+        # [{"op": "crear", "recurso": "proveedores", "datos": {...}, "ref": "p1"},
+        #  {"op": "crear", "recurso": "correos_proveedor", "datos": {"id_proveedor": {"$ref": "p1"}, ...}}]
         if not request.is_json:
             return jsonify(error="Se requiere JSON"), 415
 
         data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
+        operaciones = data.get("operaciones") if isinstance(data, dict) else data
 
-        relaciones = []
-        for i, item in enumerate(data, start=1):
-            id_recopilacion = item.get("id_recopilacion")
-            id_cancion = item.get("id_cancion")
-
-            if not id_recopilacion or not id_cancion:
-                return jsonify(error=f"El registro #{i} no tiene los campos requeridos ('id_recopilacion', 'id_cancion')"), 400
-
-            relaciones.append(RecopilacionCancion(id_recopilacion=id_recopilacion, id_cancion=id_cancion))
-
-        try:
-            db.session.add_all(relaciones)
-            db.session.commit()
-            return jsonify([{"id_recopilacion": r.id_recopilacion, "id_cancion": r.id_cancion} for r in relaciones]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar Recopilación-Canción: {str(e)}"), 500
-
-    @app.get("/api/recopilacioncancion")
-    def list_recopilacioncancion():
-        relaciones = RecopilacionCancion.query.all()
-        return jsonify([{"id_recopilacion": r.id_recopilacion, "id_cancion": r.id_cancion} for r in relaciones])
-
-    @app.delete("/api/recopilacioncancion/<int:id_recopilacion>/<int:id_cancion>")
-    def delete_recopilacioncancion(id_recopilacion, id_cancion):
-        r = RecopilacionCancion.query.get_or_404((id_recopilacion, id_cancion))
-        db.session.delete(r)
-        db.session.commit()
-        return jsonify(ok=True)
-
-
-    # =====================================================
-    #                 VINILO - CANCIÓN CRUD
-    # =====================================================
-    @app.post("/api/vinilocancion")
-    def create_vinilocancion():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        relaciones = []
-        for i, item in enumerate(data, start=1):
-            id_vinilo = item.get("id_vinilo")
-            id_cancion = item.get("id_cancion")
-
-            if not id_vinilo or not id_cancion:
-                return jsonify(error=f"El registro #{i} no tiene los campos requeridos ('id_vinilo', 'id_cancion')"), 400
-
-            relaciones.append(ViniloCancion(id_vinilo=id_vinilo, id_cancion=id_cancion))
+        if not isinstance(operaciones, list) or len(operaciones) == 0:
+            return jsonify(error="Debe enviar al menos una operación"), 400
+        if len(operaciones) > app.config["BATCH_MAX_OPERACIONES"]:
+            return jsonify(error=f"Máximo {app.config['BATCH_MAX_OPERACIONES']} operaciones por lote"), 413
 
+        creados = {}
+        resultados = []
+        for i, operacion in enumerate(operaciones, start=1):
+            try:
+                resultados.append(_ejecutar_operacion(operacion, creados))
+            except (ValueError, TypeError) as e:
+                db.session.rollback()
+                return jsonify(error=f"Operación #{i}: {str(e)}", operacion=i, resultados=resultados), 400
+            except Exception as e:
+                db.session.rollback()
+                return jsonify(error=f"Error en la operación #{i}: {str(e)}", operacion=i, resultados=resultados), 500
+
+        # Un único commit para todo el lote
         try:
-            db.session.add_all(relaciones)
             db.session.commit()
-            return jsonify([{"id_vinilo": r.id_vinilo, "id_cancion": r.id_cancion} for r in relaciones]), 201
         except Exception as e:
             db.session.rollback()
-            return jsonify(error=f"Error al insertar Vinilo-Canción: {str(e)}"), 500
+            return jsonify(error=f"Error al confirmar el lote: {str(e)}"), 500
 
-    @app.get("/api/vinilocancion")
-    def list_vinilocancion():
-        relaciones = ViniloCancion.query.all()
-        return jsonify([{"id_vinilo": r.id_vinilo, "id_cancion": r.id_cancion} for r in relaciones])
+        return jsonify(resultados=resultados, refs=creados)
 
-    @app.delete("/api/vinilocancion/<int:id_vinilo>/<int:id_cancion>")
-    def delete_vinilocancion(id_vinilo, id_cancion):
-        r = ViniloCancion.query.get_or_404((id_vinilo, id_cancion))
-        db.session.delete(r)
-        db.session.commit()
-        return jsonify(ok=True)
     # =====================================================
-    #                  PROVEEDOR CRUD
+    #                  ADMINISTRACIÓN
     # =====================================================
-    @app.post("/api/proveedores")
-    def create_proveedores():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro JSON"), 400
-
-        proveedores = []
-        for i, item in enumerate(data, start=1):
-            nombre = item.get("nombre")
-            if not nombre:
-             return jsonify(error=f"El registro #{i} no tiene el campo requerido ('nombre')"), 400
-            proveedores.append(Proveedor(nombre=nombre))
-
+    @app.get("/api/admin/respaldos")
+    @requiere_admin
+    def list_respaldos():
+        return jsonify(respaldos=respaldos.listar(), en_curso=respaldos.en_curso(), ultimo=respaldos.ultimo or None)
+
+    @app.post("/api/admin/respaldos")
+    @requiere_admin
+    def create_respaldo():
+        # La copia se hace en segundo plano; el resultado aparece en GET /api/admin/respaldos
+        opciones = request.get_json(silent=True) or {}
         try:
-            db.session.add_all(proveedores)
-            db.session.commit()
-            return jsonify([p.to_dict() for p in proveedores]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar proveedores: {str(e)}"), 500
-
-
-    @app.get("/api/proveedores")
-    def list_proveedores():
-        proveedores = Proveedor.query.all()
-        return jsonify([p.to_dict() for p in proveedores])
-
-
-    @app.get("/api/proveedores/<int:id>")
-    def get_proveedor(id):
-        p = Proveedor.query.get_or_404(id)
-        return jsonify(p.to_dict())
-
-
-    @app.patch("/api/proveedores/<int:id>")
-    def update_proveedor(id):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-        p = Proveedor.query.get_or_404(id)
-        data = request.get_json() or {}
-        if "nombre" in data and data["nombre"]:
-            p.nombre = data["nombre"]
-        db.session.commit()
-        return jsonify(p.to_dict())
-
-
-    @app.delete("/api/proveedores/<int:id>")
-    def delete_proveedor(id):
-        p = Proveedor.query.get_or_404(id)
-        db.session.delete(p)
-        db.session.commit()
-        return jsonify(ok=True)
-    # =====================================================
-    #              CORREO - PROVEEDOR CRUD
-    # =====================================================
-    @app.post("/api/correos_proveedor")
-    def create_correos_proveedor():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        correos = []
-        for i, item in enumerate(data, start=1):
-            correo = item.get("correo")
-            id_proveedor = item.get("id_proveedor")
-            if not correo or not id_proveedor:
-                return jsonify(error=f"El registro #{i} no tiene los campos requeridos ('correo', 'id_proveedor')"), 400
-            correos.append(CorreoProveedor(correo=correo, id_proveedor=id_proveedor))
-
-        try:
-            db.session.add_all(correos)
-            db.session.commit()
-            return jsonify([c.to_dict() for c in correos]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar correos_proveedor: {str(e)}"), 500
-
-
-    @app.get("/api/correos_proveedor")
-    def list_correos_proveedor():
-        correos = CorreoProveedor.query.all()
-        return jsonify([c.to_dict() for c in correos])
-
-
-    @app.get("/api/correos_proveedor/<string:correo>")
-    def get_correo_proveedor(correo):
-        c = CorreoProveedor.query.get_or_404(correo)
-        return jsonify(c.to_dict())
-
-
-    @app.patch("/api/correos_proveedor/<string:correo>")
-    def update_correo_proveedor(correo):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-        c = CorreoProveedor.query.get_or_404(correo)
-        data = request.get_json() or {}
-        if "id_proveedor" in data and data["id_proveedor"]:
-            c.id_proveedor = data["id_proveedor"]
-        db.session.commit()
-        return jsonify(c.to_dict())
-
-
-    @app.delete("/api/correos_proveedor/<string:correo>")
-    def delete_correo_proveedor(correo):
-        c = CorreoProveedor.query.get_or_404(correo)
-        db.session.delete(c)
-        db.session.commit()
-        return jsonify(ok=True)
-    # =====================================================
-    #             TELEFONO - PROVEEDOR CRUD
-    # =====================================================
-    @app.post("/api/telefonos_proveedor")
-    def create_telefonos_proveedor():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        telefonos = []
-        for i, item in enumerate(data, start=1):
-            telefono = item.get("telefono")
-            id_proveedor = item.get("id_proveedor")
-            if not telefono or not id_proveedor:
-                return jsonify(error=f"El registro #{i} no tiene los campos requeridos ('telefono', 'id_proveedor')"), 400
-            telefonos.append(TelefonoProveedor(telefono=telefono, id_proveedor=id_proveedor))
-
+            respaldos.crear_en_segundo_plano(app, comprimir=opciones.get("comprimir"))
+        except respaldos.RespaldoEnCurso as e:
+            return jsonify(error=str(e)), 409
+        return jsonify(en_curso=True), 202
+
+    @app.get("/api/admin/mantenimiento")
+    @requiere_admin
+    def get_mantenimiento():
+        return jsonify(
+            base=mantenimiento.paginas(),
+            en_curso=mantenimiento.en_curso(),
+            ultimo=mantenimiento.ultimo or None,
+        )
+
+    @app.post("/api/admin/mantenimiento")
+    @requiere_admin
+    def create_mantenimiento():
+        # Se ejecuta en segundo plano; el resultado aparece en GET /api/admin/mantenimiento
         try:
-            db.session.add_all(telefonos)
-            db.session.commit()
-            return jsonify([t.to_dict() for t in telefonos]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar telefonos_proveedor: {str(e)}"), 500
-
-
-    @app.get("/api/telefonos_proveedor")
-    def list_telefonos_proveedor():
-        telefonos = TelefonoProveedor.query.all()
-        return jsonify([t.to_dict() for t in telefonos])
-
-
-    @app.get("/api/telefonos_proveedor/<string:telefono>")
-    def get_telefono_proveedor(telefono):
-        t = TelefonoProveedor.query.get_or_404(telefono)
-        return jsonify(t.to_dict())
-
-
-    @app.patch("/api/telefonos_proveedor/<string:telefono>")
-    def update_telefono_proveedor(telefono):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-        t = TelefonoProveedor.query.get_or_404(telefono)
-        data = request.get_json() or {}
-        if "id_proveedor" in data and data["id_proveedor"]:
-            t.id_proveedor = data["id_proveedor"]
-        db.session.commit()
-        return jsonify(t.to_dict())
+            mantenimiento.ejecutar_en_segundo_plano(app)
+        except mantenimiento.MantenimientoEnCurso as e:
+            return jsonify(error=str(e)), 409
+        return jsonify(en_curso=True), 202
+
+    @app.get("/api/admin/perfiles")
+    @requiere_admin
+    def list_perfiles():
+        # Los perfiles más lentos; ?desde=YYYY-MM-DD limita a los recientes
+        limite = request.args.get("limite", 20, type=int)
+        return jsonify(perfiles=perfilado.mas_costosos(limite, request.args.get("desde")))
+
+    @app.get("/api/admin/perfiles/<path:archivo>")
+    @requiere_admin
+    def get_perfil(archivo):
+        return send_from_directory(perfilado.directorio(), archivo, as_attachment=True)
 
-
-    @app.delete("/api/telefonos_proveedor/<string:telefono>")
-    def delete_telefono_proveedor(telefono):
-        t = TelefonoProveedor.query.get_or_404(telefono)
-        db.session.delete(t)
-        db.session.commit()
-        return jsonify(ok=True)
-    
     # =====================================================
-    #             RECOPILACION CRUD
+    #          CONSULTAS PROPIAS DE CADA RECURSO
     # =====================================================
-    @app.post("/api/recopilaciones")
-    def create_recopilaciones():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro JSON"), 400
-
-        recopilaciones = []
-        for i, item in enumerate(data, start=1):
-            nombre = item.get("nombre")
-            id_us = item.get("id_us")
-            publica = item.get("publica")
-
-            if nombre is None or id_us is None or publica is None:
-                return jsonify(error=f"Registro #{i} incompleto ('nombre', 'id_us', 'publica')"), 400
-
-            recopilaciones.append(
-                Recopilacion(nombre=nombre, id_us=id_us, publica=publica)
+    # El CRUD genérico (list/get/create/update/delete) lo registra recursos.init_app
+    @app.get("/api/usuarios/<int:id_usuario>/full")
+    def get_usuario_full(id_usuario):
+        # Carga ansiosa: 1 consulta para el usuario + 1 por cada relación (selectin),
+        # sin importar cuántos teléfonos, correos o pedidos tenga
+        u = (
+            Usuario.query
+            .options(
+                selectinload(Usuario.telefonos),
+                selectinload(Usuario.correos),
+                selectinload(Usuario.pedidos).selectinload(Pedido.valoraciones),
+                selectinload(Usuario.valoraciones),
+                selectinload(Usuario.recopilaciones),
             )
-
-        try:
-            db.session.add_all(recopilaciones)
-            db.session.commit()
-            return jsonify([r.to_dict() for r in recopilaciones]), 201
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar recopilaciones: {str(e)}"), 500
-
-
-    @app.get("/api/recopilaciones")
-    def get_recopilaciones():
-        return jsonify([r.to_dict() for r in Recopilacion.query.all()])
-
-
-    @app.get("/api/recopilaciones/<int:id>")
-    def get_recopilacion(id):
-        recopilacion = Recopilacion.query.get(id)
-        if not recopilacion:
-            return jsonify(error="Recopilación no encontrada"), 404
-        return jsonify(recopilacion.to_dict())
-
-
-    @app.put("/api/recopilaciones/<int:id>")
-    def update_recopilacion(id):
-        recopilacion = Recopilacion.query.get(id)
-        if not recopilacion:
-            return jsonify(error="Recopilación no encontrada"), 404
-
-        data = request.get_json()
-        recopilacion.nombre = data.get("nombre", recopilacion.nombre)
-        recopilacion.id_us = data.get("id_us", recopilacion.id_us)
-        recopilacion.publica = data.get("publica", recopilacion.publica)
-
-        try:
-            db.session.commit()
-            return jsonify(recopilacion.to_dict())
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al actualizar recopilación: {str(e)}"), 500
-
-
-    @app.delete("/api/recopilaciones/<int:id>")
-    def delete_recopilacion(id):
-        recopilacion = Recopilacion.query.get(id)
-        if not recopilacion:
-            return jsonify(error="Recopilación no encontrada"), 404
-
-        try:
-            db.session.delete(recopilacion)
-            db.session.commit()
-            return jsonify(message=f"Recopilación {id} eliminada"), 200
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al eliminar recopilación: {str(e)}"), 500
-        
-    # =====================================================
-    #             CANCION - CRUD
-    # =====================================================
-    @app.post("/api/canciones")
-    def create_canciones():
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        data = request.get_json()
-
-        # Aceptar un solo objeto o lista
-        if isinstance(data, dict):
-            data = [data]
-
-        if not isinstance(data, list) or len(data) == 0:
-            return jsonify(error="Debe enviar al menos un registro en formato JSON"), 400
-
-        canciones_creadas = []
-
-        for i, item in enumerate(data, start=1):
-            nombre = item.get("nombre")
-            duracion = item.get("duracion")
-            tamano = item.get("tamano")
-
-            if not nombre or not duracion or tamano is None:
-                return jsonify(
-                    error=f"El registro #{i} no tiene todos los campos requeridos ('nombre', 'duracion', 'tamano')"
-                ), 400
-
-            # 🔧 Conversión de cadena a objeto time
-            try:
-                duracion_time = datetime.strptime(duracion, "%H:%M:%S").time()
-            except ValueError:
-                return jsonify(
-                    error=f"El formato de duración en el registro #{i} debe ser HH:MM:SS (por ejemplo '00:03:45')"
-                ), 400
-
-            c = Cancion(nombre=nombre, duracion=duracion_time, tamano=tamano)
-            canciones_creadas.append(c)
-
-        try:
-            db.session.add_all(canciones_creadas)
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            return jsonify(error=f"Error al insertar en la base de datos: {str(e)}"), 500
-
-        return jsonify([c.to_dict() for c in canciones_creadas]), 201
-
-    @app.get("/api/canciones")
-    def list_canciones():
-        canciones = Cancion.query.order_by(Cancion.id_cancion.desc()).all()
-        return jsonify([c.to_dict() for c in canciones])
-
-
-    @app.get("/api/canciones/<int:id_cancion>")
-    def get_cancion(id_cancion):
-        c = Cancion.query.get_or_404(id_cancion)
-        return jsonify(c.to_dict())
-
-
-    @app.patch("/api/canciones/<int:id_cancion>")
-    def update_cancion(id_cancion):
-        if not request.is_json:
-            return jsonify(error="Se requiere JSON"), 415
-
-        c = Cancion.query.get_or_404(id_cancion)
-        data = request.get_json() or {}
-
-        if "nombre" in data and data["nombre"]:
-            c.nombre = data["nombre"]
-        if "duracion" in data and data["duracion"]:
-            c.duracion = data["duracion"]
-        if "tamano" in data and data["tamano"] is not None:
-            c.tamano = data["tamano"]
-
-        db.session.commit()
-        return jsonify(c.to_dict())
-
-
-    @app.delete("/api/canciones/<int:id_cancion>")
-    def delete_cancion(id_cancion):
-        c = Cancion.query.get_or_404(id_cancion)
-        db.session.delete(c)
-        db.session.commit()
-        return jsonify(ok=True)
+            .filter_by(id_usuario=id_usuario)
+            .first_or_404()
+        )
+
+        data = u.to_dict()
+        data["telefonos"] = [t.to_dict() for t in u.telefonos]
+        data["correos"] = [c.to_dict() for c in u.correos]
+        data["pedidos"] = [
+            {**p.to_dict(), "valoraciones": [v.to_dict() for v in p.valoraciones]}
+            for p in u.pedidos
+        ]
+        data["valoraciones"] = [v.to_dict() for v in u.valoraciones]
+        data["recopilaciones"] = [r.to_dict() for r in u.recopilaciones]
+        return jsonify(data)
+
+    @app.get("/api/usuarios/<int:id_usuario>/biblioteca")
+    def get_usuario_biblioteca(id_usuario):
+        # Canciones compradas por el usuario, paginadas por clave: ?despues=<id_cancion>&limite=50
+        despues = request.args.get("despues", type=int)
+        limite = request.args.get("limite", 50, type=int)
+        if not 1 <= limite <= 500:
+            return jsonify(error="'limite' debe estar entre 1 y 500"), 400
+
+        usar_cache = app.config["BIBLIOTECA_CACHE"]
+        if not (usar_cache and biblioteca.cache.obtener(id_usuario)):
+            Usuario.query.get_or_404(id_usuario)
+
+        canciones, siguiente = biblioteca.pagina(id_usuario, despues, limite, usar_cache)
+        return jsonify(id_usuario=id_usuario, canciones=canciones, siguiente=siguiente)
+
+    @app.get("/api/discomp3/<int:id_discoMp3>/canciones")
+    def get_discomp3_canciones(id_discoMp3):
+        r = _tracklists(DiscoMp3, DiscoMp3Cancion, [id_discoMp3]).get(id_discoMp3)
+        if r is None:
+            return jsonify(error="DiscoMp3 no encontrado"), 404
+        return jsonify(r)
+
+    @app.get("/api/discomp3/canciones")
+    def list_discomp3_canciones():
+        return _respuesta_tracklists(DiscoMp3, DiscoMp3Cancion)
+
+    @app.get("/api/vinilo/<int:id_vinilo>/canciones")
+    def get_vinilo_canciones(id_vinilo):
+        r = _tracklists(Vinilo, ViniloCancion, [id_vinilo]).get(id_vinilo)
+        if r is None:
+            return jsonify(error="Vinilo no encontrado"), 404
+        return jsonify(r)
+
+    @app.get("/api/vinilo/canciones")
+    def list_vinilo_canciones():
+        return _respuesta_tracklists(Vinilo, ViniloCancion)
+
+    @app.get("/api/items/<int:id>/valoraciones")
+    def get_item_valoraciones(id):
+        # Resumen precalculado (lectura por clave primaria) + las N valoraciones más recientes
+        recientes = request.args.get("recientes", 5, type=int)
+        if not 0 <= recientes <= 100:
+            return jsonify(error="'recientes' debe estar entre 0 y 100"), 400
+
+        resumen = db.session.get(ResumenValoracionItem, id)
+        if resumen is None:
+            Item.query.get_or_404(id)
+            data = {"id_item": id, "valoraciones": 0, "puntuaciones": 0, "puntuacion_media": None, "ultima_valoracion": None}
+        else:
+            data = resumen.to_dict()
+
+        data["recientes"] = []
+        if recientes and resumen is not None:
+            ultimas = (
+                Valoracion.query
+                .join(Pedido, Pedido.id_pedido == Valoracion.id_pedido)
+                .filter(Pedido.id_item == id)
+                .order_by(Valoracion.id_val.desc())
+                .limit(recientes)
+            )
+            data["recientes"] = [v.to_dict() for v in ultimas]
+        return jsonify(data)
+
+    @app.get("/api/canciones/<int:id_cancion>/similares")
+    def get_cancion_similares(id_cancion):
+        # Vecinas precalculadas por co-ocurrencia en recopilaciones
+        recomendaciones.construir_si_falta()
+        limite = request.args.get("limite", type=int)
+        return jsonify(
+            id_cancion=id_cancion,
+            similares=recomendaciones.indice.similares(id_cancion, limite),
+        )
 
     return app
       
 app = create_app()
 
 if __name__ == "__main__":
+    # Servidor de desarrollo; en producción: gunicorn app:app (ver gunicorn.conf.py)
     app.run(debug=True)
 
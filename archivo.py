@@ -0,0 +1,191 @@
+# archivo.py
+# Archivo de pedidos antiguos: una tarea mueve por trozos los pedidos de más
+# de N meses (con sus valoraciones) a una base SQLite aparte, adjuntada con
+# ATTACH como esquema "archivo". Las tablas calientes quedan acotadas y las
+# consultas que lo necesitan leen "caliente UNION ALL archivo":
+#   - estadísticas: solo si el filtro de fechas llega a lo archivado
+#   - resúmenes y biblioteca: siempre (son históricos completos)
+# Se activa con ARCHIVO_DATABASE (ruta, relativa a instance/ si no es absoluta).
+import os
+import time
+from calendar import monthrange
+from datetime import date
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import Column, Index, MetaData, Table, event, func, select, union_all
+from sqlalchemy.sql.util import ClauseAdapter
+
+import programador
+from db import db
+from models import Pedido, Valoracion
+
+ESQUEMA = "archivo"
+metadata = MetaData()
+
+
+def _tabla_archivo(origen, *indices):
+    # Mismas columnas que la tabla caliente, sin claves foráneas
+    tabla = Table(
+        origen.name, metadata,
+        *(Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in origen.c),
+        schema=ESQUEMA,
+    )
+    for columna in indices:
+        Index(f"ix_archivo_{origen.name}_{columna}", tabla.c[columna])
+    return tabla
+
+
+pedido = _tabla_archivo(Pedido.__table__, "fecha_pedido", "id_us", "id_item")
+valoracion = _tabla_archivo(Valoracion.__table__, "id_pedido", "id_us")
+# tabla caliente -> tabla de archivo
+TABLAS = {Pedido.__table__: pedido, Valoracion.__table__: valoracion}
+
+
+def activo():
+    return bool(current_app.config["ARCHIVO_DATABASE"])
+
+
+def ruta(app):
+    return os.path.join(app.instance_path, app.config["ARCHIVO_DATABASE"])
+
+
+def frontera(conexion=None):
+    # Fecha del pedido archivado más reciente (None si el archivo está vacío)
+    if not activo():
+        return None
+    consulta = select(func.max(pedido.c.fecha_pedido))
+    return (conexion or db.session).execute(consulta).scalar()
+
+
+def incluir(consulta, desde=None, conexion=None):
+    # Reescribe la consulta para leer "caliente UNION ALL archivo" en lugar de
+    # las tablas calientes, salvo que el archivo esté vacío o "desde" sea
+    # posterior a todo lo archivado.
+    limite = frontera(conexion)
+    if limite is None or (desde is not None and desde > limite):
+        return consulta
+    for caliente, archivada in TABLAS.items():
+        completa = union_all(select(caliente), select(archivada)).subquery(caliente.name)
+        consulta = ClauseAdapter(completa).traverse(consulta)
+    return consulta
+
+
+def restar_meses(fecha, meses):
+    anio, mes = divmod(fecha.year * 12 + fecha.month - 1 - meses, 12)
+    mes += 1
+    return date(anio, mes, min(fecha.day, monthrange(anio, mes)[1]))
+
+
+def archivar(meses=None, trozo=None, pausa=None):
+    # Mueve los pedidos con fecha anterior a hoy - meses; cada trozo es una
+    # transacción, así que los escritores solo esperan lo que dura un trozo.
+    # Va por Core a propósito: los resúmenes ya cuentan el archivo, y el
+    # registro de cambios no lo recoge (los pedidos siguen existiendo).
+    config = current_app.config
+    meses = config["ARCHIVO_MESES"] if meses is None else meses
+    trozo = trozo or config["ARCHIVO_TROZO"]
+    pausa = config["ARCHIVO_PAUSA"] if pausa is None else pausa
+    if not activo():
+        raise RuntimeError("El archivo no está configurado (ARCHIVO_DATABASE)")
+
+    corte = restar_meses(date.today(), meses)
+    caliente_p, caliente_v = Pedido.__table__, Valoracion.__table__
+    inicio = time.perf_counter()
+    pedidos = valoraciones = 0
+    while True:
+        ids = db.session.execute(
+            select(caliente_p.c.id_pedido)
+            .where(caliente_p.c.fecha_pedido < corte)
+            .order_by(caliente_p.c.id_pedido)
+            .limit(trozo)
+        ).scalars().all()
+        if not ids:
+            break
+        conexion = db.session.connection()
+        # OR REPLACE: si un trozo se interrumpió tras copiar, repetirlo no duplica
+        conexion.execute(
+            pedido.insert().prefix_with("OR REPLACE").from_select(
+                [c.name for c in caliente_p.c], select(caliente_p).where(caliente_p.c.id_pedido.in_(ids))
+            )
+        )
+        conexion.execute(
+            valoracion.insert().prefix_with("OR REPLACE").from_select(
+                [c.name for c in caliente_v.c], select(caliente_v).where(caliente_v.c.id_pedido.in_(ids))
+            )
+        )
+        valoraciones += conexion.execute(caliente_v.delete().where(caliente_v.c.id_pedido.in_(ids))).rowcount
+        pedidos += conexion.execute(caliente_p.delete().where(caliente_p.c.id_pedido.in_(ids))).rowcount
+        db.session.commit()
+        if pausa:
+            time.sleep(pausa)
+
+    return {
+        "corte": corte.isoformat(),
+        "pedidos": pedidos,
+        "valoraciones": valoraciones,
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def estado():
+    contar = lambda t: db.session.execute(select(func.count()).select_from(t)).scalar()
+    limite = frontera()
+    return {
+        "pedidos": {"caliente": contar(Pedido.__table__), "archivo": contar(pedido)},
+        "valoraciones": {"caliente": contar(Valoracion.__table__), "archivo": contar(valoracion)},
+        "frontera": limite.isoformat() if limite else None,
+    }
+
+
+# -------- Comandos CLI --------
+cli = AppGroup("archivo", help="Archivo de pedidos y valoraciones antiguos.")
+
+
+@cli.command("mover")
+@click.option("--meses", type=int, help="Antigüedad mínima en meses (por defecto ARCHIVO_MESES).")
+@click.option("--trozo", type=int, help="Pedidos por transacción.")
+@click.option("--pausa", type=float, help="Segundos de pausa entre trozos.")
+def mover_comando(meses, trozo, pausa):
+    """Mueve al archivo los pedidos anteriores al corte, con sus valoraciones."""
+    if not activo():
+        raise SystemExit("El archivo no está configurado (ARCHIVO_DATABASE)")
+    r = archivar(meses, trozo, pausa)
+    click.echo(f"Anteriores a {r['corte']}: {r['pedidos']} pedidos y {r['valoraciones']} valoraciones en {r['segundos']} s")
+
+
+@cli.command("estado")
+def estado_comando():
+    """Muestra cuántas filas hay en las tablas calientes y en el archivo."""
+    if not activo():
+        raise SystemExit("El archivo no está configurado (ARCHIVO_DATABASE)")
+    e = estado()
+    for tabla in ("pedidos", "valoraciones"):
+        click.echo(f"{tabla}: {e[tabla]['caliente']} calientes, {e[tabla]['archivo']} archivados")
+    click.echo(f"frontera: {e['frontera'] or '-'}")
+
+
+def init_app(app):
+    app.config.setdefault("ARCHIVO_DATABASE", None)  # p. ej. "archivo.db" (None: desactivado)
+    app.config.setdefault("ARCHIVO_MESES", 24)
+    app.config.setdefault("ARCHIVO_TROZO", 1000)  # pedidos por transacción
+    app.config.setdefault("ARCHIVO_PAUSA", 0.05)  # segundos entre trozos
+    app.config.setdefault("ARCHIVO_INTERVALO", 0)  # segundos entre ejecuciones automáticas (0: desactivado)
+    app.cli.add_command(cli)
+    if not app.config["ARCHIVO_DATABASE"]:
+        return
+
+    os.makedirs(app.instance_path, exist_ok=True)
+    archivo = ruta(app)
+    with app.app_context():
+        motores = [m for m in db.engines.values() if m.dialect.name == "sqlite"]
+    # Principal y réplica de lectura ven el mismo archivo
+    for motor in motores:
+        @event.listens_for(motor, "connect")
+        def _adjuntar(conexion, _registro):
+            conexion.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (archivo,))
+
+    with app.app_context():
+        metadata.create_all(db.engines[None])
+    programador.programar(app, "archivo", app.config["ARCHIVO_INTERVALO"], archivar)
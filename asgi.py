@@ -0,0 +1,197 @@
+# asgi.py
+# Modo ASGI: las lecturas de los recursos (listado, ?ids= y GET por clave) se
+# atienden en asyncio con el motor asíncrono de SQLAlchemy (aiosqlite), así
+# que miles de conexiones lentas u ociosas cuestan corrutinas, no hilos.
+# El resto de rutas (escrituras, lote, estadísticas...) se delegan a la
+# aplicación Flask en un pool de hilos, con sus eventos de sesión intactos.
+#
+#   pip install -r requirements-asgi.txt
+#   uvicorn asgi:app --workers 1 --backlog 2048
+import asyncio
+import math
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+import limites
+import perfilado
+import recursos
+from app import app as flask_app
+from db import BIND_LECTURA, db, proteger_replica
+
+# endpoint de Flask -> (recurso, acción asíncrona)
+LECTURAS = {}
+for _r in recursos.RECURSOS:
+    LECTURAS[_r.listado] = (_r, "listar")
+    if not _r.asociacion:
+        LECTURAS[f"get_{_r.singular}"] = (_r, "obtener")
+
+wsgi = WsgiToAsgi(flask_app)
+rutas = flask_app.url_map.bind("localhost")
+motor = None
+Sesion = None
+
+
+def url_asincrona(url):
+    # sqlite:///<ruta absoluta> -> sqlite+aiosqlite:///<ruta absoluta>
+    if url.drivername in ("sqlite", "sqlite+pysqlite"):
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def iniciar():
+    global motor, Sesion
+    if motor is None:
+        # Misma base de lectura que usa Flask-SQLAlchemy para los GET (réplica si existe)
+        with flask_app.app_context():
+            replica = db.engines.get(BIND_LECTURA)
+            url = (replica or db.engine).url
+        motor = create_async_engine(url_asincrona(url))
+        if replica is not None and replica.dialect.name == "sqlite":
+            proteger_replica(motor.sync_engine)
+        Sesion = async_sessionmaker(motor, expire_on_commit=False)
+
+
+async def detener():
+    global motor, Sesion
+    if motor is not None:
+        await motor.dispose()
+        motor, Sesion = None, None
+
+
+# -------- Respuestas --------
+async def responder(send, estado, cuerpo, etag=None, extra=()):
+    # Mismo JSON que jsonify() fuera de modo debug
+    datos = flask_app.json.dumps(cuerpo, separators=(",", ":")).encode() + b"\n"
+    cabeceras = [(b"content-type", b"application/json"), (b"content-length", str(len(datos)).encode())]
+    if etag is not None:
+        cabeceras.append((b"etag", f'"{etag}"'.encode()))
+    cabeceras.extend(extra)
+    await send({"type": "http.response.start", "status": estado, "headers": cabeceras})
+    await send({"type": "http.response.body", "body": datos})
+
+
+def parametros(scope):
+    return {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+
+
+# -------- Límites (mismas cubetas que limites._admitir en Flask) --------
+def cliente(scope):
+    # Igual que limites.cliente(): cabecera configurada o, en su defecto, la IP
+    cabecera = flask_app.config["LIMITES_CABECERA_CLIENTE"]
+    valor = cabecera and dict(scope["headers"]).get(cabecera.lower().encode(), b"").decode("latin-1")
+    return valor or (scope.get("client") or ("-",))[0]
+
+
+async def esperar_fichas(scope, endpoint):
+    config = flask_app.config
+    if endpoint in config["LIMITES_EXENTOS"]:
+        return 0
+    backend = flask_app.extensions["limites"]["backend"]
+    argumentos = (config, backend, cliente(scope), endpoint)
+    if isinstance(backend, limites.BackendMemoria):
+        return limites.tomar_fichas(*argumentos)
+    # Los backends compartidos hacen E/S bloqueante: fuera del bucle de eventos
+    return await asyncio.to_thread(limites.tomar_fichas, *argumentos)
+
+
+async def limitada(scope, send, endpoint):
+    # Responde 429 (como limites.rechazar) si el cliente agotó sus fichas
+    espera = await esperar_fichas(scope, endpoint)
+    if not espera:
+        return False
+    reintento = str(max(1, math.ceil(espera))).encode()
+    await responder(send, 429, {"error": "Demasiadas peticiones"}, extra=[(b"retry-after", reintento)])
+    return True
+
+
+# -------- Lecturas asíncronas (mismas respuestas que recursos.Recurso) --------
+async def listar(recurso, params):
+    modelo = recurso.modelo
+    async with Sesion() as sesion:
+        if "ids" in params:
+            crudos = [x for x in params["ids"].split(",") if x.strip()]
+            maximo = flask_app.config["MAX_IDS_LOTE"]
+            if not crudos:
+                return 400, {"error": "Debe indicar al menos un id en 'ids'"}
+            if len(crudos) > maximo:
+                return 400, {"error": f"Máximo {maximo} ids por consulta"}
+            try:
+                ids = recursos.convertir_ids(modelo, crudos)
+            except (TypeError, ValueError):
+                return 400, {"error": "Los ids no coinciden con el tipo de la clave primaria"}
+
+            columnas = recurso.clave
+            clave = columnas[0] if len(columnas) == 1 else db.tuple_(*columnas)
+            encontrados = {}
+            for trozo in recursos.trozos(list(dict.fromkeys(ids)), recursos.TAMANO_TROZO_IDS):
+                for obj in (await sesion.execute(select(modelo).where(clave.in_(trozo)))).scalars():
+                    pk = tuple(getattr(obj, c.key) for c in columnas)
+                    encontrados[pk[0] if len(pk) == 1 else pk] = obj
+            return 200, {
+                "resultados": [encontrados[i].to_dict() for i in ids if i in encontrados],
+                "faltantes": [i for i in ids if i not in encontrados],
+            }
+
+        consulta = select(modelo)
+        if recurso.orden_desc:
+            consulta = consulta.order_by(recurso.clave[0].desc())
+        return 200, [o.to_dict() for o in (await sesion.execute(consulta)).scalars()]
+
+
+async def obtener(recurso, clave):
+    async with Sesion() as sesion:
+        return await sesion.get(recurso.modelo, recurso._pk(clave))
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "lifespan.startup":
+                iniciar()
+                await send({"type": "lifespan.startup.complete"})
+            elif mensaje["type"] == "lifespan.shutdown":
+                await detener()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # Con la cabecera de "leer mis escrituras" la petición la atiende Flask contra la
+    # principal; las que piden perfilado (?__profile=) también van a Flask
+    cabecera_primaria = flask_app.config["LECTURA_CABECERA_PRIMARIA"].lower().encode()
+    if (
+        scope["type"] == "http"
+        and scope["method"] == "GET"
+        and cabecera_primaria not in dict(scope["headers"])
+        and perfilado.PARAMETRO.encode() not in scope.get("query_string", b"")
+    ):
+        try:
+            endpoint, argumentos = rutas.match(scope["path"], "GET")
+        except HTTPException:
+            endpoint = None
+        if endpoint in LECTURAS:
+            iniciar()
+            recurso, accion = LECTURAS[endpoint]
+            # Las fichas se toman antes de consultar: un cliente sin fichas no cuesta lecturas
+            if await limitada(scope, send, endpoint):
+                return None
+            if accion == "listar":
+                estado, cuerpo = await listar(recurso, parametros(scope))
+                return await responder(send, estado, cuerpo)
+
+            obj = await obtener(recurso, argumentos)
+            if obj is not None:
+                return await responder(send, 200, obj.to_dict(), obj.version)
+            # El 404 lo genera Flask para que la respuesta sea idéntica; las fichas
+            # ya están tomadas y limites._admitir no las vuelve a cobrar
+            marca = limites.fichas_tomadas.set(True)
+            try:
+                return await wsgi(scope, receive, send)
+            finally:
+                limites.fichas_tomadas.reset(marca)
+
+    # Escrituras, rutas propias y errores: aplicación Flask en un hilo del pool
+    await wsgi(scope, receive, send)
@@ -0,0 +1,112 @@
+# benchmarks/bench_carga.py
+# Prueba de carga HTTP con muchas conexiones concurrentes (cliente asyncio sin
+# dependencias). Sirve para comparar los modos de despliegue lado a lado:
+#
+#   WSGI:  flask --app app run --with-threads --port 5000
+#   ASGI:  uvicorn asgi:app --port 8000 --backlog 2048
+#
+#   python benchmarks/bench_carga.py http://127.0.0.1:5000/api/canciones -c 1000 -n 20000
+#   python benchmarks/bench_carga.py http://127.0.0.1:8000/api/canciones -c 1000 -n 20000
+#
+# Cada conexión es keep-alive y puede esperar --pausa segundos entre
+# peticiones para simular clientes lentos que mantienen la conexión abierta.
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def cliente(host, puerto, ruta, peticiones, pausa, latencias, errores, estados):
+    try:
+        lector, escritor = await asyncio.open_connection(host, puerto)
+    except OSError:
+        errores.append("conexión")
+        return
+    solicitud = f"GET {ruta} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode()
+    try:
+        while True:
+            try:
+                peticiones.pop()
+            except IndexError:
+                break
+            inicio = time.perf_counter()
+            escritor.write(solicitud)
+            await escritor.drain()
+            estado = await leer_respuesta(lector)
+            if estado is None:
+                # El servidor cerró la conexión (p. ej. servidor sin keep-alive): reconectar
+                escritor.close()
+                lector, escritor = await asyncio.open_connection(host, puerto)
+                peticiones.append(1)
+                continue
+            latencias.append(time.perf_counter() - inicio)
+            estados[estado] = estados.get(estado, 0) + 1
+            if pausa:
+                await asyncio.sleep(pausa)
+    except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+        errores.append(type(e).__name__)
+    finally:
+        escritor.close()
+
+
+async def leer_respuesta(lector):
+    linea = await lector.readline()
+    if not linea:
+        return None
+    estado = int(linea.split()[1])
+    largo, cerrar, trozos = 0, False, False
+    while True:
+        cabecera = await lector.readline()
+        if cabecera in (b"\r\n", b""):
+            break
+        nombre, _, valor = cabecera.decode("latin-1").partition(":")
+        nombre = nombre.strip().lower()
+        if nombre == "content-length":
+            largo = int(valor)
+        elif nombre == "transfer-encoding" and "chunked" in valor:
+            trozos = True
+        elif nombre == "connection" and "close" in valor.lower():
+            cerrar = True
+    if trozos:
+        while True:
+            tamano = int((await lector.readline()).strip(), 16)
+            await lector.readexactly(tamano + 2)
+            if tamano == 0:
+                break
+    elif largo:
+        await lector.readexactly(largo)
+    if cerrar:
+        lector.feed_eof()
+    return estado
+
+
+async def principal(args):
+    url = urlsplit(args.url)
+    ruta = url.path + (f"?{url.query}" if url.query else "")
+    peticiones = [1] * args.n
+    latencias, errores, estados = [], [], {}
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        cliente(url.hostname, url.port or 80, ruta, peticiones, args.pausa, latencias, errores, estados)
+        for _ in range(args.c)
+    ))
+    total = time.perf_counter() - inicio
+
+    print(f"{args.url}  conexiones={args.c}  peticiones={len(latencias):,}  errores={len(errores)}")
+    print(f"  estados: {dict(sorted(estados.items()))}")
+    if latencias:
+        latencias.sort()
+        p = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000
+        print(f"  {len(latencias) / total:,.0f} pet/s en {total:.1f} s")
+        print(f"  latencia ms: media {statistics.mean(latencias) * 1000:.1f}  p50 {p(.5):.1f}  p95 {p(.95):.1f}  p99 {p(.99):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("url")
+    parser.add_argument("-c", type=int, default=1000, help="conexiones concurrentes")
+    parser.add_argument("-n", type=int, default=20000, help="peticiones totales")
+    parser.add_argument("--pausa", type=float, default=0.0, help="segundos entre peticiones de una conexión")
+    asyncio.run(principal(parser.parse_args()))
@@ -0,0 +1,100 @@
+# benchmarks/bench_validacion.py
+# Rendimiento de la validación de altas con esquemas.py.
+# Uso (desde la raíz del proyecto):  python benchmarks/bench_validacion.py [filas]
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import esquemas  # noqa: E402
+from models import Cancion, Pedido  # noqa: E402
+
+
+def generar_pedidos(n):
+    return [
+        {
+            "id_us": i % 500 + 1,
+            "fecha_pedido": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "estado": "pagado",
+            "medio_pago": "tarjeta",
+            "id_item": str(i % 50 + 1),
+        }
+        for i in range(n)
+    ]
+
+
+def generar_canciones(n):
+    return [
+        {"nombre": f"Canción {i}", "duracion": f"00:{i % 60:02d}:{(i * 7) % 60:02d}", "tamano": i % 10 + 0.5}
+        for i in range(n)
+    ]
+
+
+def manual_pedidos(filas):
+    # Validación a mano como la hacían antes los handlers (strptime por fila)
+    limpias = []
+    for item in filas:
+        if not all([item.get("id_us"), item.get("fecha_pedido"), item.get("estado"),
+                    item.get("medio_pago"), item.get("id_item")]):
+            raise ValueError
+        limpias.append({
+            "id_us": item["id_us"],
+            "fecha_pedido": datetime.strptime(item["fecha_pedido"], "%Y-%m-%d").date(),
+            "estado": item["estado"],
+            "medio_pago": item["medio_pago"],
+            "id_item": item["id_item"],
+        })
+    return limpias
+
+
+def manual_canciones(filas):
+    limpias = []
+    for item in filas:
+        if not item.get("nombre") or not item.get("duracion") or item.get("tamano") is None:
+            raise ValueError
+        limpias.append({
+            "nombre": item["nombre"],
+            "duracion": datetime.strptime(item["duracion"], "%H:%M:%S").time(),
+            "tamano": item["tamano"],
+        })
+    return limpias
+
+
+def medir(nombre, funcion, filas, repeticiones=3):
+    mejor = min(_tiempo(funcion, filas) for _ in range(repeticiones))
+    print(f"  {nombre:<22} {mejor * 1000:9.1f} ms   {len(filas) / mejor:12,.0f} filas/s")
+
+
+def _tiempo(funcion, filas):
+    inicio = time.perf_counter()
+    funcion(filas)
+    return time.perf_counter() - inicio
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    for titulo, generar, manual, modelo in (
+        ("Pedido", generar_pedidos, manual_pedidos, Pedido),
+        ("Cancion", generar_canciones, manual_canciones, Cancion),
+    ):
+        filas = generar(n)
+        limpias, errores = esquemas.validar(modelo, filas)
+        assert not errores, errores[:3]
+        print(f"{titulo}: {n:,} filas")
+        medir("manual (strptime)", manual, filas)
+        medir("esquemas.validar", lambda f: esquemas.validar(modelo, f), filas)
+
+    # Lote con un 10 % de filas inválidas: se recogen todos los errores en una pasada
+    filas = generar_pedidos(n)
+    for fila in filas[::10]:
+        fila["fecha_pedido"] = "2024-13-40"
+    inicio = time.perf_counter()
+    _, errores = esquemas.validar(Pedido, filas)
+    print(f"Pedido con errores: {len(errores):,} errores en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_workers.py
+# Escalado de gunicorn.conf.py con el número de workers: lanza gunicorn con
+# 1, 2, 4... workers (hasta el número de núcleos) y mide cada uno con
+# bench_carga.py contra la misma URL.
+#
+#   python benchmarks/bench_workers.py /api/canciones -c 200 -n 20000
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARGA = os.path.join(RAIZ, "benchmarks", "bench_carga.py")
+
+
+def esperar(url, segundos=30):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"gunicorn no respondió en {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("ruta", nargs="?", default="/api/canciones")
+    parser.add_argument("-c", type=int, default=200, help="conexiones concurrentes")
+    parser.add_argument("-n", type=int, default=20000, help="peticiones por medición")
+    parser.add_argument("--puerto", type=int, default=8100)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    cuentas = [1]
+    while cuentas[-1] * 2 <= args.max_workers:
+        cuentas.append(cuentas[-1] * 2)
+    if cuentas[-1] != args.max_workers:
+        cuentas.append(args.max_workers)
+
+    for workers in cuentas:
+        entorno = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f"127.0.0.1:{args.puerto}")
+        servidor = subprocess.Popen(
+            ["gunicorn", "app:app", "--log-level", "warning"],
+            cwd=RAIZ, env=entorno,
+        )
+        try:
+            url = f"http://127.0.0.1:{args.puerto}{args.ruta}"
+            esperar(url)
+            print(f"== {workers} worker(s)", flush=True)
+            subprocess.run([sys.executable, CARGA, url, "-c", str(args.c), "-n", str(args.n)], check=True)
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# biblioteca.py
+# Biblioteca de un usuario: todas las canciones de los vinilos y discos mp3 que
+# ha pedido. Se calcula con un único camino de joins en SQL y, opcionalmente,
+# se guarda en una caché por usuario que se invalida cuando cambian sus pedidos.
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect, select, union
+
+import archivo
+from db import db
+from models import (
+    Cancion,
+    DiscoMp3,
+    DiscoMp3Cancion,
+    Pedido,
+    Usuario,
+    Vinilo,
+    ViniloCancion,
+)
+
+# Cambios en estos modelos pueden alterar la biblioteca de cualquier usuario
+MODELOS_CATALOGO = (Vinilo, DiscoMp3, ViniloCancion, DiscoMp3Cancion, Cancion)
+
+
+def ids_canciones(id_us):
+    # pedido -> vinilo -> viniloCancion  UNION  pedido -> discoMp3 -> discoMp3Cancion
+    por_vinilo = (
+        select(ViniloCancion.id_cancion)
+        .join(Vinilo, Vinilo.id_vinilo == ViniloCancion.id_vinilo)
+        .join(Pedido, Pedido.id_item == Vinilo.id_item)
+        .where(Pedido.id_us == id_us)
+    )
+    por_disco = (
+        select(DiscoMp3Cancion.id_cancion)
+        .join(DiscoMp3, DiscoMp3.id_discoMp3 == DiscoMp3Cancion.id_discoMp3)
+        .join(Pedido, Pedido.id_item == DiscoMp3.id_item)
+        .where(Pedido.id_us == id_us)
+    )
+    # Lo comprado hace años sigue en la biblioteca aunque el pedido esté archivado
+    return archivo.incluir(union(por_vinilo, por_disco))
+
+
+def consultar(id_us, despues=None, limite=None, motor=None):
+    # Paginación por clave (keyset): id_cancion > despues ORDER BY id_cancion.
+    # motor: base a consultar (None: la que elija la sesión, réplica en los GET)
+    consulta = select(Cancion).where(Cancion.id_cancion.in_(ids_canciones(id_us)))
+    if despues is not None:
+        consulta = consulta.where(Cancion.id_cancion > despues)
+    consulta = consulta.order_by(Cancion.id_cancion)
+    if limite is not None:
+        consulta = consulta.limit(limite)
+    enlace = {"bind": motor} if motor is not None else None
+    return [c.to_dict() for c in db.session.scalars(consulta, bind_arguments=enlace)]
+
+
+class CacheBiblioteca:
+    # Cada invalidación sube la generación del usuario (limpiar, la de todos):
+    # una consulta que empezó antes de una invalidación no guarda su resultado.
+    def __init__(self, max_usuarios=1000):
+        self.max_usuarios = max_usuarios
+        self._datos = OrderedDict()  # id_us -> (ids ordenados, canciones)
+        self._generaciones = {}  # id_us -> invalidaciones de ese usuario
+        self._generacion_global = 0  # llamadas a limpiar()
+        self._lock = threading.Lock()
+
+    def _generacion(self, id_us):
+        return self._generacion_global, self._generaciones.get(id_us, 0)
+
+    def generacion(self, id_us):
+        with self._lock:
+            return self._generacion(id_us)
+
+    def obtener(self, id_us):
+        with self._lock:
+            if id_us in self._datos:
+                self._datos.move_to_end(id_us)
+                return self._datos[id_us]
+            return None
+
+    def guardar(self, id_us, canciones, generacion=None):
+        # generacion: la de antes de la consulta; si cambió, el resultado puede
+        # ser anterior a la invalidación y se devuelve sin guardarlo
+        entrada = ([c["id_cancion"] for c in canciones], canciones)
+        with self._lock:
+            if generacion is not None and generacion != self._generacion(id_us):
+                return entrada
+            self._datos[id_us] = entrada
+            self._datos.move_to_end(id_us)
+            while len(self._datos) > self.max_usuarios:
+                self._datos.popitem(last=False)
+        return entrada
+
+    def invalidar(self, usuarios):
+        with self._lock:
+            for id_us in usuarios:
+                self._datos.pop(id_us, None)
+                self._generaciones[id_us] = self._generaciones.get(id_us, 0) + 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._generacion_global += 1
+
+
+cache = CacheBiblioteca()
+
+
+def pagina(id_us, despues=None, limite=50, usar_cache=True):
+    # Devuelve (canciones, siguiente_cursor)
+    if not usar_cache:
+        canciones = consultar(id_us, despues, limite + 1)
+    else:
+        entrada = cache.obtener(id_us)
+        if entrada is None:
+            # La entrada se calcula en la principal: la réplica puede ir por detrás de
+            # una invalidación ya hecha y la caché guardaría datos viejos sin caducidad
+            generacion = cache.generacion(id_us)
+            entrada = cache.guardar(id_us, consultar(id_us, motor=db.engines[None]), generacion)
+        ids, todas = entrada
+        inicio = bisect_right(ids, despues) if despues is not None else 0
+        canciones = todas[inicio:inicio + limite + 1]
+    hay_mas = len(canciones) > limite
+    canciones = canciones[:limite]
+    return canciones, (canciones[-1]["id_cancion"] if hay_mas else None)
+
+
+# -------- Invalidación: solo al confirmar la transacción --------
+@event.listens_for(db.session, "after_flush")
+def _anotar_invalidaciones(session, contexto):
+    pendientes = session.info.setdefault("biblioteca", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Pedido):
+            pendientes.add(obj.id_us)
+            pendientes.update(inspect(obj).attrs.id_us.history.deleted)
+        elif isinstance(obj, MODELOS_CATALOGO):
+            pendientes.add("*")
+        elif isinstance(obj, Usuario) and obj in session.deleted:
+            # La ruta no comprueba que exista un usuario con la biblioteca en caché
+            pendientes.add(obj.id_usuario)
+
+
+@event.listens_for(db.session, "after_commit")
+def _invalidar(session):
+    pendientes = session.info.pop("biblioteca", None)
+    if not pendientes:
+        return
+    if "*" in pendientes:
+        cache.limpiar()
+    else:
+        cache.invalidar(pendientes)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _descartar(session, transaccion_previa):
+    session.info.pop("biblioteca", None)
+
+
+def init_app(app):
+    app.config.setdefault("BIBLIOTECA_CACHE", True)
+    cache.max_usuarios = app.config.setdefault("BIBLIOTECA_CACHE_USUARIOS", 1000)
@@ -0,0 +1,35 @@
+# cambios.py
+# Registro de cambios: cada flush del ORM escribe en la tabla "cambio" una fila
+# por registro insertado (I), modificado (U) o eliminado (D), dentro de la misma
+# transacción. Los consumidores leen /api/changes?since=<seq> y solo procesan lo nuevo.
+from sqlalchemy import event, inspect
+
+from db import db
+from models import Cambio
+
+TABLAS_EXCLUIDAS = {Cambio.__tablename__}
+
+
+def clave_de(obj):
+    # Clave primaria como texto; las compuestas se unen con ":" (igual que en ?ids=)
+    return ":".join(str(v) for v in inspect(obj).mapper.primary_key_from_instance(obj))
+
+
+def registrar(conexion, filas):
+    # filas: [{"tabla": ..., "clave": ..., "op": ...}]
+    if filas:
+        conexion.execute(Cambio.__table__.insert(), filas)
+
+
+@event.listens_for(db.session, "after_flush")
+def _registrar_cambios(session, contexto):
+    filas = []
+    for op, objetos in (("I", session.new), ("U", session.dirty), ("D", session.deleted)):
+        for obj in objetos:
+            tabla = obj.__table__.name
+            if tabla in TABLAS_EXCLUIDAS:
+                continue
+            if op == "U" and not session.is_modified(obj, include_collections=False):
+                continue
+            filas.append({"tabla": tabla, "clave": clave_de(obj), "op": op})
+    registrar(session.connection(), filas)
@@ -0,0 +1,183 @@
+# compresion.py
+# Compresión negociada de las respuestas (br si está instalado brotli, gzip,
+# deflate), también para respuestas en streaming, y caché de los catálogos
+# completos (/api/canciones, /api/vinilo, /api/discomp3) ya serializados y
+# comprimidos. La caché se valida con el último seq del registro de cambios de
+# las tablas de las que depende cada listado: mientras no cambie, las peticiones
+# repetidas no pagan ni la serialización ni la compresión (y con If-None-Match
+# reciben un 304).
+import threading
+import zlib
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import func, select
+
+from db import db
+from models import Cambio
+
+try:
+    import brotli
+except ImportError:  # sin brotli se negocia gzip/deflate
+    brotli = None
+
+TIPOS_COMPRIMIBLES = ("application/json", "text/")
+
+# endpoint del listado -> tablas cuyos cambios alteran la respuesta
+# (num_canciones y duracion_total de los álbumes dependen de sus canciones)
+CATALOGOS = {
+    "list_canciones": ("cancion",),
+    "list_vinilos": ("vinilo", "viniloCancion", "cancion"),
+    "list_discos": ("discoMp3", "discoMp3Cancion", "cancion"),
+}
+
+
+def codificaciones():
+    return (["br"] if brotli is not None else []) + ["gzip", "deflate"]
+
+
+def negociar():
+    # Mejor codificación aceptada por el cliente (None: sin comprimir)
+    return request.accept_encodings.best_match(codificaciones())
+
+
+def _compresor(codificacion, nivel):
+    if codificacion == "br":
+        return brotli.Compressor(quality=min(nivel, 11))
+    # wbits 31: formato gzip; 15: zlib, que es lo que HTTP llama "deflate"
+    return zlib.compressobj(nivel, zlib.DEFLATED, 31 if codificacion == "gzip" else 15)
+
+
+def comprimir(datos, codificacion, nivel):
+    compresor = _compresor(codificacion, nivel)
+    if codificacion == "br":
+        return compresor.process(datos) + compresor.finish()
+    return compresor.compress(datos) + compresor.flush()
+
+
+def comprimir_flujo(trozos, codificacion, nivel):
+    # Cada trozo se envía en cuanto se comprime (Z_SYNC_FLUSH), sin esperar al final
+    compresor = _compresor(codificacion, nivel)
+    for trozo in trozos:
+        if isinstance(trozo, str):
+            trozo = trozo.encode()
+        if codificacion == "br":
+            salida = compresor.process(trozo) + compresor.flush()
+        else:
+            salida = compresor.compress(trozo) + compresor.flush(zlib.Z_SYNC_FLUSH)
+        if salida:
+            yield salida
+    yield compresor.finish() if codificacion == "br" else compresor.flush()
+
+
+def _comprimible(respuesta):
+    return (
+        200 <= respuesta.status_code not in (204, 206, 304)  # con cuerpo completo
+        and "Content-Encoding" not in respuesta.headers
+        and not respuesta.direct_passthrough  # archivos (send_file)
+        and (respuesta.mimetype or "").startswith(TIPOS_COMPRIMIBLES)
+    )
+
+
+def _comprimir_respuesta(respuesta):
+    if not _comprimible(respuesta):
+        return respuesta
+    respuesta.vary.add("Accept-Encoding")
+    codificacion = negociar()
+    if codificacion is None:
+        return respuesta
+    nivel = current_app.config["COMPRESION_NIVEL"]
+
+    if respuesta.is_streamed:
+        respuesta.response = comprimir_flujo(respuesta.response, codificacion, nivel)
+        respuesta.headers.pop("Content-Length", None)
+    else:
+        datos = respuesta.get_data()
+        if len(datos) < current_app.config["COMPRESION_MINIMO"]:
+            return respuesta
+        respuesta.set_data(comprimir(datos, codificacion, nivel))
+    respuesta.headers["Content-Encoding"] = codificacion
+    return respuesta
+
+
+# -------- Caché de catálogos comprimidos --------
+class CacheCatalogos:
+    def __init__(self):
+        self._datos = {}  # endpoint -> (etag, {codificación o "identity": bytes})
+        self._lock = threading.Lock()
+
+    def obtener(self, endpoint, etag):
+        with self._lock:
+            entrada = self._datos.get(endpoint)
+        return entrada[1] if entrada and entrada[0] == etag else None
+
+    def guardar(self, endpoint, etag, cuerpo):
+        variantes = {"identity": cuerpo}
+        with self._lock:
+            self._datos[endpoint] = (etag, variantes)
+        return variantes
+
+    def variante(self, variantes, codificacion, nivel):
+        # Cada codificación se comprime una sola vez, la primera vez que se pide
+        if codificacion not in variantes:
+            variantes[codificacion] = comprimir(variantes["identity"], codificacion, nivel)
+        return variantes[codificacion]
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+cache = CacheCatalogos()
+
+
+def version_catalogo(tablas):
+    # Último seq de cada tabla: una búsqueda en el índice (tabla, seq) por tabla
+    ultimos = db.session.execute(select(*(
+        select(func.max(Cambio.seq)).where(Cambio.tabla == t).scalar_subquery() for t in tablas
+    ))).one()
+    return max((s for s in ultimos if s is not None), default=0)
+
+
+def cacheado(vista, endpoint, tablas):
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        # Solo el catálogo completo: ?ids= y demás variantes van a la vista
+        if request.args or not current_app.config["COMPRESION_CACHE"]:
+            return vista(*args, **kwargs)
+
+        etag = f"{endpoint}-{version_catalogo(tablas)}"
+        if request.if_none_match.contains_weak(etag):
+            respuesta = current_app.response_class(status=304)
+        else:
+            variantes = cache.obtener(endpoint, etag)
+            if variantes is None:
+                respuesta = current_app.make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+                variantes = cache.guardar(endpoint, etag, respuesta.get_data())
+
+            codificacion = negociar()
+            nivel = current_app.config["COMPRESION_NIVEL"]
+            if codificacion is None:
+                cuerpo = variantes["identity"]
+            else:
+                cuerpo = cache.variante(variantes, codificacion, nivel)
+            respuesta = current_app.response_class(cuerpo, mimetype="application/json")
+            if codificacion is not None:
+                respuesta.headers["Content-Encoding"] = codificacion
+        # Débil: el mismo ETag vale para todas las codificaciones
+        respuesta.set_etag(etag, weak=True)
+        respuesta.vary.add("Accept-Encoding")
+        return respuesta
+    return envoltura
+
+
+def init_app(app):
+    # Después de registrar las rutas de recursos (envuelve sus listados)
+    app.config.setdefault("COMPRESION_NIVEL", 6)
+    app.config.setdefault("COMPRESION_MINIMO", 1024)  # bytes; las respuestas menores se envían tal cual
+    app.config.setdefault("COMPRESION_CACHE", True)
+    app.after_request(_comprimir_respuesta)
+    for endpoint, tablas in CATALOGOS.items():
+        app.view_functions[endpoint] = cacheado(app.view_functions[endpoint], endpoint, tablas)
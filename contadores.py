@@ -0,0 +1,96 @@
+# contadores.py
+# Contadores desnormalizados: num_canciones y duracion_total (segundos) en Vinilo,
+# DiscoMp3 y Recopilacion. Se recalculan en la misma transacción cada vez que un
+# flush agrega o quita canciones de un álbum o cambia la duración de una canción,
+# para que los listados los muestren sin joins.
+from sqlalchemy import event, func, inspect, select
+
+import cambios
+from db import db
+from models import (
+    Cancion,
+    DiscoMp3,
+    DiscoMp3Cancion,
+    Recopilacion,
+    RecopilacionCancion,
+    Vinilo,
+    ViniloCancion,
+    segundos_sql,
+)
+
+TAMANO_TROZO = 500
+
+# (álbum, tabla de asociación, columna que los une)
+ALBUMES = [
+    (Vinilo, ViniloCancion, "id_vinilo"),
+    (DiscoMp3, DiscoMp3Cancion, "id_discoMp3"),
+    (Recopilacion, RecopilacionCancion, "id_recopilacion"),
+]
+
+
+def recalcular(conexion, album, asociacion, columna, ids):
+    # UPDATE album SET num_canciones = (...), duracion_total = (...) WHERE id IN (...)
+    # Es un UPDATE de Core (no pasa por el flush del ORM): el registro de cambios
+    # de los álbumes actualizados se escribe aquí, como en recursos.actualizar_directo.
+    # Los contadores forman parte de la representación con ETag: sube la versión.
+    pk = getattr(album, columna)
+    fk = getattr(asociacion, columna)
+    num = select(func.count()).where(fk == pk).scalar_subquery()
+    total = (
+        select(func.coalesce(func.sum(segundos_sql(Cancion.duracion)), 0))
+        .select_from(asociacion)
+        .join(Cancion, Cancion.id_cancion == asociacion.id_cancion)
+        .where(fk == pk)
+        .scalar_subquery()
+    )
+    ids = list(ids)
+    tabla = album.__table__
+    for i in range(0, len(ids), TAMANO_TROZO):
+        actualizados = conexion.execute(
+            tabla.update()
+            .where(pk.in_(ids[i:i + TAMANO_TROZO]))
+            .values(num_canciones=num, duracion_total=total, version=tabla.c.version + 1)
+            .returning(tabla.c[columna])
+        ).scalars()
+        # Solo los que existen: un álbum borrado en este flush no se registra como "U"
+        cambios.registrar(conexion, [
+            {"tabla": tabla.name, "clave": str(id_album), "op": "U"} for id_album in actualizados
+        ])
+
+
+def _valores(obj, columna):
+    # Valor actual y, si cambió en este flush, el anterior
+    historial = inspect(obj).attrs[columna].history
+    return {getattr(obj, columna), *historial.deleted} - {None}
+
+
+@event.listens_for(db.session, "after_flush")
+def _actualizar_contadores(session, contexto):
+    afectados = {album: set() for album, _, _ in ALBUMES}
+    canciones = set()
+
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        for album, asociacion, columna in ALBUMES:
+            if isinstance(obj, asociacion):
+                afectados[album].update(_valores(obj, columna))
+        if isinstance(obj, Cancion) and obj in session.dirty and inspect(obj).attrs.duracion.history.has_changes():
+            canciones.add(obj.id_cancion)
+
+    conexion = session.connection()
+    if canciones:
+        # Álbumes que contienen las canciones cuya duración cambió (índice id_cancion)
+        for album, asociacion, columna in ALBUMES:
+            filas = conexion.execute(
+                select(getattr(asociacion, columna)).where(asociacion.id_cancion.in_(canciones))
+            )
+            afectados[album].update(f[0] for f in filas)
+
+    for album, asociacion, columna in ALBUMES:
+        if not afectados[album]:
+            continue
+        recalcular(conexion, album, asociacion, columna, afectados[album])
+        # Los objetos ya cargados en la sesión vuelven a leer contadores y versión
+        # (con la versión anterior su próximo flush fallaría con StaleDataError)
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, album) and getattr(obj, columna) in afectados[album]:
+                session.expire(obj, ["num_canciones", "duracion_total", "version"])
@@ -1,4 +1,191 @@
 # db.py
+import os
+import sqlite3
+import tempfile
+import time
+
+import click
+from flask import current_app, has_request_context, request
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+
+BIND_LECTURA = "lectura"
+METODOS_LECTURA = {"GET", "HEAD"}
+
+
+class SesionLecturaEscritura(Session):
+    # Enruta las consultas de las peticiones GET/HEAD al bind "lectura" (réplica
+    # o instantánea) cuando está configurado; el resto va a la base principal.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._leer_de_replica(clause):
+            return self._db.engines[BIND_LECTURA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _leer_de_replica(self, clause):
+        if not has_request_context() or request.method not in METODOS_LECTURA:
+            return False
+        if self._flushing or (clause is not None and not getattr(clause, "is_select", False)):
+            return False
+        if BIND_LECTURA not in self._db.engines:
+            return False
+        # "Leer mis escrituras": el cliente pide datos de la principal en esta petición
+        return not leer_de_primaria()
+
+
+def leer_de_primaria():
+    return bool(request.headers.get(current_app.config["LECTURA_CABECERA_PRIMARIA"]))
+
+
+db = SQLAlchemy(session_options={"class_": SesionLecturaEscritura})
+
+
+def configurar_lectura(app):
+    # Debe llamarse antes de db.init_app: añade el bind "lectura" si hay DSN
+    app.config.setdefault("LECTURA_DATABASE_URI", None)
+    app.config.setdefault("LECTURA_CABECERA_PRIMARIA", "X-Leer-Primaria")
+    if app.config["LECTURA_DATABASE_URI"]:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds[BIND_LECTURA] = app.config["LECTURA_DATABASE_URI"]
+        app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def iniciar_lectura(app):
+    # Después de db.init_app: la réplica SQLite se abre en modo solo consulta
+    with app.app_context():
+        motor = db.engines.get(BIND_LECTURA)
+    if motor is not None and motor.dialect.name == "sqlite":
+        proteger_replica(motor)
+
+    app.cli.add_command(replica_cli)
+
+
+def proteger_replica(motor):
+    # Listeners de la réplica SQLite, también para el motor asíncrono de asgi.py
+    # (su sync_engine): solo consulta y descarte de conexiones al archivo anterior
+    ruta = motor.url.database
+
+    @event.listens_for(motor, "connect")
+    def _solo_consulta(conexion, registro):
+        cursor = conexion.cursor()  # también el adaptador de aiosqlite
+        cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+        registro.info["inodo"] = _inodo(ruta)
+
+    @event.listens_for(motor, "checkout")
+    def _replica_sustituida(_conexion, registro, _proxy):
+        # "flask replica refrescar" sustituye el archivo (quizá desde otro
+        # proceso): las conexiones abiertas al anterior se descartan
+        if registro.info.get("inodo") != _inodo(ruta):
+            raise exc.DisconnectionError("La réplica se ha sustituido")
+
+
+def _inodo(ruta):
+    try:
+        return os.stat(ruta).st_ino
+    except OSError:
+        return None
+
+
+class CopiaReiniciada(Exception):
+    pass
+
+
+def copiar_base(ruta_origen, ruta_destino, paginas=1024, pausa=0.0, max_reinicios=3, intentos=3, espera=1.0):
+    # Copia en caliente con la API de backup. SQLite reinicia la copia por tramos
+    # cada vez que otra conexión escribe en el origen, así que:
+    #   - en WAL se copia de una pasada: solo se sostiene una instantánea de
+    #     lectura y los escritores no esperan
+    #   - en otro modo se copia por tramos con pausa (los escritores solo esperan
+    #     un tramo). Nunca de una pasada: bloquearía las escrituras toda la copia.
+    #     Si se reinicia más de "max_reinicios" veces, se abandona y se vuelve a
+    #     empezar tras "espera" segundos (el doble en cada intento); agotados los
+    #     "intentos", lanza CopiaReiniciada.
+    # Devuelve (páginas copiadas, reinicios).
+    origen = sqlite3.connect(ruta_origen)
+    try:
+        wal = origen.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        reinicios = 0
+        anterior = None
+        en_intento = 0
+
+        def progreso(estado, restantes, total):
+            nonlocal anterior, reinicios, en_intento
+            if anterior is not None and restantes > anterior:
+                reinicios += 1
+                en_intento += 1
+                if en_intento > max_reinicios:
+                    raise CopiaReiniciada()
+            anterior = restantes
+            if restantes and pausa:
+                time.sleep(pausa)
+
+        destino = sqlite3.connect(ruta_destino)
+        try:
+            if wal:
+                origen.backup(destino, pages=-1)
+            else:
+                for intento in range(intentos):
+                    if intento:
+                        time.sleep(espera * 2 ** (intento - 1))
+                    anterior, en_intento = None, 0
+                    try:
+                        origen.backup(destino, pages=paginas, progress=progreso)
+                        break
+                    except CopiaReiniciada:
+                        pass
+                else:
+                    raise CopiaReiniciada(
+                        f"La copia se reinició más de {max_reinicios} veces en cada uno de {intentos} intentos"
+                    )
+            total = destino.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            destino.close()
+    finally:
+        origen.close()
+    return total, reinicios
+
+
+def refrescar_replica(paginas=1024, pausa=0.0):
+    # Copia la base principal a un archivo temporal junto a la réplica y lo pone
+    # en su lugar con os.replace (atómico): las lecturas en curso siguen con el
+    # archivo anterior y las nuevas conexiones abren la copia completa.
+    principal = db.engines[None].url.database
+    motor = db.engines[BIND_LECTURA]
+    replica = motor.url.database
+    descriptor, temporal = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(replica)), prefix=os.path.basename(replica) + ".", suffix=".tmp"
+    )
+    os.close(descriptor)
+    try:
+        copiar_base(principal, temporal, paginas, pausa)
+        # Sin WAL: la réplica solo se lee y así no hereda los -wal/-shm del archivo anterior
+        copia = sqlite3.connect(temporal)
+        try:
+            copia.execute("PRAGMA journal_mode = DELETE").fetchone()
+        finally:
+            copia.close()
+        os.replace(temporal, replica)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    motor.dispose()
+    return replica
+
+
+replica_cli = AppGroup("replica", help="Réplica de solo lectura para las peticiones GET")
+
 
-db = SQLAlchemy()
+@replica_cli.command("refrescar")
+def refrescar_comando():
+    """Copia la base principal sobre la réplica (LECTURA_DATABASE_URI)."""
+    if BIND_LECTURA not in db.engines:
+        raise SystemExit("No hay réplica configurada (LECTURA_DATABASE_URI)")
+    if db.engines[BIND_LECTURA].dialect.name != "sqlite":
+        raise SystemExit("La réplica no es SQLite: se mantiene fuera de la aplicación")
+    try:
+        click.echo(f"Réplica actualizada: {refrescar_replica()}")
+    except CopiaReiniciada as e:
+        raise SystemExit(f"Réplica no actualizada: {e}")
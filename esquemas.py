@@ -0,0 +1,223 @@
+# esquemas.py
+# Validación y conversión de los registros que llegan en JSON.
+# Cada esquema se compila una sola vez a partir de las columnas del modelo
+# (tipo, longitud, nullable) y valida lotes completos en una pasada,
+# devolviendo todos los errores juntos en lugar de parar en el primero.
+from datetime import date, datetime, time
+
+from db import db
+from models import (
+    Cancion,
+    Correo,
+    CorreoProveedor,
+    DiscoMp3,
+    DiscoMp3Cancion,
+    Item,
+    Pedido,
+    Proveedor,
+    Recopilacion,
+    RecopilacionCancion,
+    Telefono,
+    TelefonoProveedor,
+    Usuario,
+    Valoracion,
+    Vinilo,
+    ViniloCancion,
+)
+
+# Columnas que mantiene el servidor y nunca se aceptan desde el cliente
+CAMPOS_SERVIDOR = {"version", "num_canciones", "duracion_total"}
+
+
+# -------- Conversores por tipo de columna --------
+def _entero(valor):
+    if isinstance(valor, bool):
+        raise ValueError("debe ser un entero")
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    try:
+        return int(valor.strip())
+    except (AttributeError, ValueError):
+        raise ValueError("debe ser un entero")
+
+
+def _numero(valor):
+    if isinstance(valor, bool):
+        raise ValueError("debe ser un número")
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        raise ValueError("debe ser un número")
+
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    if valor in (0, 1):
+        return bool(valor)
+    raise ValueError("debe ser true o false")
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ValueError("debe ser una fecha 'YYYY-MM-DD'")
+
+
+def _hora(valor):
+    try:
+        return time.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ValueError("debe ser una hora 'HH:MM:SS'")
+
+
+def _fecha_hora(valor):
+    try:
+        return datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ValueError("debe ser una fecha y hora ISO 8601")
+
+
+def _texto(longitud):
+    def convertir(valor):
+        if not isinstance(valor, str):
+            raise ValueError("debe ser texto")
+        if longitud and len(valor) > longitud:
+            raise ValueError(f"admite como máximo {longitud} caracteres")
+        return valor
+    return convertir
+
+
+def _con_restriccion(convertir, condicion, mensaje):
+    def comprobar(valor):
+        valor = convertir(valor)
+        if not condicion(valor):
+            raise ValueError(mensaje)
+        return valor
+    return comprobar
+
+
+def _conversor(tipo):
+    # El orden importa: DateTime antes que Date, Float antes que Numeric
+    if isinstance(tipo, db.Boolean):
+        return _booleano
+    if isinstance(tipo, db.Integer):
+        return _entero
+    if isinstance(tipo, db.Float) or isinstance(tipo, db.Numeric):
+        return _numero
+    if isinstance(tipo, db.DateTime):
+        return _fecha_hora
+    if isinstance(tipo, db.Date):
+        return _fecha
+    if isinstance(tipo, db.Time):
+        return _hora
+    if isinstance(tipo, db.String):
+        return _texto(tipo.length)
+    return lambda valor: valor
+
+
+class Esquema:
+    def __init__(self, modelo, requeridos=None, restricciones=None):
+        self.modelo = modelo
+        claves = list(modelo.__mapper__.primary_key)
+        autonumerica = len(claves) == 1 and isinstance(claves[0].type, db.Integer)
+
+        # (campo, conversor, requerido, admite_nulo, es_clave) compilados una sola vez
+        restricciones = restricciones or {}
+        self.campos = []
+        for columna in modelo.__table__.columns:
+            if columna.key in CAMPOS_SERVIDOR or (columna.primary_key and autonumerica):
+                continue
+            if requeridos is None:
+                requerido = not columna.nullable
+            else:
+                requerido = columna.key in requeridos or columna.primary_key
+            convertir = _conversor(columna.type)
+            if columna.key in restricciones:
+                convertir = _con_restriccion(convertir, *restricciones[columna.key])
+            admite_nulo = columna.nullable and not requerido
+            self.campos.append((columna.key, convertir, requerido, admite_nulo, columna.primary_key))
+        self.nombres = {c[0] for c in self.campos}
+
+    def validar(self, filas, parcial=False, estricto=False):
+        # Devuelve (filas convertidas, errores). Con parcial=True (PATCH) solo se
+        # validan los campos presentes y no se aceptan cambios de clave primaria.
+        # Con estricto=True los campos desconocidos también son error.
+        limpias, errores = [], []
+        campos = self.campos
+        for i, fila in enumerate(filas, start=1):
+            if not isinstance(fila, dict):
+                errores.append({"registro": i, "campo": None, "error": "debe ser un objeto JSON"})
+                continue
+
+            limpia = {}
+            for campo, convertir, requerido, admite_nulo, es_clave in campos:
+                if campo not in fila:
+                    if requerido and not parcial:
+                        errores.append({"registro": i, "campo": campo, "error": "es requerido"})
+                    continue
+                if parcial and es_clave:
+                    errores.append({"registro": i, "campo": campo, "error": "no se puede modificar"})
+                    continue
+                valor = fila[campo]
+                if valor is None or valor == "":
+                    if admite_nulo:
+                        limpia[campo] = None
+                    else:
+                        errores.append({"registro": i, "campo": campo, "error": "es requerido"})
+                    continue
+                try:
+                    limpia[campo] = convertir(valor)
+                except (TypeError, ValueError) as e:
+                    errores.append({"registro": i, "campo": campo, "error": str(e) or "valor inválido"})
+
+            if estricto:
+                for campo in fila:
+                    if campo not in self.nombres:
+                        errores.append({"registro": i, "campo": campo, "error": "no existe"})
+            limpias.append(limpia)
+        return limpias, errores
+
+
+# Campos obligatorios en las altas (los mismos que exigían los handlers)
+ESQUEMAS = {
+    Usuario: Esquema(Usuario, ("nombre", "contrasena")),
+    Telefono: Esquema(Telefono, ("telefono", "id_us")),
+    Correo: Esquema(Correo, ("correo", "id_us")),
+    Valoracion: Esquema(
+        Valoracion, ("id_pedido", "id_us"),
+        {"puntuacion": (lambda p: 1 <= p <= 5, "debe ser un entero entre 1 y 5")},
+    ),
+    DiscoMp3: Esquema(DiscoMp3, ("nombre", "duracion", "tamano", "precio", "id_item")),
+    Vinilo: Esquema(Vinilo, ("nombre", "artista", "anio_salida", "precio_unitario", "id_cancion", "id_proveedor", "id_item")),
+    Pedido: Esquema(Pedido, ("id_us", "fecha_pedido", "estado", "medio_pago", "id_item")),
+    DiscoMp3Cancion: Esquema(DiscoMp3Cancion),
+    Item: Esquema(Item, ("tipo_item", "cantidad")),
+    RecopilacionCancion: Esquema(RecopilacionCancion),
+    ViniloCancion: Esquema(ViniloCancion),
+    Proveedor: Esquema(Proveedor, ("nombre",)),
+    CorreoProveedor: Esquema(CorreoProveedor, ("correo", "id_proveedor")),
+    TelefonoProveedor: Esquema(TelefonoProveedor, ("telefono", "id_proveedor")),
+    Recopilacion: Esquema(Recopilacion, ("nombre", "id_us", "publica")),
+    Cancion: Esquema(Cancion, ("nombre", "duracion", "tamano")),
+}
+
+
+def validar(modelo, filas, parcial=False, estricto=False):
+    return ESQUEMAS[modelo].validar(filas, parcial, estricto)
+
+
+def describir(error):
+    if error["campo"] is None:
+        return error["error"]
+    return f"el campo '{error['campo']}' {error['error']}"
+
+
+def mensaje(errores):
+    # Resumen legible del primer error; la lista completa va en "errores"
+    e = errores[0]
+    extra = f" (y {len(errores) - 1} errores más)" if len(errores) > 1 else ""
+    return f"El registro #{e['registro']}: {describir(e)}{extra}"
@@ -0,0 +1,95 @@
+# estadisticas.py
+# Agregados de ventas calculados con GROUP BY en la base de datos
+from sqlalchemy import Integer, cast, func, select, union_all
+
+import archivo
+from db import db
+from models import DiscoMp3, Pedido, Vinilo
+
+def _semana_iso(fecha):
+    # Semana ISO 8601 ("2024-W01"). SQLite no tiene %G/%V y %W cuenta desde el
+    # primer lunes del año: el año y la semana ISO son los del jueves de esa semana
+    jueves = func.date(fecha, "-3 days", "weekday 4")
+    semana = (cast(func.strftime("%j", jueves), Integer) - 1) // 7 + 1
+    return func.printf("%s-W%02d", func.strftime("%Y", jueves), semana)
+
+
+# Agrupaciones permitidas en ?group_by=: expresión de cada periodo sobre la fecha
+PERIODOS = {
+    "day": lambda fecha: func.strftime("%Y-%m-%d", fecha),
+    "week": _semana_iso,
+    "month": lambda fecha: func.strftime("%Y-%m", fecha),
+}
+CAMPOS = {
+    "estado": Pedido.estado,
+    "medio_pago": Pedido.medio_pago,
+    "id_item": Pedido.id_item,
+}
+
+
+def _precio_por_item():
+    # Precio de cada item: el del vinilo o disco mp3 que lo representa
+    precios = union_all(
+        select(Vinilo.id_item.label("id_item"), Vinilo.precio_unitario.label("precio")),
+        select(DiscoMp3.id_item.label("id_item"), DiscoMp3.precio.label("precio")),
+    ).subquery()
+    return (
+        select(precios.c.id_item, func.max(precios.c.precio).label("precio"))
+        .group_by(precios.c.id_item)
+        .subquery()
+    )
+
+
+def estadisticas_pedidos(group_by, desde=None, hasta=None, top=None):
+    # Devuelve el resultado en formato columnar: {"columnas": [...], "<columna>": [valores...]}
+    claves = []
+    for nombre in group_by:
+        if nombre in PERIODOS:
+            claves.append(PERIODOS[nombre](Pedido.fecha_pedido).label(nombre))
+        elif nombre in CAMPOS:
+            claves.append(CAMPOS[nombre].label(nombre))
+        else:
+            raise ValueError(
+                f"group_by desconocido '{nombre}' (use {', '.join([*PERIODOS, *CAMPOS])})"
+            )
+
+    precio = _precio_por_item()
+    consulta = (
+        select(
+            *claves,
+            func.count(Pedido.id_pedido).label("pedidos"),
+            func.round(func.coalesce(func.sum(precio.c.precio), 0), 2).label("ingresos"),
+        )
+        .select_from(Pedido)
+        .outerjoin(precio, precio.c.id_item == Pedido.id_item)
+        .group_by(*claves)
+        .order_by(*claves)
+    )
+    # El filtro por fecha usa el índice (fecha_pedido, estado)
+    if desde is not None:
+        consulta = consulta.where(Pedido.fecha_pedido >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Pedido.fecha_pedido <= hasta)
+    # Los pedidos archivados solo se leen si "desde" llega hasta ellos
+    consulta = archivo.incluir(consulta, desde)
+
+    columnas = [*group_by, "pedidos", "ingresos"]
+    if top is not None:
+        # Top N por ingresos dentro de cada grupo de las demás claves (p. ej. top items por mes)
+        sub = consulta.subquery()
+        particion = [sub.c[n] for n in group_by if n != "id_item"]
+        rango = func.row_number().over(
+            partition_by=particion or None, order_by=sub.c.ingresos.desc()
+        ).label("rango")
+        ranqueado = select(sub, rango).subquery()
+        consulta = (
+            select(*(ranqueado.c[n] for n in columnas))
+            .where(ranqueado.c.rango <= top)
+            .order_by(*(ranqueado.c[n] for n in group_by if n != "id_item"), ranqueado.c.rango)
+        )
+
+    filas = db.session.execute(consulta).all()
+    resultado = {"columnas": columnas, "filas": len(filas)}
+    for i, nombre in enumerate(columnas):
+        resultado[nombre] = [f[i] for f in filas]
+    return resultado
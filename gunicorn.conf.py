@@ -0,0 +1,69 @@
+# gunicorn.conf.py
+# Servidor de producción multiproceso:  gunicorn app:app
+# (gunicorn carga este archivo automáticamente desde el directorio actual)
+import os
+
+from sqlalchemy import text
+
+import limites
+import programador
+
+_cpus = os.cpu_count() or 1
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+# Procesos para usar todos los núcleos; hilos para solapar la espera de E/S de SQLite
+workers = int(os.environ.get("GUNICORN_WORKERS", 2 * _cpus + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 2 if _cpus > 1 else 4))
+worker_class = "gthread"
+# La aplicación se importa una vez en el proceso maestro y los workers la
+# heredan con copy-on-write (modelos, esquemas, índices en memoria)
+preload_app = True
+# Las tareas periódicas (respaldos, mantenimiento...) arrancan en post_fork,
+# dentro de los workers: los hilos creados en el maestro no pasan a los hijos
+programador.diferir = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+keepalive = 5
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+
+def _motores(app):
+    from db import db
+
+    with app.app_context():
+        return dict(db.engines)
+
+
+def when_ready(server):
+    # Antes del fork: WAL deja leer a otros procesos mientras uno escribe
+    # (el modo es persistente en el archivo). Después se cierran las
+    # conexiones del maestro para que ningún worker herede un handle abierto.
+    app = server.app.wsgi()
+    motores = _motores(app)
+    principal = motores[None]
+    if principal.dialect.name == "sqlite":
+        with principal.connect() as conexion:
+            conexion.execute(text("PRAGMA journal_mode=WAL"))
+    for motor in motores.values():
+        motor.dispose()
+
+    # server.cfg.workers: el número efectivo (GUNICORN_WORKERS, -w o WEB_CONCURRENCY)
+    # LIMITES_ESCRITURAS es el tope de todos los workers: cada uno admite su parte
+    limites.repartir_escrituras(app, server.cfg.workers)
+    if server.cfg.workers > 1:
+        # Las cachés en memoria solo se invalidan en el proceso que escribe
+        app.config["BIBLIOTECA_CACHE"] = False
+        # El índice de similares de cada worker solo ve sus propios commits:
+        # se reconstruye periódicamente para recoger los de los demás
+        if not app.config["RECOMENDACIONES_MAX_EDAD"]:
+            app.config["RECOMENDACIONES_MAX_EDAD"] = 300
+
+
+def post_fork(server, worker):
+    # Cada worker abre su propio pool; close=False no toca las conexiones del padre
+    app = server.app.wsgi()
+    for motor in _motores(app).values():
+        motor.dispose(close=False)
+    # Todos los workers las arrancan; el cerrojo de programador hace que cada
+    # tarea se ejecute en uno solo
+    programador.iniciar(app)
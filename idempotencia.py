@@ -0,0 +1,227 @@
+# idempotencia.py
+# Cabecera Idempotency-Key en las rutas de alta (POST de cada recurso y
+# /api/batch): la primera petición con una clave se ejecuta y su respuesta
+# (estado y cuerpo comprimido) se guarda en la tabla "idempotencia"; los
+# reintentos con la misma clave reciben esa respuesta sin volver a insertar.
+# Un duplicado que llega mientras la primera sigue en curso espera a que
+# termine. Las claves caducan a las IDEMPOTENCIA_TTL segundos.
+# La clave se marca "confirmada" en el mismo commit que las escrituras de la
+# vista: si el proceso muere antes de guardar la respuesta, la clave no se
+# reclama nunca (un reintento no puede volver a insertar).
+import hashlib
+import threading
+import time
+import zlib
+
+import click
+from flask import current_app, g, has_request_context, jsonify, request
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, select
+
+import programador
+import recursos
+from db import db
+from models import Idempotencia
+
+CABECERA = "Idempotency-Key"
+LONGITUD_MAXIMA = 200
+TABLA = Idempotencia.__table__
+
+_eventos = {}  # clave -> Event de las peticiones en curso en este proceso
+_lock = threading.Lock()
+
+
+def huella():
+    # Misma clave con otra petición (otra ruta u otro cuerpo) es un error del cliente
+    h = hashlib.sha256()
+    for parte in (request.method.encode(), request.full_path.encode(), request.get_data(cache=True)):
+        h.update(parte)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _motor():
+    # Siempre la base principal: la réplica de lectura podría ir retrasada
+    return db.engines[None]
+
+
+def _leer(clave):
+    with _motor().connect() as conexion:
+        return conexion.execute(select(TABLA).where(TABLA.c.clave == clave)).first()
+
+
+def _reservar(clave, mia):
+    # Inserta la clave "en curso"; si ya existe devuelve su fila. La primera
+    # sentencia es de escritura, así que dos procesos no pueden reservar a la vez.
+    ahora = time.time()
+    config = current_app.config
+    with _motor().begin() as conexion:
+        # Caducadas o abandonadas (el proceso murió antes de confirmar la vista)
+        conexion.execute(delete(TABLA).where(
+            TABLA.c.clave == clave,
+            (TABLA.c.expira < ahora)
+            | (
+                TABLA.c.estado.is_(None)
+                & TABLA.c.confirmada.is_(False)
+                & (TABLA.c.creada < ahora - config["IDEMPOTENCIA_ABANDONO"])
+            ),
+        ))
+        insertada = conexion.execute(TABLA.insert().prefix_with("OR IGNORE").values(
+            clave=clave, huella=mia, creada=ahora, expira=ahora + config["IDEMPOTENCIA_TTL"],
+        )).rowcount
+        if insertada:
+            return None
+        return conexion.execute(select(TABLA).where(TABLA.c.clave == clave)).first()
+
+
+def _esperar(clave, segundos):
+    # Hasta que la petición original guarde su respuesta (o desaparezca)
+    fin = time.monotonic() + segundos
+    while True:
+        evento = _eventos.get(clave)
+        if evento is not None:
+            evento.wait(max(0.0, fin - time.monotonic()))
+        fila = _leer(clave)
+        if fila is None or fila.estado is not None or time.monotonic() >= fin:
+            return fila
+        time.sleep(0.05)  # la original está en otro proceso
+
+
+def _error(estado, mensaje, **cabeceras):
+    respuesta = jsonify(error=mensaje)
+    respuesta.status_code = estado
+    respuesta.headers.update(cabeceras)
+    return respuesta
+
+
+def _perdida(fila):
+    # Confirmada pero sin respuesta y ya nadie la va a guardar
+    return fila.confirmada and fila.creada < time.time() - current_app.config["IDEMPOTENCIA_ABANDONO"]
+
+
+def _repetir(fila):
+    respuesta = current_app.response_class(zlib.decompress(fila.cuerpo), status=fila.estado, mimetype=fila.tipo)
+    respuesta.headers["Idempotent-Replayed"] = "true"
+    return respuesta
+
+
+def _comenzar():
+    if request.method != "POST" or request.endpoint not in current_app.extensions["idempotencia"]:
+        return None
+    clave = request.headers.get(CABECERA)
+    if clave is None:
+        return None
+    if not clave or len(clave) > LONGITUD_MAXIMA:
+        return _error(400, f"{CABECERA} debe tener entre 1 y {LONGITUD_MAXIMA} caracteres")
+
+    mia = huella()
+    for _ in range(2):
+        fila = _reservar(clave, mia)
+        if fila is None:
+            with _lock:
+                _eventos[clave] = threading.Event()
+            g.idempotencia = clave
+            return None
+        if fila.huella != mia:
+            return _error(422, f"La {CABECERA} ya se usó con otra petición")
+        if fila.estado is None:
+            fila = _esperar(clave, current_app.config["IDEMPOTENCIA_ESPERA"])
+            if fila is None:
+                continue  # la original falló y liberó la clave: esta la reintenta
+            if fila.estado is None:
+                if _perdida(fila):
+                    return _error(409, "La petición original se confirmó pero su respuesta no se guardó; "
+                                       "consulte el recurso antes de repetirla con otra clave")
+                return _error(409, "Ya hay una petición en curso con esta clave", **{"Retry-After": "1"})
+        return _repetir(fila)
+    return _error(409, "Ya hay una petición en curso con esta clave", **{"Retry-After": "1"})
+
+
+def _guardar(respuesta):
+    clave = g.get("idempotencia")
+    if clave is None:
+        return respuesta
+    if respuesta.status_code >= 500 and not g.get("idempotencia_confirmada"):
+        return respuesta  # no se guarda: _liberar borra la clave y el reintento se ejecuta
+    with _motor().begin() as conexion:
+        conexion.execute(TABLA.update().where(TABLA.c.clave == clave).values(
+            estado=respuesta.status_code,
+            tipo=respuesta.mimetype,
+            cuerpo=zlib.compress(respuesta.get_data()),
+        ))
+    g.idempotencia_guardada = True
+    return respuesta
+
+
+def _liberar(_error):
+    clave = g.pop("idempotencia", None)
+    if clave is None:
+        return
+    if not g.pop("idempotencia_guardada", False):
+        # Una clave confirmada se queda: la vista escribió y repetirla duplicaría
+        with _motor().begin() as conexion:
+            conexion.execute(delete(TABLA).where(
+                TABLA.c.clave == clave, TABLA.c.estado.is_(None), TABLA.c.confirmada.is_(False),
+            ))
+    g.pop("idempotencia_confirmada", None)
+    with _lock:
+        evento = _eventos.pop(clave, None)
+    if evento is not None:
+        evento.set()
+
+
+# -------- Confirmación en la transacción de la vista --------
+@event.listens_for(db.session, "before_commit")
+def _marcar_confirmada(session):
+    if not has_request_context() or g.get("idempotencia") is None or g.get("idempotencia_confirmada"):
+        return
+    session.execute(TABLA.update().where(TABLA.c.clave == g.idempotencia).values(confirmada=True))
+    session.info["idempotencia"] = True
+
+
+@event.listens_for(db.session, "after_commit")
+def _confirmada(session):
+    if session.info.pop("idempotencia", False):
+        g.idempotencia_confirmada = True
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _descartar(session, transaccion_previa):
+    session.info.pop("idempotencia", None)
+
+
+def purgar(trozo=5000):
+    # Borra las claves caducadas por trozos para no retener el escritor
+    total = 0
+    while True:
+        with _motor().begin() as conexion:
+            caducadas = select(TABLA.c.clave).where(TABLA.c.expira < time.time()).limit(trozo)
+            borradas = conexion.execute(delete(TABLA).where(TABLA.c.clave.in_(caducadas))).rowcount
+        total += borradas
+        if borradas < trozo:
+            return total
+
+
+# -------- Comandos CLI --------
+cli = AppGroup("idempotencia", help="Claves de idempotencia de las rutas de alta.")
+
+
+@cli.command("purgar")
+def purgar_comando():
+    """Borra las claves de idempotencia caducadas."""
+    click.echo(f"{purgar()} claves caducadas borradas")
+
+
+def init_app(app):
+    # Después de recursos.init_app (usa sus endpoints de alta) y de compresion.init_app:
+    # after_request va en orden inverso, así que se guarda el cuerpo sin comprimir
+    app.config.setdefault("IDEMPOTENCIA_TTL", 24 * 3600)  # segundos que se conserva cada clave
+    app.config.setdefault("IDEMPOTENCIA_ESPERA", 10)  # segundos que espera un duplicado concurrente
+    app.config.setdefault("IDEMPOTENCIA_ABANDONO", 300)  # segundos tras los que una clave en curso se da por perdida
+    app.config.setdefault("IDEMPOTENCIA_INTERVALO", 0)  # segundos entre purgas (0: solo "flask idempotencia purgar")
+    app.extensions["idempotencia"] = {f"create_{r.nombre}" for r in recursos.RECURSOS} | {"batch"}
+    app.before_request(_comenzar)
+    app.after_request(_guardar)
+    app.teardown_request(_liberar)
+    app.cli.add_command(cli)
+    programador.programar(app, "idempotencia", app.config["IDEMPOTENCIA_INTERVALO"], purgar)
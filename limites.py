@@ -0,0 +1,226 @@
+# limites.py
+# Control de admisión para que un cliente no acapare el único escritor de SQLite:
+#   - cubetas de fichas (token bucket) por cliente y por cliente+ruta -> 429
+#   - tope de escrituras concurrentes con una cola de espera acotada -> 503
+# Ambas respuestas llevan Retry-After. Las cubetas viven en memoria del proceso
+# o, con varios workers, en un backend compartido (LIMITES_BACKEND).
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from importlib import import_module
+
+from flask import current_app, g, jsonify, request
+
+METODOS_ESCRITURA = {"POST", "PUT", "PATCH", "DELETE"}
+
+# asgi.py ya tomó las fichas de esta petición antes de pasarla a Flask. Es una
+# variable de contexto (asgiref la copia al hilo de WSGI), no una cabecera: el
+# cliente no puede fijarla.
+fichas_tomadas = ContextVar("fichas_tomadas", default=False)
+
+
+# -------- Backends de cubetas --------
+# Un backend implementa tomar(clave, capacidad, tasa, costo=1) -> segundos de
+# espera hasta poder tomar "costo" fichas (0 si se tomaron).
+def _rellenar(fichas, instante, ahora, capacidad, tasa):
+    return min(capacidad, fichas + (ahora - instante) * tasa)
+
+
+def _consumir(fichas, capacidad, tasa, costo):
+    # -> (fichas restantes, espera)
+    if fichas >= costo:
+        return fichas - costo, 0.0
+    return fichas, (costo - fichas) / tasa
+
+
+class BackendMemoria:
+    # Cubetas en un diccionario del proceso (con gunicorn, una por worker)
+    def __init__(self, app=None, max_claves=100000):
+        self.max_claves = max_claves
+        self._cubetas = {}  # clave -> [fichas, instante, capacidad, tasa]
+        self._lock = threading.Lock()
+
+    def tomar(self, clave, capacidad, tasa, costo=1):
+        ahora = time.monotonic()
+        with self._lock:
+            cubeta = self._cubetas.get(clave)
+            fichas = capacidad if cubeta is None else _rellenar(cubeta[0], cubeta[1], ahora, capacidad, tasa)
+            fichas, espera = _consumir(fichas, capacidad, tasa, costo)
+            self._cubetas[clave] = [fichas, ahora, capacidad, tasa]
+            if len(self._cubetas) > self.max_claves:
+                self._podar(ahora)
+            return espera
+
+    def _podar(self, ahora):
+        # Una cubeta que ya se habría llenado equivale a no tenerla
+        llenas = [
+            clave for clave, (fichas, instante, capacidad, tasa) in self._cubetas.items()
+            if _rellenar(fichas, instante, ahora, capacidad, tasa) >= capacidad
+        ]
+        for clave in llenas:
+            del self._cubetas[clave]
+
+
+class BackendSQLite:
+    # Cubetas compartidas entre procesos en un archivo SQLite aparte (instance/limites.db)
+    def __init__(self, app, ruta=None):
+        self.ruta = ruta or os.path.join(app.instance_path, "limites.db")
+        os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+        self._local = threading.local()
+        with self._conexion() as conexion:
+            conexion.execute("PRAGMA journal_mode = WAL")
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS cubeta (clave TEXT PRIMARY KEY, fichas REAL, instante REAL)"
+            )
+
+    def _conexion(self):
+        if not hasattr(self._local, "conexion"):
+            self._local.conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+        return self._local.conexion
+
+    def tomar(self, clave, capacidad, tasa, costo=1):
+        conexion = self._conexion()
+        ahora = time.time()  # reloj común a todos los procesos
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conexion.execute("SELECT fichas, instante FROM cubeta WHERE clave = ?", (clave,)).fetchone()
+            fichas = capacidad if fila is None else _rellenar(fila[0], fila[1], ahora, capacidad, tasa)
+            fichas, espera = _consumir(fichas, capacidad, tasa, costo)
+            conexion.execute(
+                "INSERT OR REPLACE INTO cubeta (clave, fichas, instante) VALUES (?, ?, ?)",
+                (clave, fichas, ahora),
+            )
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        return espera
+
+
+BACKENDS = {"memoria": BackendMemoria, "sqlite": BackendSQLite}
+
+
+def crear_backend(app):
+    # LIMITES_BACKEND: "memoria", "sqlite" o "modulo:Clase" (se construye con la app)
+    nombre = app.config["LIMITES_BACKEND"]
+    if nombre in BACKENDS:
+        return BACKENDS[nombre](app)
+    modulo, _, clase = nombre.partition(":")
+    return getattr(import_module(modulo), clase)(app)
+
+
+# -------- Escrituras concurrentes --------
+class Admision:
+    # Como mucho "maximo" escrituras a la vez y "cola" esperando; el resto se rechaza
+    def __init__(self, maximo, cola, espera):
+        self.maximo = maximo
+        self.cola = cola
+        self.espera = espera  # segundos máximos en la cola
+        self.en_curso = 0
+        self.esperando = 0
+        self._condicion = threading.Condition()
+
+    def entrar(self):
+        with self._condicion:
+            if self.en_curso < self.maximo:
+                self.en_curso += 1
+                return True
+            if self.esperando >= self.cola:
+                return False
+            self.esperando += 1
+            try:
+                admitida = self._condicion.wait_for(lambda: self.en_curso < self.maximo, self.espera)
+            finally:
+                self.esperando -= 1
+            if admitida:
+                self.en_curso += 1
+            return admitida
+
+    def salir(self):
+        with self._condicion:
+            self.en_curso -= 1
+            self._condicion.notify()
+
+
+def repartir_escrituras(app, procesos):
+    # Admision es un semáforo de cada proceso: con varios workers (gunicorn.conf.py)
+    # cada uno admite su parte de los topes para no superar el total configurado
+    maximo = app.config["LIMITES_ESCRITURAS"]
+    app.extensions["limites"]["admision"] = Admision(
+        max(1, maximo // procesos),
+        app.config["LIMITES_COLA_ESCRITURAS"] // procesos,
+        app.config["LIMITES_ESPERA_ESCRITURA"],
+    ) if maximo else None
+
+
+# -------- Ganchos de la aplicación --------
+def cliente():
+    # Cabecera configurada (p. ej. una API key) o, en su defecto, la IP
+    cabecera = current_app.config["LIMITES_CABECERA_CLIENTE"]
+    return (cabecera and request.headers.get(cabecera)) or request.remote_addr or "-"
+
+
+def rechazar(estado, mensaje, espera):
+    respuesta = jsonify(error=mensaje)
+    respuesta.status_code = estado
+    respuesta.headers["Retry-After"] = str(max(1, math.ceil(espera)))
+    return respuesta
+
+
+def tomar_fichas(config, backend, quien, endpoint):
+    # Cubetas del cliente y de cliente+ruta -> segundos de espera (0: admitida).
+    # No usa la petición de Flask: asgi.py la llama para las lecturas asíncronas.
+    reglas = []
+    if config["LIMITES_POR_CLIENTE"]:
+        reglas.append((f"c:{quien}", *config["LIMITES_POR_CLIENTE"]))
+    if endpoint in config["LIMITES_RUTAS"]:
+        reglas.append((f"r:{quien}:{endpoint}", *config["LIMITES_RUTAS"][endpoint]))
+    for clave, capacidad, tasa in reglas:
+        espera = backend.tomar(clave, capacidad, tasa)
+        if espera:
+            return espera
+    return 0
+
+
+def _admitir():
+    config = current_app.config
+    if request.endpoint in config["LIMITES_EXENTOS"]:
+        return None
+    extension = current_app.extensions["limites"]
+
+    if not fichas_tomadas.get():
+        espera = tomar_fichas(config, extension["backend"], cliente(), request.endpoint)
+        if espera:
+            return rechazar(429, "Demasiadas peticiones", espera)
+
+    admision = extension["admision"]
+    if admision is not None and request.method in METODOS_ESCRITURA:
+        if not admision.entrar():
+            return rechazar(503, "Servidor ocupado con otras escrituras", config["LIMITES_ESPERA_ESCRITURA"])
+        g.escritura_admitida = True
+    return None
+
+
+def _liberar(_error):
+    if g.pop("escritura_admitida", False):
+        current_app.extensions["limites"]["admision"].salir()
+
+
+def init_app(app):
+    app.config.setdefault("LIMITES_BACKEND", "memoria")  # memoria | sqlite | "modulo:Clase"
+    app.config.setdefault("LIMITES_CABECERA_CLIENTE", None)  # p. ej. "X-Api-Key" (None: IP del cliente)
+    app.config.setdefault("LIMITES_POR_CLIENTE", None)  # [capacidad, fichas por segundo] (None: sin límite)
+    app.config.setdefault("LIMITES_RUTAS", {})  # {endpoint: [capacidad, fichas por segundo]}, p. ej. {"batch": [5, 0.5]}
+    app.config.setdefault("LIMITES_EXENTOS", ["health"])
+    app.config.setdefault("LIMITES_ESCRITURAS", 0)  # escrituras concurrentes en total (0: sin tope)
+    app.config.setdefault("LIMITES_COLA_ESCRITURAS", 16)  # escrituras esperando turno en total
+    app.config.setdefault("LIMITES_ESPERA_ESCRITURA", 2.0)  # segundos máximos en la cola
+    app.config["LIMITES_EXENTOS"] = set(app.config["LIMITES_EXENTOS"])
+
+    app.extensions["limites"] = {"backend": crear_backend(app), "admision": None}
+    repartir_escrituras(app, 1)
+    app.before_request(_admitir)
+    app.teardown_request(_liberar)
@@ -0,0 +1,204 @@
+# mantenimiento.py
+# Mantenimiento periódico de la base SQLite:
+#   - PRAGMA optimize: reanaliza solo las tablas cuyas estadísticas lo
+#     necesitan (con analysis_limit el ANALYZE de cada índice está acotado)
+#   - PRAGMA incremental_vacuum: devuelve al sistema las páginas libres que
+#     dejan los borrados masivos, por pasos de pocas páginas con pausa entre
+#     pasos, para no bloquear a los escritores
+# La tarea periódica solo corre dentro de la ventana de poco tráfico
+# (MANTENIMIENTO_VENTANA) y se puede lanzar a mano con "flask mantenimiento".
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+import programador
+from db import db
+
+MODOS_AUTO_VACUUM = {0: "none", 1: "full", 2: "incremental"}
+
+_en_curso = threading.Lock()
+ultimo = {}  # resultado (o error) del último mantenimiento de este proceso
+
+
+class MantenimientoEnCurso(Exception):
+    pass
+
+
+def _conexion():
+    # Cada PRAGMA en su propia transacción corta
+    return db.engines[None].connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _pragma(conexion, nombre):
+    return conexion.exec_driver_sql(f"PRAGMA {nombre}").scalar()
+
+
+def paginas(conexion=None):
+    # Tamaño del archivo y páginas libres (lo que recuperaría un vacuum)
+    if conexion is None:
+        with _conexion() as conexion:
+            return paginas(conexion)
+    total = _pragma(conexion, "page_count")
+    libres = _pragma(conexion, "freelist_count")
+    return {
+        "paginas": total,
+        "libres": libres,
+        "tamano_pagina": _pragma(conexion, "page_size"),
+        "fragmentacion": round(libres / total, 4) if total else 0.0,
+        "auto_vacuum": MODOS_AUTO_VACUUM.get(_pragma(conexion, "auto_vacuum")),
+    }
+
+
+def en_ventana(ahora=None):
+    # MANTENIMIENTO_VENTANA = [desde, hasta] en horas locales (p. ej. [2, 5]; [22, 4] cruza medianoche)
+    ventana = current_app.config["MANTENIMIENTO_VENTANA"]
+    if not ventana:
+        return True
+    desde, hasta = ventana
+    hora = (ahora or datetime.now()).hour
+    return desde <= hora < hasta if desde <= hasta else hora >= desde or hora < hasta
+
+
+def ejecutar(paginas_paso=None, max_pasos=None, pausa=None):
+    config = current_app.config
+    paginas_paso = paginas_paso or config["MANTENIMIENTO_PAGINAS"]
+    max_pasos = max_pasos or config["MANTENIMIENTO_MAX_PASOS"]
+    pausa = config["MANTENIMIENTO_PAUSA"] if pausa is None else pausa
+
+    if not _en_curso.acquire(blocking=False):
+        raise MantenimientoEnCurso("Ya hay un mantenimiento en curso")
+    try:
+        inicio = time.perf_counter()
+        with _conexion() as conexion:
+            antes = paginas(conexion)
+
+            conexion.exec_driver_sql(f"PRAGMA analysis_limit = {int(config['MANTENIMIENTO_ANALYSIS_LIMIT'])}")
+            conexion.exec_driver_sql("PRAGMA optimize").all()
+            segundos_optimize = time.perf_counter() - inicio
+
+            pasos = 0
+            if antes["auto_vacuum"] == "incremental":
+                # executescript avanza la sentencia hasta el final: con execute()
+                # sqlite3 solo da un paso y libera una única página
+                sqlite = conexion.connection.driver_connection
+                while pasos < max_pasos and _pragma(conexion, "freelist_count"):
+                    sqlite.executescript(f"PRAGMA incremental_vacuum({int(paginas_paso)});")
+                    pasos += 1
+                    if pausa:
+                        time.sleep(pausa)
+            despues = paginas(conexion)
+
+        resultado = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "segundos_optimize": round(segundos_optimize, 3),
+            "pasos_vacuum": pasos,
+            "paginas_liberadas": antes["paginas"] - despues["paginas"],
+            "libres_antes": antes["libres"],
+            "libres_despues": despues["libres"],
+        }
+        if antes["auto_vacuum"] != "incremental":
+            resultado["aviso"] = "auto_vacuum no es incremental: ejecute 'flask mantenimiento activar-incremental'"
+        ultimo.clear()
+        ultimo.update(resultado)
+        return resultado
+    except Exception as e:
+        ultimo.clear()
+        ultimo.update(error=str(e), fecha=datetime.now().isoformat(timespec="seconds"))
+        raise
+    finally:
+        _en_curso.release()
+
+
+def en_curso():
+    return _en_curso.locked()
+
+
+def ejecutar_en_segundo_plano(app, **opciones):
+    if en_curso():
+        raise MantenimientoEnCurso("Ya hay un mantenimiento en curso")
+
+    def trabajo():
+        with app.app_context():
+            try:
+                ejecutar(**opciones)
+            except Exception:
+                app.logger.exception("Error en el mantenimiento de la base de datos")
+
+    threading.Thread(target=trabajo, name="mantenimiento", daemon=True).start()
+
+
+def programado():
+    # Tarea periódica: fuera de la ventana de poco tráfico no hace nada
+    if en_ventana():
+        ejecutar()
+
+
+def activar_incremental():
+    # Cambiar auto_vacuum en una base con tablas exige reescribirla entera
+    # (VACUUM): bloquea la base mientras dura, hágase en una parada.
+    with _conexion() as conexion:
+        conexion.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conexion.exec_driver_sql("VACUUM")
+        return paginas(conexion)
+
+
+# -------- Comandos CLI --------
+cli = AppGroup("mantenimiento", help="Mantenimiento de la base de datos (optimize y vacuum incremental).")
+
+
+@cli.command("ejecutar")
+@click.option("--paginas", type=int, help="Páginas liberadas por paso de vacuum.")
+@click.option("--max-pasos", type=int, help="Máximo de pasos de vacuum.")
+@click.option("--pausa", type=float, help="Segundos de pausa entre pasos.")
+def ejecutar_comando(paginas, max_pasos, pausa):
+    """Ejecuta PRAGMA optimize y el vacuum incremental ahora."""
+    r = ejecutar(paginas, max_pasos, pausa)
+    click.echo(
+        f"optimize en {r['segundos_optimize']} s; vacuum: {r['pasos_vacuum']} pasos, "
+        f"{r['paginas_liberadas']} páginas liberadas, {r['libres_despues']} libres"
+    )
+    if "aviso" in r:
+        click.echo(r["aviso"])
+
+
+@cli.command("estado")
+def estado_comando():
+    """Muestra el tamaño de la base y sus páginas libres."""
+    p = paginas()
+    click.echo(
+        f"{p['paginas']} páginas de {p['tamano_pagina']} bytes, {p['libres']} libres "
+        f"({p['fragmentacion']:.1%}); auto_vacuum: {p['auto_vacuum']}"
+    )
+
+
+@cli.command("activar-incremental")
+def activar_incremental_comando():
+    """Pasa la base a auto_vacuum=INCREMENTAL (reescribe el archivo con VACUUM)."""
+    p = activar_incremental()
+    click.echo(f"auto_vacuum: {p['auto_vacuum']}; {p['paginas']} páginas")
+
+
+def init_app(app):
+    app.config.setdefault("MANTENIMIENTO_INTERVALO", 0)  # segundos entre ejecuciones automáticas (0: desactivado)
+    app.config.setdefault("MANTENIMIENTO_VENTANA", None)  # [hora_desde, hora_hasta] de poco tráfico (None: siempre)
+    app.config.setdefault("MANTENIMIENTO_PAGINAS", 256)  # páginas por paso de incremental_vacuum
+    app.config.setdefault("MANTENIMIENTO_MAX_PASOS", 400)  # tope de pasos por ejecución (~400 MB con páginas de 4 KB)
+    app.config.setdefault("MANTENIMIENTO_PAUSA", 0.05)  # segundos entre pasos
+    app.config.setdefault("MANTENIMIENTO_ANALYSIS_LIMIT", 1000)  # filas muestreadas por índice en el ANALYZE
+    app.cli.add_command(cli)
+
+    with app.app_context():
+        motor = db.engines[None]
+    if motor.dialect.name == "sqlite":
+        # Solo surte efecto al crear la base; en una existente, "activar-incremental"
+        @event.listens_for(motor, "connect")
+        def _auto_vacuum(conexion, _registro):
+            conexion.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    programador.programar(app, "mantenimiento", app.config["MANTENIMIENTO_INTERVALO"], programado)
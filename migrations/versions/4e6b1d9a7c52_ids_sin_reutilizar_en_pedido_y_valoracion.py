@@ -0,0 +1,32 @@
+"""ids sin reutilizar en pedido y valoracion
+
+Revision ID: 4e6b1d9a7c52
+Revises: 0c8f27e5b9d1
+Create Date: 2026-10-19 16:02:41.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e6b1d9a7c52'
+down_revision = '0c8f27e5b9d1'
+branch_labels = None
+depends_on = None
+
+# Al archivar se borran los pedidos con los ids más altos: sin AUTOINCREMENT
+# SQLite volvería a asignarlos y chocarían con los del archivo.
+TABLAS = ['pedido', 'valoracion']
+
+
+def upgrade():
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla, recreate='always', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+            pass
+
+
+def downgrade():
+    for tabla in reversed(TABLAS):
+        with op.batch_alter_table(tabla, recreate='always', table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+            pass
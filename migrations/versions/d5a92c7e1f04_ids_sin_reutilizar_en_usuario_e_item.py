@@ -0,0 +1,33 @@
+"""ids sin reutilizar en usuario e item
+
+Revision ID: d5a92c7e1f04
+Revises: b8e13f6a4d27
+Create Date: 2026-10-19 22:41:09.527318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a92c7e1f04'
+down_revision = 'b8e13f6a4d27'
+branch_labels = None
+depends_on = None
+
+# Los pedidos y valoraciones archivados conservan id_us/id_item sin clave
+# foránea: si SQLite reasignara el id de un usuario o ítem borrado, el registro
+# nuevo heredaría su historial archivado.
+TABLAS = ['usuario', 'item']
+
+
+def upgrade():
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla, recreate='always', table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+            pass
+
+
+def downgrade():
+    for tabla in reversed(TABLAS):
+        with op.batch_alter_table(tabla, recreate='always', table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+            pass
@@ -1,11 +1,25 @@
 # models.py
 from db import db
 
+
+def segundos_sql(columna):
+    # Segundos de una columna Time calculados en SQLite (se guarda como 'HH:MM:SS.ffffff')
+    return db.func.strftime("%s", columna) - db.func.strftime("%s", "00:00:00")
+
+
+def formato_duracion(segundos):
+    segundos = int(segundos or 0)
+    return f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+
 class Usuario(db.Model):
     __tablename__ = "usuario"
+    # AUTOINCREMENT: un usuario nuevo no hereda el historial archivado de uno borrado
+    __table_args__ = {"sqlite_autoincrement": True}
     id_usuario = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
     contrasena = db.Column(db.String(100), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}  # bloqueo optimista: UPDATE ... WHERE version = ?
 
     telefonos = db.relationship("Telefono", backref="usuario", cascade="all, delete-orphan")
     correos = db.relationship("Correo", backref="usuario", cascade="all, delete-orphan")
@@ -21,6 +35,8 @@ class Telefono(db.Model):
     __tablename__ = "telefono"
     telefono = db.Column(db.String(20), primary_key=True)
     id_us = db.Column(db.Integer, db.ForeignKey("usuario.id_usuario"), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     def to_dict(self):
         return {"telefono": self.telefono, "id_us": self.id_us}
@@ -30,6 +46,8 @@ class Correo(db.Model):
     __tablename__ = "correo"
     correo = db.Column(db.String(120), primary_key=True)
     id_us = db.Column(db.Integer, db.ForeignKey("usuario.id_usuario"), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     def to_dict(self):
         return {"correo": self.correo, "id_us": self.id_us}
@@ -37,12 +55,19 @@ class Correo(db.Model):
 
 class Pedido(db.Model):
     __tablename__ = "pedido"
+    # AUTOINCREMENT: los ids de pedidos archivados (archivo.py) no se reutilizan
+    __table_args__ = (
+        db.Index("ix_pedido_fecha_estado", "fecha_pedido", "estado"),
+        {"sqlite_autoincrement": True},
+    )
     id_pedido = db.Column(db.Integer, primary_key=True)
-    id_us = db.Column(db.Integer, db.ForeignKey("usuario.id_usuario"), nullable=False)
+    id_us = db.Column(db.Integer, db.ForeignKey("usuario.id_usuario"), nullable=False, index=True)
     fecha_pedido = db.Column(db.Date)
     estado = db.Column(db.String(50))
     medio_pago = db.Column(db.String(50))
-    id_item = db.Column(db.Integer, db.ForeignKey("item.id"), nullable=False)
+    id_item = db.Column(db.Integer, db.ForeignKey("item.id"), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     valoraciones = db.relationship("Valoracion", backref="pedido", cascade="all, delete-orphan")
 
@@ -59,10 +84,14 @@ class Pedido(db.Model):
 
 class Valoracion(db.Model):
     __tablename__ = "valoracion"
+    __table_args__ = {"sqlite_autoincrement": True}
     id_val = db.Column(db.Integer, primary_key=True)
-    id_pedido = db.Column(db.Integer, db.ForeignKey("pedido.id_pedido"), nullable=False)
+    id_pedido = db.Column(db.Integer, db.ForeignKey("pedido.id_pedido"), nullable=False, index=True)
     id_us = db.Column(db.Integer, db.ForeignKey("usuario.id_usuario"), nullable=False)
     descripcion = db.Column(db.String(300))
+    puntuacion = db.Column(db.Integer)  # opcional, de 1 a 5
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     def to_dict(self):
         return {
@@ -70,14 +99,19 @@ class Valoracion(db.Model):
             "id_pedido": self.id_pedido,
             "id_us": self.id_us,
             "descripcion": self.descripcion,
+            "puntuacion": self.puntuacion,
         }
 
 
 class Item(db.Model):
     __tablename__ = "item"
+    # AUTOINCREMENT: id_item de pedidos archivados (archivo.py) no apunta a otro ítem
+    __table_args__ = {"sqlite_autoincrement": True}
     id = db.Column(db.Integer, primary_key=True)
     tipo_item = db.Column(db.String(50))
     cantidad = db.Column(db.Integer)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     # Relaciones con tipos de ítems
     vinilos = db.relationship("Vinilo", backref="item", cascade="all, delete-orphan")
@@ -100,7 +134,11 @@ class Vinilo(db.Model):
     precio_unitario = db.Column(db.Float)
     id_cancion = db.Column(db.Integer, db.ForeignKey("cancion.id_cancion"))
     id_proveedor = db.Column(db.Integer, db.ForeignKey("proveedor.id"))
-    id_item = db.Column(db.Integer, db.ForeignKey("item.id"))
+    id_item = db.Column(db.Integer, db.ForeignKey("item.id"), index=True)
+    num_canciones = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    duracion_total = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # segundos
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     canciones = db.relationship("ViniloCancion", backref="vinilo", cascade="all, delete-orphan")
 
@@ -113,6 +151,8 @@ class Vinilo(db.Model):
             "precio_unitario": self.precio_unitario,
             "id_cancion": self.id_cancion,
             "id_proveedor": self.id_proveedor,
+            "num_canciones": self.num_canciones,
+            "duracion_total": formato_duracion(self.duracion_total),
         }
 
 
@@ -123,7 +163,11 @@ class DiscoMp3(db.Model):
     duracion = db.Column(db.Time)
     tamano = db.Column(db.Numeric)
     precio = db.Column(db.Float)
-    id_item = db.Column(db.Integer, db.ForeignKey("item.id"))  # ← 🔧 agregado
+    id_item = db.Column(db.Integer, db.ForeignKey("item.id"), index=True)  # ← 🔧 agregado
+    num_canciones = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    duracion_total = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # segundos
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     canciones = db.relationship("DiscoMp3Cancion", backref="discoMp3", cascade="all, delete-orphan")
 
@@ -135,6 +179,8 @@ class DiscoMp3(db.Model):
             "tamano": float(self.tamano),
             "precio": self.precio,
             "id_item": self.id_item,
+            "num_canciones": self.num_canciones,
+            "duracion_total": formato_duracion(self.duracion_total),
         }
 
 
@@ -144,6 +190,8 @@ class Cancion(db.Model):
     nombre = db.Column(db.String(100))
     duracion = db.Column(db.Time)
     tamano = db.Column(db.Numeric)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     vinilos = db.relationship("ViniloCancion", backref="cancion", cascade="all, delete-orphan")
     discos = db.relationship("DiscoMp3Cancion", backref="cancion", cascade="all, delete-orphan")
@@ -161,19 +209,27 @@ class Cancion(db.Model):
 class ViniloCancion(db.Model):
     __tablename__ = "viniloCancion"
     id_vinilo = db.Column(db.Integer, db.ForeignKey("vinilo.id_vinilo"), primary_key=True)
-    id_cancion = db.Column(db.Integer, db.ForeignKey("cancion.id_cancion"), primary_key=True)
+    id_cancion = db.Column(db.Integer, db.ForeignKey("cancion.id_cancion"), primary_key=True, index=True)
+
+    def to_dict(self):
+        return {"id_vinilo": self.id_vinilo, "id_cancion": self.id_cancion}
 
 
 class DiscoMp3Cancion(db.Model):
     __tablename__ = "discoMp3Cancion"
     id_discoMp3 = db.Column(db.Integer, db.ForeignKey("discoMp3.id_discoMp3"), primary_key=True)
-    id_cancion = db.Column(db.Integer, db.ForeignKey("cancion.id_cancion"), primary_key=True)
+    id_cancion = db.Column(db.Integer, db.ForeignKey("cancion.id_cancion"), primary_key=True, index=True)
+
+    def to_dict(self):
+        return {"id_discoMp3": self.id_discoMp3, "id_cancion": self.id_cancion}
 
 
 class Proveedor(db.Model):
     __tablename__ = "proveedor"
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     correos = db.relationship("CorreoProveedor", backref="proveedor", cascade="all, delete-orphan")
     telefonos = db.relationship("TelefonoProveedor", backref="proveedor", cascade="all, delete-orphan")
@@ -187,6 +243,8 @@ class CorreoProveedor(db.Model):
     __tablename__ = "correo_proveedor"
     correo = db.Column(db.String(120), primary_key=True)
     id_proveedor = db.Column(db.Integer, db.ForeignKey("proveedor.id"))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     def to_dict(self):
         return {"correo": self.correo, "id_proveedor": self.id_proveedor}
@@ -196,6 +254,8 @@ class TelefonoProveedor(db.Model):
     __tablename__ = "telefono_proveedor"
     telefono = db.Column(db.String(20), primary_key=True)
     id_proveedor = db.Column(db.Integer, db.ForeignKey("proveedor.id"))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     def to_dict(self):
         return {"telefono": self.telefono, "id_proveedor": self.id_proveedor}
@@ -207,6 +267,10 @@ class Recopilacion(db.Model):
     nombre = db.Column(db.String(100))
     id_us = db.Column(db.Integer, db.ForeignKey("usuario.id_usuario"))
     publica = db.Column(db.Boolean)
+    num_canciones = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    duracion_total = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # segundos
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     canciones = db.relationship("RecopilacionCancion", backref="recopilacion", cascade="all, delete-orphan")
 
@@ -216,10 +280,103 @@ class Recopilacion(db.Model):
             "nombre": self.nombre,
             "id_us": self.id_us,
             "publica": self.publica,
+            "num_canciones": self.num_canciones,
+            "duracion_total": formato_duracion(self.duracion_total),
         }
 
 
 class RecopilacionCancion(db.Model):
     __tablename__ = "recopilacionCancion"
     id_recopilacion = db.Column(db.Integer, db.ForeignKey("recopilacion.id_recopilacion"), primary_key=True)
-    id_cancion = db.Column(db.Integer, db.ForeignKey("cancion.id_cancion"), primary_key=True)
+    id_cancion = db.Column(db.Integer, db.ForeignKey("cancion.id_cancion"), primary_key=True, index=True)
+
+    def to_dict(self):
+        return {"id_recopilacion": self.id_recopilacion, "id_cancion": self.id_cancion}
+
+
+class Cambio(db.Model):
+    # Registro compacto de cambios (altas, modificaciones y bajas) para sincronización incremental
+    __tablename__ = "cambio"
+    __table_args__ = (
+        # último seq por tabla (ETag de los catálogos en compresion.py)
+        db.Index("ix_cambio_tabla_seq", "tabla", "seq"),
+        {"sqlite_autoincrement": True},  # seq nunca se reutiliza
+    )
+    seq = db.Column(db.Integer, primary_key=True)
+    tabla = db.Column(db.String(50), nullable=False)
+    clave = db.Column(db.String(200), nullable=False)
+    op = db.Column(db.String(1), nullable=False)  # I = alta, U = modificación, D = baja
+    fecha = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp())
+
+    def to_dict(self):
+        return {
+            "seq": self.seq,
+            "tabla": self.tabla,
+            "clave": self.clave,
+            "op": self.op,
+            "fecha": self.fecha,
+        }
+
+
+class Idempotencia(db.Model):
+    # Primera respuesta de cada Idempotency-Key (idempotencia.py); estado NULL = en curso
+    __tablename__ = "idempotencia"
+    clave = db.Column(db.String(200), primary_key=True)
+    huella = db.Column(db.String(64), nullable=False)  # sha256 de método, ruta y cuerpo
+    estado = db.Column(db.Integer)
+    # La vista ya confirmó sus escrituras (se marca en su mismo commit): la clave
+    # no se puede reclamar aunque la respuesta no llegue a guardarse
+    confirmada = db.Column(db.Boolean, nullable=False, default=False, server_default="0")
+    tipo = db.Column(db.String(100))
+    cuerpo = db.Column(db.LargeBinary)  # comprimido con zlib
+    creada = db.Column(db.Float, nullable=False)  # epoch
+    expira = db.Column(db.Float, nullable=False, index=True)
+
+
+# =====================================================
+#        TABLAS DE RESUMEN (mantenidas por resumenes.py)
+# =====================================================
+class ResumenPedidoDia(db.Model):
+    __tablename__ = "resumen_pedido_dia"
+    fecha_pedido = db.Column(db.Date, primary_key=True)
+    id_item = db.Column(db.Integer, primary_key=True)
+    pedidos = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {"fecha_pedido": self.fecha_pedido, "id_item": self.id_item, "pedidos": self.pedidos}
+
+
+class ResumenValoracionPedido(db.Model):
+    __tablename__ = "resumen_valoracion_pedido"
+    id_pedido = db.Column(db.Integer, primary_key=True)
+    valoraciones = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {"id_pedido": self.id_pedido, "valoraciones": self.valoraciones}
+
+
+class ResumenValoracionUsuario(db.Model):
+    __tablename__ = "resumen_valoracion_usuario"
+    id_us = db.Column(db.Integer, primary_key=True)
+    valoraciones = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {"id_us": self.id_us, "valoraciones": self.valoraciones}
+
+
+class ResumenValoracionItem(db.Model):
+    __tablename__ = "resumen_valoracion_item"
+    id_item = db.Column(db.Integer, primary_key=True)
+    valoraciones = db.Column(db.Integer, nullable=False)
+    puntuaciones = db.Column(db.Integer, nullable=False)  # valoraciones con puntuación
+    suma_puntuacion = db.Column(db.Integer, nullable=False)
+    ultima_valoracion = db.Column(db.Integer)  # id_val más reciente
+
+    def to_dict(self):
+        return {
+            "id_item": self.id_item,
+            "valoraciones": self.valoraciones,
+            "puntuaciones": self.puntuaciones,
+            "puntuacion_media": round(self.suma_puntuacion / self.puntuaciones, 2) if self.puntuaciones else None,
+            "ultima_valoracion": self.ultima_valoracion,
+        }
@@ -0,0 +1,159 @@
+# perfilado.py
+# Perfilado bajo demanda de peticiones en producción, sin redesplegar:
+#   - ?__profile=1 (o =muestreo) con la cabecera X-Admin-Token perfila esa petición
+#   - PERFILADO_TASA > 0 perfila al azar esa fracción de las peticiones
+# Con cProfile se guarda un .pstats (python -m pstats, snakeviz...); con el
+# muestreador, pilas colapsadas .folded (flamegraph.pl, speedscope).
+# Desactivado solo cuesta una búsqueda en request.args por petición.
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request
+
+from admin import token_valido
+
+PARAMETRO = "__profile"
+MODOS = {"cprofile": ".pstats", "muestreo": ".folded"}
+
+
+def directorio():
+    return current_app.config["PERFILADO_DIR"] or os.path.join(current_app.instance_path, "perfiles")
+
+
+class Muestreador(threading.Thread):
+    # Toma la pila del hilo de la petición cada "intervalo" segundos
+    def __init__(self, hilo, intervalo):
+        super().__init__(name="muestreador", daemon=True)
+        self.hilo = hilo
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo)
+            if marco is not None:
+                self.pilas[pila(marco)] += 1
+
+    def enable(self):
+        self.start()
+
+    def disable(self):
+        self._parar.set()
+        self.join()
+
+    def dump_stats(self, ruta):
+        with open(ruta, "w") as f:
+            for apilada, veces in self.pilas.most_common():
+                f.write(f"{apilada} {veces}\n")
+
+
+def pila(marco):
+    # "archivo:funcion;archivo:funcion;..." de la raíz a la hoja
+    partes = []
+    while marco is not None:
+        codigo = marco.f_code
+        partes.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+        marco = marco.f_back
+    return ";".join(reversed(partes))
+
+
+def modo_pedido():
+    valor = request.args.get(PARAMETRO)
+    if valor is not None and token_valido():
+        return "muestreo" if valor == "muestreo" else "cprofile"
+    tasa = current_app.config["PERFILADO_TASA"]
+    if tasa and random.random() < tasa:
+        return current_app.config["PERFILADO_MODO"]
+    return None
+
+
+def _iniciar():
+    modo = modo_pedido()
+    if modo is None:
+        return
+    if modo == "muestreo":
+        perfil = Muestreador(threading.get_ident(), current_app.config["PERFILADO_INTERVALO_MUESTREO"])
+    else:
+        perfil = cProfile.Profile()
+    g.perfil = (modo, perfil, time.perf_counter())
+    perfil.enable()
+
+
+def _terminar(respuesta):
+    if "perfil" not in g:
+        return respuesta
+    modo, perfil, inicio = g.pop("perfil")
+    perfil.disable()
+    ms = round((time.perf_counter() - inicio) * 1000)
+
+    carpeta = directorio()
+    os.makedirs(carpeta, exist_ok=True)
+    # El nombre lleva lo necesario para listar sin abrir el archivo
+    nombre = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{request.method}_{request.endpoint or 'sin_ruta'}_{ms}ms{MODOS[modo]}"
+    perfil.dump_stats(os.path.join(carpeta, nombre))
+    podar(current_app.config["PERFILADO_CONSERVAR"])
+    respuesta.headers["X-Perfil"] = nombre
+    return respuesta
+
+
+def _descartar(_error):
+    # Si la vista lanzó una excepción no pasa por after_request
+    if "perfil" in g:
+        g.pop("perfil")[1].disable()
+
+
+def listar():
+    carpeta = directorio()
+    if not os.path.isdir(carpeta):
+        return []
+    perfiles = []
+    for archivo in os.listdir(carpeta):
+        base, extension = os.path.splitext(archivo)
+        try:
+            fecha, metodo, resto = base.split("_", 2)
+            endpoint, ms = resto.rsplit("_", 1)
+            ms = int(ms.removesuffix("ms"))
+        except ValueError:
+            continue
+        perfiles.append({
+            "archivo": archivo,
+            "fecha": datetime.strptime(fecha, "%Y%m%d-%H%M%S-%f").isoformat(timespec="seconds"),
+            "metodo": metodo,
+            "endpoint": endpoint,
+            "ms": ms,
+            "formato": "pstats" if extension == ".pstats" else "folded",
+        })
+    return sorted(perfiles, key=lambda p: p["fecha"], reverse=True)
+
+
+def mas_costosos(limite=20, desde=None):
+    perfiles = listar()
+    if desde is not None:
+        perfiles = [p for p in perfiles if p["fecha"] >= desde]
+    return sorted(perfiles, key=lambda p: p["ms"], reverse=True)[:limite]
+
+
+def podar(conservar):
+    for p in listar()[conservar:]:
+        try:
+            os.remove(os.path.join(directorio(), p["archivo"]))
+        except FileNotFoundError:  # lo borró otro proceso
+            pass
+
+
+def init_app(app):
+    app.config.setdefault("PERFILADO_DIR", None)  # None: instance/perfiles
+    app.config.setdefault("PERFILADO_TASA", 0.0)  # fracción de peticiones perfiladas al azar (0: ninguna)
+    app.config.setdefault("PERFILADO_MODO", "cprofile")  # modo de las peticiones muestreadas: cprofile | muestreo
+    app.config.setdefault("PERFILADO_INTERVALO_MUESTREO", 0.005)  # segundos entre muestras de pila
+    app.config.setdefault("PERFILADO_CONSERVAR", 500)  # perfiles guardados como máximo
+    app.before_request(_iniciar)
+    app.after_request(_terminar)
+    app.teardown_request(_descartar)
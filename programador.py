@@ -0,0 +1,73 @@
+# programador.py
+# Tareas periódicas en un hilo de fondo (respaldos, mantenimiento...).
+# Con varios procesos (gunicorn) un cerrojo de archivo en instance/ hace que
+# cada tarea se ejecute en un solo proceso.
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin cerrojo entre procesos
+    fcntl = None
+
+# True: programar() registra las tareas sin arrancar sus hilos hasta iniciar(app).
+# Con gunicorn y preload_app la aplicación se crea en el maestro: los hilos deben
+# arrancar en cada worker (post_fork), no en el maestro, que no atiende peticiones
+# y conservaría el cerrojo para siempre.
+diferir = False
+
+
+class TareaPeriodica(threading.Thread):
+    def __init__(self, app, nombre, intervalo, funcion):
+        super().__init__(name=f"tarea-{nombre}", daemon=True)
+        self.app = app
+        self.nombre = nombre
+        self.intervalo = intervalo  # segundos; la primera ejecución es tras un intervalo
+        self.funcion = funcion
+        self._parar = threading.Event()
+        self._cerrojo = None
+
+    def _es_titular(self):
+        # El primer proceso que toma el cerrojo lo conserva mientras viva
+        if fcntl is None or self._cerrojo is not None:
+            return True
+        os.makedirs(self.app.instance_path, exist_ok=True)
+        archivo = open(os.path.join(self.app.instance_path, f".{self.nombre}.lock"), "w")
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return False
+        self._cerrojo = archivo
+        return True
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            if not self._es_titular():
+                continue
+            try:
+                with self.app.app_context():
+                    self.funcion()
+            except Exception:
+                self.app.logger.exception("Error en la tarea periódica '%s'", self.nombre)
+
+    def detener(self):
+        self._parar.set()
+
+
+def programar(app, nombre, intervalo, funcion):
+    # intervalo <= 0 desactiva la tarea
+    if not intervalo or intervalo <= 0:
+        return None
+    tarea = TareaPeriodica(app, nombre, intervalo, funcion)
+    if not diferir:
+        tarea.start()
+    app.extensions.setdefault("tareas", {})[nombre] = tarea
+    return tarea
+
+
+def iniciar(app):
+    # Arranca las tareas registradas con diferir = True (una vez por proceso)
+    for tarea in app.extensions.get("tareas", {}).values():
+        if tarea.ident is None:
+            tarea.start()
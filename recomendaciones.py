@@ -0,0 +1,248 @@
+# recomendaciones.py
+# "Quienes agregaron esta canción también agregaron...": índice de co-ocurrencia
+# de canciones dentro de las recopilaciones. Para cada canción se guardan sus K
+# vecinas con mayor puntaje (coseno: c_ab / sqrt(f_a * f_b)) en arreglos CSR
+# (array de la biblioteca estándar), así una consulta es un slice en memoria.
+import math
+import pickle
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from heapq import nlargest
+from itertools import groupby, permutations
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, select
+
+from db import db
+from models import RecopilacionCancion
+
+MAX_PARCHES = 1000  # filas actualizadas en caliente antes de recompactar el CSR
+
+
+class IndiceSimilares:
+    def __init__(self, k=20):
+        self.k = k
+        self.construido = False
+        self.construido_en = None  # time.monotonic() de la última construcción o carga
+        self._lock = threading.Lock()  # solo para escritores; las consultas no lo toman
+        self._reiniciar()
+        # Lo que leen las consultas, publicado de una sola asignación:
+        # (fila, indptr, indices, puntajes, parches). CSR: vecinas de la fila i en
+        # indices[indptr[i]:indptr[i + 1]]; parches: canción -> (ids, puntajes)
+        # recalculados tras el último CSR. Nunca se modifican una vez publicados.
+        self._vista = ({}, array("q", [0]), array("q"), array("d"), {})
+
+    def _reiniciar(self):
+        self.recopilaciones = defaultdict(set)  # id_recopilacion -> canciones
+        self.frecuencia = Counter()  # canción -> nº de recopilaciones que la contienen
+        self.conteos = defaultdict(Counter)  # canción -> {vecina: co-ocurrencias}
+
+    @property
+    def fila(self):
+        return self._vista[0]
+
+    # -------- construcción por lotes --------
+    def construir(self, pares):
+        # pares: (id_recopilacion, id_cancion) ordenados por id_recopilacion
+        with self._lock:
+            self._reiniciar()
+            coocurrencias = Counter()
+            for id_rec, grupo in groupby(pares, key=lambda p: p[0]):
+                canciones = sorted({c for _, c in grupo})
+                self.recopilaciones[id_rec].update(canciones)
+                self.frecuencia.update(canciones)
+                coocurrencias.update(permutations(canciones, 2))  # conteo en C
+            for (a, b), n in coocurrencias.items():
+                self.conteos[a][b] = n
+            self._vista = self._compactar()
+            self.construido = True
+            self.construido_en = time.monotonic()
+
+    def _top(self, cancion):
+        fa = self.frecuencia[cancion]
+        candidatos = (
+            (n / math.sqrt(fa * self.frecuencia[b]), b)
+            for b, n in self.conteos.get(cancion, {}).items() if n > 0
+        )
+        mejores = nlargest(self.k, candidatos)
+        return array("q", (b for _, b in mejores)), array("d", (p for p, _ in mejores))
+
+    def _compactar(self):
+        # Construye una vista nueva en variables locales (sin parches)
+        fila, indptr, indices, puntajes = {}, array("q", [0]), array("q"), array("d")
+        for cancion in sorted(self.conteos):
+            ids, valores = self._top(cancion)
+            fila[cancion] = len(indptr) - 1
+            indices.extend(ids)
+            puntajes.extend(valores)
+            indptr.append(len(indices))
+        return fila, indptr, indices, puntajes, {}
+
+    # -------- consulta --------
+    def similares(self, cancion, limite=None):
+        fila, indptr, indices, puntajes, parches = self._vista  # una sola lectura
+        parche = parches.get(cancion)
+        if parche is not None:
+            ids, puntajes = parche
+        elif cancion in fila:
+            i = fila[cancion]
+            ids = indices[indptr[i]:indptr[i + 1]]
+            puntajes = puntajes[indptr[i]:indptr[i + 1]]
+        else:
+            return []
+        return [
+            {"id_cancion": c, "puntaje": round(p, 4)}
+            for c, p in zip(ids[:limite], puntajes[:limite])
+        ]
+
+    # -------- actualización incremental --------
+    def aplicar(self, cambios):
+        # cambios: [(id_recopilacion, id_cancion, +1 | -1)] ya confirmados en la base
+        if not self.construido:
+            return
+        with self._lock:
+            tocadas = set()
+            for id_rec, cancion, delta in cambios:
+                actuales = self.recopilaciones[id_rec]
+                if (delta > 0) == (cancion in actuales):
+                    continue  # ya reflejado
+                if delta > 0:
+                    actuales.add(cancion)
+                else:
+                    actuales.discard(cancion)
+                self.frecuencia[cancion] += delta
+                for otra in actuales - {cancion}:
+                    self.conteos[cancion][otra] += delta
+                    self.conteos[otra][cancion] += delta
+                # Cambia la frecuencia de la canción: cambian los puntajes de todas sus vecinas
+                tocadas.add(cancion)
+                tocadas.update(self.conteos[cancion])
+            fila, indptr, indices, puntajes, parches = self._vista
+            parches = dict(parches)  # copia: la vista publicada no se toca
+            for cancion in tocadas:
+                parches[cancion] = self._top(cancion)
+            if len(parches) > MAX_PARCHES:
+                self._vista = self._compactar()
+            else:
+                self._vista = (fila, indptr, indices, puntajes, parches)
+
+    # -------- persistencia en disco --------
+    def guardar(self, ruta):
+        with self._lock, open(ruta, "wb") as f:
+            fila, indptr, indices, puntajes, parches = self._vista
+            if parches:
+                fila, indptr, indices, puntajes, parches = self._vista = self._compactar()
+            pickle.dump({
+                "k": self.k,
+                "recopilaciones": dict(self.recopilaciones),
+                "frecuencia": self.frecuencia,
+                "conteos": dict(self.conteos),
+                "fila": fila,
+                "indptr": indptr,
+                "indices": indices,
+                "puntajes": puntajes,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def cargar(self, ruta):
+        with open(ruta, "rb") as f:
+            datos = pickle.load(f)
+        with self._lock:
+            self._reiniciar()
+            self.k = datos["k"]
+            self.recopilaciones.update(datos["recopilaciones"])
+            self.frecuencia = datos["frecuencia"]
+            self.conteos.update(datos["conteos"])
+            self._vista = (datos["fila"], datos["indptr"], datos["indices"], datos["puntajes"], {})
+            self.construido = True
+            self.construido_en = time.monotonic()
+
+
+indice = IndiceSimilares()
+_construccion = threading.Lock()
+
+
+def construir_desde_db():
+    filas = db.session.execute(
+        select(RecopilacionCancion.id_recopilacion, RecopilacionCancion.id_cancion)
+        .order_by(RecopilacionCancion.id_recopilacion),
+        # Siempre de la primaria: la réplica puede ir por detrás del último refresco
+        bind_arguments={"bind": db.engines[None]},
+    )
+    indice.construir(filas)
+
+
+def _vigente(max_edad):
+    if not indice.construido:
+        return False
+    return not max_edad or time.monotonic() - indice.construido_en < max_edad
+
+
+def construir_si_falta():
+    # Construcción perezosa en la primera consulta: solo una petición la hace
+    # (comprobar, bloquear, volver a comprobar). Con RECOMENDACIONES_MAX_EDAD el
+    # índice también se reconstruye al caducar: con varios procesos cada uno solo
+    # aplica sus propios commits. Mientras se reconstruye, las demás peticiones
+    # siguen con el índice anterior en lugar de esperar.
+    max_edad = current_app.config["RECOMENDACIONES_MAX_EDAD"]
+    if _vigente(max_edad):
+        return
+    if not _construccion.acquire(blocking=not indice.construido):
+        return
+    try:
+        if not _vigente(max_edad):
+            construir_desde_db()
+    finally:
+        _construccion.release()
+
+
+# -------- Sincronización con la base: se aplica solo lo confirmado --------
+@event.listens_for(db.session, "after_flush")
+def _anotar_cambios(session, contexto):
+    cambios = session.info.setdefault("recomendaciones", [])
+    for delta, objetos in ((1, session.new), (-1, session.deleted)):
+        for obj in objetos:
+            if isinstance(obj, RecopilacionCancion):
+                cambios.append((obj.id_recopilacion, obj.id_cancion, delta))
+
+
+@event.listens_for(db.session, "after_commit")
+def _aplicar_cambios(session):
+    cambios = session.info.pop("recomendaciones", None)
+    if cambios:
+        indice.aplicar(cambios)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _descartar_cambios(session, transaccion_previa):
+    session.info.pop("recomendaciones", None)
+
+
+# -------- Comando: flask recomendaciones construir --------
+cli = AppGroup("recomendaciones", help="Índice de canciones similares.")
+
+
+@cli.command("construir")
+@click.option("--ruta", default=None, help="Archivo donde guardar el índice (por defecto RECOMENDACIONES_RUTA).")
+def construir(ruta):
+    """Recalcula el índice de co-ocurrencia desde recopilacionCancion y lo guarda en disco."""
+    construir_desde_db()
+    ruta = ruta or current_app.config.get("RECOMENDACIONES_RUTA")
+    if ruta:
+        indice.guardar(ruta)
+    click.echo(f"{len(indice.fila)} canciones indexadas" + (f" en {ruta}" if ruta else ""))
+
+
+def init_app(app):
+    indice.k = app.config.setdefault("RECOMENDACIONES_K", 20)
+    ruta = app.config.setdefault("RECOMENDACIONES_RUTA", None)
+    app.config.setdefault("RECOMENDACIONES_MAX_EDAD", 0)  # segundos hasta reconstruir el índice (0: nunca caduca)
+    if ruta:
+        try:
+            indice.cargar(ruta)
+        except FileNotFoundError:
+            pass  # se construye en la primera consulta
+    app.cli.add_command(cli)
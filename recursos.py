@@ -0,0 +1,346 @@
+# recursos.py
+# Motor genérico de recursos REST. Cada recurso se declara una vez (modelo,
+# nombres de endpoint y variantes) y registra sus rutas list/get/create/
+# update/delete y POST /ids con el mismo código para todos: consultas por
+# lote, validación con esquemas.py, ETag / If-Match y camino rápido de PATCH.
+from flask import abort, current_app, jsonify, request
+from sqlalchemy.orm.exc import StaleDataError
+
+import cambios
+import esquemas
+from db import db
+from models import (
+    Cancion,
+    Correo,
+    CorreoProveedor,
+    DiscoMp3,
+    DiscoMp3Cancion,
+    Item,
+    Pedido,
+    Proveedor,
+    Recopilacion,
+    RecopilacionCancion,
+    Telefono,
+    TelefonoProveedor,
+    Usuario,
+    Valoracion,
+    Vinilo,
+    ViniloCancion,
+)
+
+TAMANO_TROZO_IDS = 500  # ids por sentencia IN (muy por debajo del límite de variables de SQLite)
+
+CONFLICTO = "El registro fue modificado por otro cliente; vuelva a leerlo"
+
+
+# -------- Consultas por lote --------
+def trozos(valores, tamano):
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+def convertir_ids(modelo, crudos):
+    # Convierte los ids recibidos al tipo de la clave primaria.
+    # Las claves compuestas se escriben "1:2" o como lista [1, 2].
+    tipos = [c.type.python_type for c in modelo.__mapper__.primary_key]
+    ids = []
+    for crudo in crudos:
+        partes = crudo if isinstance(crudo, list) else str(crudo).strip().split(":")
+        if len(partes) != len(tipos):
+            raise ValueError(crudo)
+        valores = tuple(t(p) for t, p in zip(tipos, partes))
+        ids.append(valores if len(valores) > 1 else valores[0])
+    return ids
+
+
+def buscar_por_ids(modelo, ids):
+    # Resuelve muchas claves primarias con consultas IN por trozos; devuelve {pk: objeto}
+    mapper = modelo.__mapper__
+    columnas = mapper.primary_key
+    clave = columnas[0] if len(columnas) == 1 else db.tuple_(*columnas)
+
+    encontrados = {}
+    for trozo in trozos(list(dict.fromkeys(ids)), TAMANO_TROZO_IDS):
+        for obj in modelo.query.filter(clave.in_(trozo)):
+            pk = mapper.primary_key_from_instance(obj)
+            encontrados[pk[0] if len(pk) == 1 else tuple(pk)] = obj
+    return encontrados
+
+
+def leer_ids(modelo):
+    # ids desde ?ids=1,2,3 (GET) o desde {"ids": [...]} (POST, para listas largas)
+    if request.method == "GET":
+        crudos = [x for x in request.args.get("ids", "").split(",") if x.strip()]
+    else:
+        crudos = (request.get_json(silent=True) or {}).get("ids")
+        if not isinstance(crudos, list):
+            raise ValueError("Se requiere JSON con una lista 'ids'")
+
+    maximo = current_app.config["MAX_IDS_LOTE"]
+    if not crudos:
+        raise ValueError("Debe indicar al menos un id en 'ids'")
+    if len(crudos) > maximo:
+        raise ValueError(f"Máximo {maximo} ids por consulta")
+    try:
+        return convertir_ids(modelo, crudos)
+    except (TypeError, ValueError):
+        raise ValueError("Los ids no coinciden con el tipo de la clave primaria")
+
+
+def respuesta_lote(ids, encontrados, serializar):
+    # Resultados en el mismo orden pedido + ids que no existen
+    return jsonify(
+        resultados=[serializar(encontrados[i]) for i in ids if i in encontrados],
+        faltantes=[i for i in ids if i not in encontrados],
+    )
+
+
+def respuesta_por_ids(modelo):
+    try:
+        ids = leer_ids(modelo)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return respuesta_lote(ids, buscar_por_ids(modelo, ids), lambda o: o.to_dict())
+
+
+# -------- Validación --------
+def validar(modelo, filas, parcial=False):
+    # (filas convertidas, respuesta 400 con todos los errores o None)
+    limpias, errores = esquemas.validar(modelo, filas, parcial)
+    if errores:
+        return limpias, (jsonify(error=esquemas.mensaje(errores), errores=errores), 400)
+    return limpias, None
+
+
+# -------- Control de concurrencia optimista (columna version + ETag / If-Match) --------
+def con_etag(obj):
+    respuesta = jsonify(obj.to_dict())
+    respuesta.set_etag(str(obj.version))
+    return respuesta
+
+
+def precondicion(obj):
+    # Con If-Match el cliente solo modifica la versión que leyó
+    if request.if_match and not request.if_match.contains(str(obj.version)):
+        return jsonify(error=CONFLICTO, version=obj.version), 412
+
+
+def confirmar():
+    # El UPDATE/DELETE incluye "WHERE version = ?": si otro cliente escribió antes, no afecta filas
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify(error=CONFLICTO), 412
+
+
+def actualizar_directo(modelo, pk, valores, version=None):
+    # Camino rápido de PATCH: una sola sentencia
+    #   UPDATE ... SET <campos enviados>, version = version + 1 WHERE pk = ? [AND version = ?] RETURNING *
+    # Devuelve una instancia (no persistente) con la fila actualizada, o None si ninguna fila coincidió.
+    tabla = modelo.__table__
+    columna_pk = modelo.__mapper__.primary_key[0]
+    sentencia = (
+        tabla.update()
+        .where(columna_pk == pk)
+        .values(**valores, version=tabla.c.version + 1)
+        .returning(*tabla.c)
+    )
+    if version is not None:
+        sentencia = sentencia.where(tabla.c.version == version)
+
+    fila = db.session.execute(sentencia).mappings().first()
+    if fila is None:
+        return None
+    # Al no pasar por el flush del ORM, el registro de cambios se escribe aquí
+    cambios.registrar(db.session.connection(), [{"tabla": tabla.name, "clave": str(pk), "op": "U"}])
+    return modelo(**fila)
+
+
+def patch_directo(modelo, pk, valores):
+    # If-Match con una sola versión se comprueba en el mismo UPDATE
+    version = None
+    if request.if_match and not request.if_match.star_tag:
+        etags = request.if_match.as_set()
+        if len(etags) != 1 or not next(iter(etags)).isdigit():
+            return jsonify(error="If-Match debe indicar una única versión"), 412
+        version = int(next(iter(etags)))
+
+    try:
+        obj = actualizar_directo(modelo, pk, valores, version)
+        if obj is None:
+            db.session.rollback()
+            # Sin filas afectadas: el registro no existe o cambió de versión
+            actual = db.session.get(modelo, pk) if version is not None else None
+            if actual is not None:
+                return jsonify(error=CONFLICTO, version=actual.version), 412
+        else:
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify(error=f"Error al actualizar: {str(e)}"), 500
+    if obj is None:
+        abort(404)  # el mismo 404 que el camino del ORM
+    return con_etag(obj)
+
+
+# -------- Recursos --------
+class Recurso:
+    def __init__(self, nombre, modelo, singular=None, listado=None, orden_desc=False,
+                 metodos_actualizar=("PATCH",), campos_rapidos=(), no_encontrado=None, eliminado=None):
+        self.nombre = nombre  # segmento de la URL
+        self.modelo = modelo
+        self.clave = list(modelo.__mapper__.primary_key)
+        # Tablas de asociación (clave compuesta): solo alta, listado y baja
+        self.asociacion = len(self.clave) > 1
+        self.singular = singular  # sufijo de los endpoints get_/update_/delete_
+        self.listado = listado or f"list_{nombre}"
+        self.orden_desc = orden_desc
+        self.metodos_actualizar = list(metodos_actualizar)
+        # Campos que se actualizan con una sola sentencia UPDATE ... RETURNING
+        self.campos_rapidos = set(campos_rapidos)
+        self.no_encontrado = no_encontrado  # mensaje JSON de 404 (None: 404 estándar)
+        self.eliminado = eliminado  # mensaje de baja con "{}" para el id (None: {"ok": true})
+
+    def _pk(self, clave):
+        valores = tuple(clave[c.key] for c in self.clave)
+        return valores if len(valores) > 1 else valores[0]
+
+    def _cargar(self, pk):
+        obj = db.session.get(self.modelo, pk)
+        if obj is None:
+            if self.no_encontrado:
+                respuesta = jsonify(error=self.no_encontrado)
+                respuesta.status_code = 404
+                abort(respuesta)
+            abort(404)
+        return obj
+
+    # -------- Handlers --------
+    def listar(self):
+        if "ids" in request.args:
+            return respuesta_por_ids(self.modelo)
+        consulta = self.modelo.query
+        if self.orden_desc:
+            consulta = consulta.order_by(self.clave[0].desc())
+        return jsonify([o.to_dict() for o in consulta])
+
+    def por_ids(self):
+        return respuesta_por_ids(self.modelo)
+
+    def obtener(self, **clave):
+        return con_etag(self._cargar(self._pk(clave)))
+
+    def crear(self):
+        if not request.is_json:
+            return jsonify(error="Se requiere JSON"), 415
+
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = [data]  # un solo objeto o lista se tratan igual
+
+        if not isinstance(data, list) or len(data) == 0:
+            return jsonify(error="Debe enviar al menos un registro JSON"), 400
+
+        # Validar todos antes de insertar
+        filas, invalido = validar(self.modelo, data)
+        if invalido:
+            return invalido
+        creados = [self.modelo(**f) for f in filas]
+
+        try:
+            db.session.add_all(creados)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify(error=f"Error al insertar en {self.nombre}: {str(e)}"), 500
+
+        return jsonify([o.to_dict() for o in creados]), 201
+
+    def actualizar(self, **clave):
+        if not request.is_json:
+            return jsonify(error="Se requiere JSON"), 415
+
+        pk = self._pk(clave)
+        data = request.get_json() or {}
+        valores, invalido = validar(self.modelo, [data], parcial=True)
+        if invalido:
+            return invalido
+        valores = valores[0]
+        if valores and set(valores) <= self.campos_rapidos:
+            return patch_directo(self.modelo, pk, valores)
+
+        obj = self._cargar(pk)
+        conflicto = precondicion(obj)
+        if conflicto:
+            return conflicto
+        for campo, valor in valores.items():
+            setattr(obj, campo, valor)
+        return confirmar() or con_etag(obj)
+
+    def eliminar(self, **clave):
+        pk = self._pk(clave)
+        obj = self._cargar(pk)
+        if not self.asociacion:
+            conflicto = precondicion(obj)
+            if conflicto:
+                return conflicto
+        db.session.delete(obj)
+        conflicto = confirmar()
+        if conflicto:
+            return conflicto
+        if self.eliminado:
+            return jsonify(message=self.eliminado.format(pk))
+        return jsonify(ok=True)
+
+    def registrar(self, app):
+        base = f"/api/{self.nombre}"
+        conversores = {int: "int", str: "string"}
+        item = base + "".join(f"/<{conversores[c.type.python_type]}:{c.key}>" for c in self.clave)
+
+        app.add_url_rule(base, f"create_{self.nombre}", self.crear, methods=["POST"])
+        app.add_url_rule(base, self.listado, self.listar, methods=["GET"])
+        # POST /api/<recurso>/ids: misma consulta por lote con los ids en el cuerpo
+        app.add_url_rule(f"{base}/ids", f"ids_{self.nombre}", self.por_ids, methods=["POST"])
+        if self.asociacion:
+            app.add_url_rule(item, f"delete_{self.nombre}", self.eliminar, methods=["DELETE"])
+            return
+        app.add_url_rule(item, f"get_{self.singular}", self.obtener, methods=["GET"])
+        app.add_url_rule(item, f"update_{self.singular}", self.actualizar, methods=self.metodos_actualizar)
+        app.add_url_rule(item, f"delete_{self.singular}", self.eliminar, methods=["DELETE"])
+
+
+RECURSOS = [
+    Recurso("usuarios", Usuario, "usuario", orden_desc=True),
+    Recurso("telefonos", Telefono, "telefono"),
+    Recurso("correos", Correo, "correo"),
+    Recurso("valoraciones", Valoracion, "valoracion"),
+    Recurso("discomp3", DiscoMp3, "discomp3", listado="list_discos"),
+    Recurso("vinilo", Vinilo, "vinilo", listado="list_vinilos"),
+    # Cambios de estado/medio de pago: no afectan resúmenes ni bibliotecas,
+    # se aplican sin SELECT previo
+    Recurso("pedido", Pedido, "pedido", listado="list_pedidos", campos_rapidos=("estado", "medio_pago")),
+    Recurso("discomp3cancion", DiscoMp3Cancion),
+    Recurso("items", Item, "item"),
+    Recurso("recopilacioncancion", RecopilacionCancion),
+    Recurso("vinilocancion", ViniloCancion),
+    Recurso("proveedores", Proveedor, "proveedor"),
+    Recurso("correos_proveedor", CorreoProveedor, "correo_proveedor"),
+    Recurso("telefonos_proveedor", TelefonoProveedor, "telefono_proveedor"),
+    Recurso(
+        "recopilaciones", Recopilacion, "recopilacion",
+        listado="get_recopilaciones",
+        metodos_actualizar=("PUT", "PATCH"),
+        no_encontrado="Recopilación no encontrada",
+        eliminado="Recopilación {} eliminada",
+    ),
+    Recurso("canciones", Cancion, "cancion", orden_desc=True),
+]
+
+# recurso (segmento de la URL) -> modelo
+MODELOS = {r.nombre: r.modelo for r in RECURSOS}
+
+
+def init_app(app):
+    for recurso in RECURSOS:
+        recurso.registrar(app)
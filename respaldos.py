@@ -0,0 +1,173 @@
+# respaldos.py
+# Respaldos en caliente de la base SQLite con la API de backup: en WAL la copia
+# se hace de una pasada sobre una instantánea de lectura (no bloquea a los
+# escritores); en otro modo, por tramos de pocas páginas con una pausa entre
+# tramos, así que los escritores solo esperan lo que dura un tramo (si la copia
+# se reinicia demasiadas veces se reintenta más tarde; ver db.copiar_base).
+# Incluye retención de los N últimos respaldos, compresión gzip opcional y
+# una tarea periódica (ver programador.py).
+import gzip
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+import programador
+from db import CopiaReiniciada, copiar_base, db
+
+PREFIJO = "app-"
+EXTENSIONES = (".db", ".db.gz")
+
+_en_curso = threading.Lock()
+ultimo = {}  # resultado (o error) del último respaldo de este proceso
+
+
+class RespaldoEnCurso(Exception):
+    pass
+
+
+def directorio():
+    return current_app.config["RESPALDOS_DIR"] or os.path.join(current_app.instance_path, "respaldos")
+
+
+def listar():
+    carpeta = directorio()
+    if not os.path.isdir(carpeta):
+        return []
+    archivos = sorted(
+        f for f in os.listdir(carpeta)
+        if f.startswith(PREFIJO) and f.endswith(EXTENSIONES)
+    )
+    return [
+        {"archivo": f, "bytes": os.path.getsize(os.path.join(carpeta, f))}
+        for f in reversed(archivos)  # el más reciente primero
+    ]
+
+
+def podar(conservar):
+    # Borra los respaldos más antiguos y deja los "conservar" más recientes
+    borrados = []
+    for r in listar()[conservar:]:
+        os.remove(os.path.join(directorio(), r["archivo"]))
+        borrados.append(r["archivo"])
+    return borrados
+
+
+def crear(comprimir=None, paginas=None, pausa=None):
+    config = current_app.config
+    comprimir = config["RESPALDOS_COMPRIMIR"] if comprimir is None else comprimir
+    paginas = paginas or config["RESPALDOS_PAGINAS"]
+    pausa = config["RESPALDOS_PAUSA"] if pausa is None else pausa
+
+    if not _en_curso.acquire(blocking=False):
+        raise RespaldoEnCurso("Ya hay un respaldo en curso")
+    try:
+        inicio = time.perf_counter()
+        carpeta = directorio()
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = f"{PREFIJO}{datetime.now():%Y%m%d-%H%M%S-%f}.db"
+        parcial = os.path.join(carpeta, nombre + ".parcial")
+
+        # En WAL, de una pasada; si no, por tramos con pausa (ver db.copiar_base)
+        try:
+            total, reinicios = copiar_base(
+                db.engines[None].url.database, parcial, paginas, pausa,
+                config["RESPALDOS_REINICIOS"], config["RESPALDOS_INTENTOS"], config["RESPALDOS_ESPERA"],
+            )
+        except BaseException:
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            raise
+
+        # Solo aparece con su nombre final cuando está completo
+        if comprimir:
+            nombre += ".gz"
+            with open(parcial, "rb") as entrada, gzip.open(parcial + ".gz", "wb") as salida:
+                shutil.copyfileobj(entrada, salida, 1024 * 1024)
+            os.remove(parcial)
+            parcial += ".gz"
+        os.replace(parcial, os.path.join(carpeta, nombre))
+
+        resultado = {
+            "archivo": nombre,
+            "bytes": os.path.getsize(os.path.join(carpeta, nombre)),
+            "paginas": total,
+            "reinicios": reinicios,
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "comprimido": bool(comprimir),
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "borrados": podar(config["RESPALDOS_CONSERVAR"]),
+        }
+        ultimo.clear()
+        ultimo.update(resultado)
+        return resultado
+    except Exception as e:
+        ultimo.clear()
+        ultimo.update(error=str(e), fecha=datetime.now().isoformat(timespec="seconds"))
+        raise
+    finally:
+        _en_curso.release()
+
+
+def en_curso():
+    return _en_curso.locked()
+
+
+def crear_en_segundo_plano(app, **opciones):
+    # Para la ruta de administración: responde enseguida y copia en un hilo
+    if en_curso():
+        raise RespaldoEnCurso("Ya hay un respaldo en curso")
+
+    def trabajo():
+        with app.app_context():
+            try:
+                crear(**opciones)
+            except Exception:
+                app.logger.exception("Error al crear el respaldo")
+
+    threading.Thread(target=trabajo, name="respaldo", daemon=True).start()
+
+
+# -------- Comandos CLI --------
+cli = AppGroup("respaldos", help="Respaldos en caliente de la base de datos.")
+
+
+@cli.command("crear")
+@click.option("--comprimir/--sin-comprimir", default=None, help="gzip del respaldo (por defecto RESPALDOS_COMPRIMIR).")
+@click.option("--paginas", type=int, help="Páginas copiadas por tramo.")
+@click.option("--pausa", type=float, help="Segundos de pausa entre tramos.")
+def crear_comando(comprimir, paginas, pausa):
+    """Crea un respaldo y aplica la retención."""
+    try:
+        r = crear(comprimir, paginas, pausa)
+    except CopiaReiniciada as e:
+        raise SystemExit(f"Respaldo no creado: {e}")
+    click.echo(f"{r['archivo']}: {r['paginas']} páginas, {r['bytes']} bytes en {r['segundos']} s")
+    for archivo in r["borrados"]:
+        click.echo(f"borrado {archivo}")
+
+
+@cli.command("listar")
+def listar_comando():
+    """Lista los respaldos, del más reciente al más antiguo."""
+    for r in listar():
+        click.echo(f"{r['archivo']}\t{r['bytes']}")
+
+
+def init_app(app):
+    app.config.setdefault("RESPALDOS_DIR", None)  # None: instance/respaldos
+    app.config.setdefault("RESPALDOS_PAGINAS", 256)  # páginas por tramo (1 MB con páginas de 4 KB)
+    app.config.setdefault("RESPALDOS_PAUSA", 0.02)  # segundos entre tramos
+    app.config.setdefault("RESPALDOS_REINICIOS", 3)  # reinicios por tramos antes de abandonar un intento
+    app.config.setdefault("RESPALDOS_INTENTOS", 3)  # intentos antes de dar el respaldo por fallido
+    app.config.setdefault("RESPALDOS_ESPERA", 1.0)  # segundos antes del 2º intento (se duplica en cada uno)
+    app.config.setdefault("RESPALDOS_CONSERVAR", 7)
+    app.config.setdefault("RESPALDOS_COMPRIMIR", False)
+    app.config.setdefault("RESPALDOS_INTERVALO", 0)  # segundos entre respaldos automáticos (0: desactivado)
+    app.cli.add_command(cli)
+    programador.programar(app, "respaldos", app.config["RESPALDOS_INTERVALO"], crear)
@@ -0,0 +1,196 @@
+# resumenes.py
+# Tablas de resumen mantenidas de forma incremental.
+# Cada flush que toca pedidos o valoraciones recalcula solo las claves afectadas
+# (p. ej. el par fecha/item de un pedido, antes y después de modificarlo), en la
+# misma transacción. Los tableros leen los resúmenes en lugar de recorrer el historial.
+# El historial incluye lo archivado (ver archivo.py): archivar no altera los resúmenes.
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, select, tuple_
+
+import archivo
+from db import db
+from models import (
+    Pedido,
+    ResumenPedidoDia,
+    ResumenValoracionItem,
+    ResumenValoracionPedido,
+    ResumenValoracionUsuario,
+    Valoracion,
+)
+
+TAMANO_TROZO = 500
+
+
+class Resumen:
+    def __init__(self, modelo, fuente, claves, agregados):
+        self.modelo = modelo  # tabla de resumen
+        self.fuente = fuente  # modelo de origen
+        self.claves = claves  # columnas de agrupación (mismo nombre en origen y resumen)
+        self.agregados = agregados  # {columna del resumen: expresión agregada sobre el origen}
+
+    # -------- origen de los datos (se redefine en resúmenes con joins) --------
+    def origen(self):
+        return self.fuente.__table__
+
+    def columna(self, clave):
+        return self.fuente.__table__.c[clave]
+
+    def claves_afectadas(self, conexion, objetos):
+        afectadas = set()
+        for obj in objetos:
+            if isinstance(obj, self.fuente):
+                afectadas.update(valores_clave(obj, self.claves))
+        return afectadas
+
+    # -------- cálculo --------
+    def _en(self, columnas, claves):
+        columna = columnas[0] if len(columnas) == 1 else tuple_(*columnas)
+        return columna.in_(claves)
+
+    def consulta(self, claves=None):
+        # SELECT claves, agregados FROM origen [WHERE claves IN (...)] GROUP BY claves
+        columnas = [self.columna(k) for k in self.claves]
+        consulta = (
+            select(*columnas, *self.agregados.values())
+            .select_from(self.origen())
+            .where(*(c.isnot(None) for c in columnas))
+            .group_by(*columnas)
+        )
+        if claves is not None:
+            consulta = consulta.where(self._en(columnas, claves))
+        return consulta
+
+    def refrescar(self, conexion, claves):
+        # Recalcula solo las filas de las claves dadas (lista de tuplas)
+        destino = self.modelo.__table__
+        claves = [c if len(self.claves) > 1 else c[0] for c in claves if None not in c]
+        for i in range(0, len(claves), TAMANO_TROZO):
+            trozo = claves[i:i + TAMANO_TROZO]
+            conexion.execute(destino.delete().where(self._en([destino.c[k] for k in self.claves], trozo)))
+            consulta = archivo.incluir(self.consulta(trozo), conexion=conexion)
+            conexion.execute(destino.insert().from_select([*self.claves, *self.agregados], consulta))
+
+    def reconstruir(self, conexion):
+        destino = self.modelo.__table__
+        conexion.execute(destino.delete())
+        consulta = archivo.incluir(self.consulta(), conexion=conexion)
+        conexion.execute(destino.insert().from_select([*self.claves, *self.agregados], consulta))
+
+    def diferencias(self, conexion):
+        # Filas del resumen que no coinciden con un recálculo completo (en ambos sentidos)
+        destino = self.modelo.__table__
+        guardado = select(*(destino.c[k] for k in [*self.claves, *self.agregados]))
+        esperado = archivo.incluir(self.consulta(), conexion=conexion)
+        faltan = conexion.execute(esperado.except_(guardado)).all()
+        sobran = conexion.execute(guardado.except_(esperado)).all()
+        return faltan, sobran
+
+
+class ResumenPorItem(Resumen):
+    # Valoraciones agrupadas por el item del pedido al que pertenecen (valoracion -> pedido)
+    def origen(self):
+        return Valoracion.__table__.join(Pedido.__table__, Pedido.id_pedido == Valoracion.id_pedido)
+
+    def columna(self, clave):
+        return Pedido.__table__.c[clave]
+
+    def claves_afectadas(self, conexion, objetos):
+        afectadas, pedidos = set(), set()
+        for obj in objetos:
+            if isinstance(obj, Pedido):
+                afectadas.update(valores_clave(obj, ["id_item"]))
+            elif isinstance(obj, Valoracion):
+                pedidos.update(v for (v,) in valores_clave(obj, ["id_pedido"]))
+        pedidos.discard(None)
+        if pedidos:
+            filas = conexion.execute(select(Pedido.id_item).where(Pedido.id_pedido.in_(pedidos)))
+            afectadas.update((id_item,) for (id_item,) in filas)
+        return afectadas
+
+
+RESUMENES = {
+    "pedidos_dia": Resumen(
+        ResumenPedidoDia, Pedido, ["fecha_pedido", "id_item"],
+        {"pedidos": func.count()},
+    ),
+    "valoraciones_pedido": Resumen(
+        ResumenValoracionPedido, Valoracion, ["id_pedido"],
+        {"valoraciones": func.count()},
+    ),
+    "valoraciones_usuario": Resumen(
+        ResumenValoracionUsuario, Valoracion, ["id_us"],
+        {"valoraciones": func.count()},
+    ),
+    "valoraciones_item": ResumenPorItem(
+        ResumenValoracionItem, Valoracion, ["id_item"],
+        {
+            "valoraciones": func.count(),
+            "puntuaciones": func.count(Valoracion.puntuacion),
+            "suma_puntuacion": func.coalesce(func.sum(Valoracion.puntuacion), 0),
+            "ultima_valoracion": func.max(Valoracion.id_val),
+        },
+    ),
+}
+
+
+def valores_clave(obj, claves):
+    # Valores actuales y anteriores (si se modificaron) de las columnas de agrupación
+    estado = inspect(obj)
+    actuales = tuple(getattr(obj, k) for k in claves)
+    afectadas = {actuales}
+    if estado.persistent:
+        historial = [estado.attrs[k].history for k in claves]
+        if any(h.deleted for h in historial):
+            afectadas.add(tuple(
+                h.deleted[0] if h.deleted else valor for h, valor in zip(historial, actuales)
+            ))
+    return afectadas
+
+
+@event.listens_for(db.session, "after_flush")
+def _actualizar_resumenes(session, contexto):
+    objetos = [
+        obj for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, (Pedido, Valoracion))
+    ]
+    if not objetos:
+        return
+    conexion = session.connection()
+    for resumen in RESUMENES.values():
+        claves = resumen.claves_afectadas(conexion, objetos)
+        if claves:
+            resumen.refrescar(conexion, list(claves))
+
+
+# -------- Comandos: flask resumenes reconstruir / verificar --------
+cli = AppGroup("resumenes", help="Tablas de resumen de pedidos y valoraciones.")
+
+
+@cli.command("reconstruir")
+@click.argument("nombres", nargs=-1)
+def reconstruir(nombres):
+    """Recalcula por completo los resúmenes (todos si no se indica ninguno)."""
+    for nombre in nombres or RESUMENES:
+        RESUMENES[nombre].reconstruir(db.session.connection())
+        click.echo(f"{nombre}: reconstruido")
+    db.session.commit()
+
+
+@cli.command("verificar")
+def verificar():
+    """Compara cada resumen con un recálculo completo; sale con código 1 si hay diferencias."""
+    inconsistente = False
+    for nombre, resumen in RESUMENES.items():
+        faltan, sobran = resumen.diferencias(db.session.connection())
+        if faltan or sobran:
+            inconsistente = True
+            click.echo(f"{nombre}: {len(faltan)} filas faltantes o distintas, {len(sobran)} sobrantes")
+        else:
+            click.echo(f"{nombre}: OK")
+    if inconsistente:
+        raise SystemExit(1)
+
+
+def init_app(app):
+    app.cli.add_command(cli)
@@ -0,0 +1,66 @@
+# tests/conftest.py
+# Cada prueba usa su propia base SQLite temporal creada con los modelos.
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import biblioteca  # noqa: E402
+import compresion  # noqa: E402
+import recomendaciones  # noqa: E402
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("FLASK_SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'app.db'}")
+    # Cachés de módulo: no deben arrastrar datos de otra prueba
+    biblioteca.cache.limpiar()
+    compresion.cache.limpiar()
+    monkeypatch.setattr(recomendaciones, "indice", recomendaciones.IndiceSimilares())
+    # db es global: los binds que añada esta app (p. ej. "lectura") no deben
+    # quedar registrados para las siguientes
+    metadatas = set(db.metadatas)
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for motor in db.engines.values():
+            motor.dispose()
+    for clave in set(db.metadatas) - metadatas:
+        del db.metadatas[clave]
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def contar_consultas(app):
+    # with contar_consultas() as consultas: ... -> len(consultas) sentencias ejecutadas
+    @contextmanager
+    def contar():
+        consultas = []
+
+        def anotar(_conexion, _cursor, sentencia, *_):
+            consultas.append(sentencia)
+
+        with app.app_context():
+            motores = list(db.engines.values())
+        for motor in motores:
+            event.listen(motor, "before_cursor_execute", anotar)
+        try:
+            yield consultas
+        finally:
+            for motor in motores:
+                event.remove(motor, "before_cursor_execute", anotar)
+    return contar
@@ -0,0 +1,15 @@
+# tests/test_archivo.py
+# Los registros archivados guardan id_us/id_item sin clave foránea: los ids de
+# usuarios e ítems borrados no se reasignan.
+import pytest
+
+
+@pytest.mark.parametrize("recurso, datos, clave", [
+    ("usuarios", {"nombre": "ana", "contrasena": "x"}, "id_usuario"),
+    ("items", {"tipo_item": "vinilo", "cantidad": 1}, "id"),
+])
+def test_ids_borrados_no_se_reutilizan(client, recurso, datos, clave):
+    ids = [client.post(f"/api/{recurso}", json=datos).get_json()[0][clave] for _ in range(2)]
+    assert client.delete(f"/api/{recurso}/{ids[-1]}").status_code == 200
+    nuevo = client.post(f"/api/{recurso}", json=datos).get_json()[0][clave]
+    assert nuevo not in ids
@@ -0,0 +1,101 @@
+# tests/test_asgi.py
+# Las lecturas que atiende asgi.py en asyncio también pasan por las cubetas de limites.py.
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("asgiref")
+
+import asgi  # noqa: E402
+from asgiref.wsgi import WsgiToAsgi  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from db import refrescar_replica  # noqa: E402
+
+
+@pytest.fixture
+def app_asgi(app, monkeypatch):
+    app.config["LIMITES_POR_CLIENTE"] = [2, 0.001]
+    monkeypatch.setattr(asgi, "flask_app", app)
+    monkeypatch.setattr(asgi, "wsgi", WsgiToAsgi(app))
+    monkeypatch.setattr(asgi, "rutas", app.url_map.bind("localhost"))
+    monkeypatch.setattr(asgi, "motor", None)
+    yield asgi.app
+    asyncio.run(asgi.detener())
+
+
+def intercambio(aplicacion, ruta, cliente="10.0.0.1"):
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": ruta,
+        "raw_path": ruta.encode(), "query_string": b"", "root_path": "", "headers": [(b"host", b"localhost")],
+        "client": (cliente, 1234), "server": ("localhost", 80),
+    }
+    mensajes = []
+
+    async def recibir():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(mensaje):
+        mensajes.append(mensaje)
+
+    asyncio.run(aplicacion(scope, recibir, enviar))
+    return mensajes
+
+
+def pedir(aplicacion, ruta, cliente="10.0.0.1"):
+    inicio = intercambio(aplicacion, ruta, cliente)[0]
+    return inicio["status"], dict(inicio["headers"])
+
+
+def test_lecturas_asincronas_limitadas(app_asgi, client):
+    assert client.post("/api/proveedores", json={"nombre": "prov"}).status_code == 201
+    # Las dos fichas del cliente se gastan en lecturas servidas por asyncio...
+    assert pedir(app_asgi, "/api/proveedores")[0] == 200
+    assert pedir(app_asgi, "/api/proveedores/1")[0] == 200
+    # ...y la tercera se rechaza, en asyncio o en Flask
+    estado, cabeceras = pedir(app_asgi, "/api/proveedores")
+    assert estado == 429
+    assert int(cabeceras[b"retry-after"]) >= 1
+    assert pedir(app_asgi, "/api/proveedores/999")[0] == 429
+    assert pedir(app_asgi, "/api/stats/pedidos")[0] == 429
+    # Otro cliente tiene su propia cubeta
+    assert pedir(app_asgi, "/api/proveedores", cliente="10.0.0.2")[0] == 200
+
+
+def test_404_se_cobra_una_vez(app_asgi):
+    # El GET de un registro inexistente lo responde Flask: solo gasta una ficha
+    assert pedir(app_asgi, "/api/proveedores/999")[0] == 404
+    assert pedir(app_asgi, "/api/proveedores/999")[0] == 404
+    assert pedir(app_asgi, "/api/proveedores/999")[0] == 429
+
+
+def test_replica_asincrona_ve_la_copia_nueva(tmp_path, monkeypatch, request):
+    # El motor asíncrono descarta las conexiones al archivo anterior de la réplica
+    monkeypatch.setenv("FLASK_LECTURA_DATABASE_URI", f"sqlite:///{tmp_path / 'lectura.db'}")
+    aplicacion = request.getfixturevalue("app_asgi")
+    app, client = request.getfixturevalue("app"), request.getfixturevalue("client")
+    assert client.post("/api/proveedores", json={"nombre": "uno"}).status_code == 201
+    with app.app_context():
+        refrescar_replica()
+
+    def nombres(cliente):
+        mensajes = intercambio(aplicacion, "/api/proveedores", cliente)
+        return [p["nombre"] for p in json.loads(mensajes[1]["body"])]
+
+    assert nombres("10.0.0.1") == ["uno"]
+    assert client.post("/api/proveedores", json={"nombre": "dos"}).status_code == 201
+    with app.app_context():
+        refrescar_replica()
+    assert nombres("10.0.0.2") == ["uno", "dos"]
+
+
+def test_sin_fichas_no_se_consulta(app_asgi, client):
+    # Un cliente sin fichas recibe 429 sin que se lea la base
+    assert client.post("/api/proveedores", json={"nombre": "prov"}).status_code == 201
+    assert pedir(app_asgi, "/api/proveedores/1")[0] == 200
+    assert pedir(app_asgi, "/api/proveedores/1")[0] == 200
+    consultas = []
+    event.listen(asgi.motor.sync_engine, "before_cursor_execute", lambda *a: consultas.append(a[2]))
+    assert pedir(app_asgi, "/api/proveedores/1")[0] == 429
+    assert consultas == []
@@ -0,0 +1,57 @@
+# tests/test_biblioteca.py
+# Caché de bibliotecas: un resultado calculado antes de una invalidación no se
+# guarda, y borrar un usuario invalida su entrada.
+import biblioteca
+from biblioteca import CacheBiblioteca
+
+CANCIONES = [{"id_cancion": 1}, {"id_cancion": 2}]
+
+
+def test_guardar_tras_invalidar_no_guarda():
+    cache = CacheBiblioteca()
+    generacion = cache.generacion(7)
+    cache.invalidar([7])  # un commit invalida mientras la consulta está en curso
+    assert cache.guardar(7, CANCIONES, generacion) == ([1, 2], CANCIONES)
+    assert cache.obtener(7) is None
+
+    generacion = cache.generacion(7)
+    cache.invalidar([8])  # otros usuarios no afectan
+    cache.guardar(7, CANCIONES, generacion)
+    assert cache.obtener(7) == ([1, 2], CANCIONES)
+
+
+def test_guardar_tras_limpiar_no_guarda():
+    cache = CacheBiblioteca()
+    generacion = cache.generacion(7)
+    cache.limpiar()
+    cache.guardar(7, CANCIONES, generacion)
+    assert cache.obtener(7) is None
+
+
+def test_pagina_no_guarda_un_resultado_viejo(app, monkeypatch):
+    consultar = biblioteca.consultar
+
+    def consultar_e_invalidar(id_us, *args, **kwargs):
+        resultado = consultar(id_us, *args, **kwargs)
+        biblioteca.cache.invalidar([id_us])  # commit concurrente de otra petición
+        return resultado
+
+    monkeypatch.setattr(biblioteca, "consultar", consultar_e_invalidar)
+    with app.app_context():
+        assert biblioteca.pagina(1) == ([], None)
+    assert biblioteca.cache.obtener(1) is None
+
+    monkeypatch.setattr(biblioteca, "consultar", consultar)
+    with app.app_context():
+        biblioteca.pagina(1)
+    assert biblioteca.cache.obtener(1) == ([], [])
+
+
+def test_usuario_borrado_no_se_sirve_de_la_cache(client):
+    respuesta = client.post("/api/usuarios", json={"nombre": "ana", "contrasena": "x"})
+    id_usuario = respuesta.get_json()[0]["id_usuario"]
+    assert client.get(f"/api/usuarios/{id_usuario}/biblioteca").status_code == 200
+    assert biblioteca.cache.obtener(id_usuario) is not None
+
+    assert client.delete(f"/api/usuarios/{id_usuario}").status_code == 200
+    assert client.get(f"/api/usuarios/{id_usuario}/biblioteca").status_code == 404
@@ -0,0 +1,46 @@
+# tests/test_cambios.py
+# Registro de cambios (/api/changes): también los contadores de los álbumes,
+# que se recalculan con un UPDATE de Core fuera del flush del ORM.
+from db import db
+from models import Cancion, Recopilacion, Usuario, Vinilo
+
+
+def cambios_desde(client, seq):
+    return [(c["tabla"], c["clave"], c["op"]) for c in client.get(f"/api/changes?since={seq}").get_json()["cambios"]]
+
+
+def ultimo_seq(client):
+    return client.get("/api/changes").get_json()["siguiente"]
+
+
+def test_contadores_registran_el_album(app, client):
+    with app.app_context():
+        db.session.add_all([
+            Usuario(id_usuario=1, nombre="ana", contrasena="x"),
+            Cancion(id_cancion=1, nombre="uno", tamano=1),
+            Recopilacion(id_recopilacion=1, nombre="lista", id_us=1, publica=True),
+            Vinilo(id_vinilo=1, nombre="lp"),
+        ])
+        db.session.commit()
+    seq = ultimo_seq(client)
+
+    assert client.post("/api/recopilacioncancion", json={"id_recopilacion": 1, "id_cancion": 1}).status_code == 201
+    assert cambios_desde(client, seq) == [("recopilacionCancion", "1:1", "I"), ("recopilacion", "1", "U")]
+    assert client.get("/api/recopilaciones/1").get_json()["num_canciones"] == 1
+
+    assert client.post("/api/vinilocancion", json={"id_vinilo": 1, "id_cancion": 1}).status_code == 201
+    seq = ultimo_seq(client)
+    # Cambia la duración de la canción: se recalculan los dos álbumes que la contienen
+    assert client.patch("/api/canciones/1", json={"duracion": "00:02:00"}).status_code == 200
+    assert sorted(cambios_desde(client, seq)) == [("cancion", "1", "U"), ("recopilacion", "1", "U"), ("vinilo", "1", "U")]
+
+
+def test_album_borrado_no_se_registra_como_modificado(app, client):
+    with app.app_context():
+        db.session.add_all([Cancion(id_cancion=1, nombre="uno", tamano=1), Vinilo(id_vinilo=1, nombre="lp")])
+        db.session.commit()
+    assert client.post("/api/vinilocancion", json={"id_vinilo": 1, "id_cancion": 1}).status_code == 201
+    seq = ultimo_seq(client)
+
+    assert client.delete("/api/vinilo/1").status_code == 200
+    assert sorted(cambios_desde(client, seq)) == [("vinilo", "1", "D"), ("viniloCancion", "1:1", "D")]
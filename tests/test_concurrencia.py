@@ -0,0 +1,120 @@
+# tests/test_concurrencia.py
+# Control de concurrencia optimista: columna version + ETag / If-Match.
+import threading
+
+from sqlalchemy import text
+
+import recursos
+from db import db
+from recursos import CONFLICTO
+
+
+def crear_usuario(client):
+    respuesta = client.post("/api/usuarios", json={"nombre": "ana", "contrasena": "x"})
+    assert respuesta.status_code == 201
+    return respuesta.get_json()[0]["id_usuario"]
+
+
+def test_dos_escritores_misma_version(app, client):
+    id_usuario = crear_usuario(client)
+    clientes = [app.test_client(), app.test_client()]
+    # Los dos leen la misma versión...
+    etags = [c.get(f"/api/usuarios/{id_usuario}").headers["ETag"] for c in clientes]
+    assert etags[0] == etags[1]
+
+    # ...y escriben a la vez con If-Match: solo uno puede ganar
+    barrera = threading.Barrier(len(clientes))
+    respuestas = [None] * len(clientes)
+
+    def escribir(i):
+        barrera.wait()
+        respuestas[i] = clientes[i].patch(
+            f"/api/usuarios/{id_usuario}", json={"nombre": f"escritor {i}"}, headers={"If-Match": etags[i]},
+        )
+
+    hilos = [threading.Thread(target=escribir, args=(i,)) for i in range(len(clientes))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(r.status_code for r in respuestas) == [200, 412]
+    ganadora = next(r for r in respuestas if r.status_code == 200)
+    perdedora = next(r for r in respuestas if r.status_code == 412)
+    assert perdedora.get_json()["error"] == CONFLICTO
+
+    actual = client.get(f"/api/usuarios/{id_usuario}")
+    assert actual.headers["ETag"] == ganadora.headers["ETag"] != etags[0]
+    assert actual.get_json()["nombre"] == ganadora.get_json()["nombre"]
+
+
+def test_if_match_de_version_anterior(client):
+    id_usuario = crear_usuario(client)
+    etag = client.get(f"/api/usuarios/{id_usuario}").headers["ETag"]
+    assert client.patch(f"/api/usuarios/{id_usuario}", json={"nombre": "b"}, headers={"If-Match": etag}).status_code == 200
+
+    respuesta = client.patch(f"/api/usuarios/{id_usuario}", json={"nombre": "c"}, headers={"If-Match": etag})
+    assert respuesta.status_code == 412
+    assert respuesta.get_json() == {"error": CONFLICTO, "version": 2}
+
+
+def test_escritura_entre_lectura_y_commit(app, client, monkeypatch):
+    # Otro proceso escribe después de comprobar If-Match y antes del commit:
+    # el UPDATE ... WHERE version = ? no afecta filas (StaleDataError) -> 412
+    id_usuario = crear_usuario(client)
+    etag = client.get(f"/api/usuarios/{id_usuario}").headers["ETag"]
+    comprobar = recursos.precondicion
+
+    def precondicion_y_escritura_ajena(obj):
+        conflicto = comprobar(obj)
+        with db.engines[None].begin() as conexion:
+            conexion.execute(
+                text("UPDATE usuario SET nombre = 'otro', version = version + 1 WHERE id_usuario = :id"),
+                {"id": id_usuario},
+            )
+        return conflicto
+
+    monkeypatch.setattr(recursos, "precondicion", precondicion_y_escritura_ajena)
+    respuesta = client.patch(f"/api/usuarios/{id_usuario}", json={"nombre": "mio"}, headers={"If-Match": etag})
+    assert respuesta.status_code == 412
+    assert respuesta.get_json() == {"error": CONFLICTO}
+
+    monkeypatch.undo()
+    actual = client.get(f"/api/usuarios/{id_usuario}")
+    assert actual.get_json()["nombre"] == "otro"
+    assert actual.headers["ETag"] == '"2"'
+
+
+def test_patch_directo_con_version_anterior(app, client):
+    # Camino rápido (UPDATE ... WHERE version = ? RETURNING) de pedido.estado
+    id_usuario = crear_usuario(client)
+    assert client.post("/api/items", json={"id": 1, "tipo_item": "vinilo", "cantidad": 1}).status_code == 201
+    pedido = client.post("/api/pedido", json={
+        "id_us": id_usuario, "id_item": 1, "fecha_pedido": "2024-01-01", "estado": "nuevo", "medio_pago": "tarjeta",
+    }).get_json()[0]
+    url = f"/api/pedido/{pedido['id_pedido']}"
+    etag = client.get(url).headers["ETag"]
+
+    assert client.patch(url, json={"estado": "pagado"}, headers={"If-Match": etag}).status_code == 200
+    respuesta = client.patch(url, json={"estado": "enviado"}, headers={"If-Match": etag})
+    assert respuesta.status_code == 412
+    assert respuesta.get_json() == {"error": CONFLICTO, "version": 2}
+
+
+def test_contadores_cambian_la_version(client):
+    # Agregar una canción cambia num_canciones/duracion_total del álbum: quien
+    # leyó el cuerpo anterior no puede escribir con su ETag
+    id_usuario = crear_usuario(client)
+    assert client.post("/api/canciones", json={"nombre": "uno", "duracion": "00:03:30", "tamano": 1}).status_code == 201
+    url = "/api/recopilaciones/1"
+    assert client.post("/api/recopilaciones", json={"nombre": "lista", "id_us": id_usuario, "publica": True}).status_code == 201
+    etag = client.get(url).headers["ETag"]
+
+    assert client.post("/api/recopilacioncancion", json={"id_recopilacion": 1, "id_cancion": 1}).status_code == 201
+    actual = client.get(url)
+    assert actual.get_json()["num_canciones"] == 1
+    assert actual.headers["ETag"] != etag
+
+    respuesta = client.patch(url, json={"nombre": "otra"}, headers={"If-Match": etag})
+    assert respuesta.status_code == 412
+    assert client.patch(url, json={"nombre": "otra"}, headers={"If-Match": actual.headers["ETag"]}).status_code == 200
@@ -0,0 +1,48 @@
+# tests/test_consultas.py
+# /api/usuarios/<id>/full carga sus relaciones con selectinload: el número de
+# consultas es fijo, no crece con los teléfonos, correos o pedidos del usuario.
+from datetime import date
+
+import pytest
+
+from db import db
+from models import Correo, Item, Pedido, Recopilacion, Telefono, Usuario, Valoracion
+
+CONSULTAS_FULL = 7  # usuario + teléfonos, correos, pedidos, sus valoraciones, valoraciones, recopilaciones
+
+
+def sembrar(app, id_usuario, n):
+    # Un usuario con n elementos en cada relación (y n valoraciones por pedido)
+    with app.app_context():
+        item = db.session.get(Item, 1) or Item(id=1, tipo_item="vinilo", cantidad=10)
+        usuario = Usuario(id_usuario=id_usuario, nombre=f"usuario {id_usuario}", contrasena="x")
+        db.session.add_all([item, usuario])
+        for i in range(n):
+            usuario.telefonos.append(Telefono(telefono=f"{id_usuario}-{i}"))
+            usuario.correos.append(Correo(correo=f"u{id_usuario}-{i}@example.com"))
+            usuario.recopilaciones.append(Recopilacion(nombre=f"lista {i}", publica=True))
+            pedido = Pedido(fecha_pedido=date(2024, 1, 1 + i % 28), estado="pagado", medio_pago="tarjeta", id_item=item.id)
+            usuario.pedidos.append(pedido)
+            for j in range(n):
+                pedido.valoraciones.append(Valoracion(usuario=usuario, descripcion=f"{i}-{j}", puntuacion=1 + j % 5))
+        db.session.commit()
+
+
+@pytest.mark.parametrize("n", [1, 5, 25])
+def test_usuario_full_consultas_fijas(app, client, contar_consultas, n):
+    sembrar(app, 1, n)
+    with contar_consultas() as consultas:
+        respuesta = client.get("/api/usuarios/1/full")
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()
+    assert len(datos["telefonos"]) == len(datos["correos"]) == len(datos["pedidos"]) == n
+    assert all(len(p["valoraciones"]) == n for p in datos["pedidos"])
+    assert len(datos["valoraciones"]) == n * n
+    assert len(consultas) == CONSULTAS_FULL, "\n".join(consultas)
+
+
+def test_usuario_full_inexistente(app, client, contar_consultas):
+    with contar_consultas() as consultas:
+        respuesta = client.get("/api/usuarios/99/full")
+    assert respuesta.status_code == 404
+    assert len(consultas) == 1
@@ -0,0 +1,15 @@
+# tests/test_estadisticas.py
+# /api/stats/pedidos: group_by=week agrupa por semana ISO 8601.
+def test_semanas_iso(client):
+    assert client.post("/api/usuarios", json={"nombre": "ana", "contrasena": "x"}).status_code == 201
+    assert client.post("/api/items", json={"tipo_item": "vinilo", "cantidad": 1}).status_code == 201
+    # 2021-01-03 es domingo de la semana 53 de 2020; 2024-12-30, lunes de la 1 de 2025
+    for fecha in ("2021-01-03", "2021-01-04", "2024-12-30", "2025-01-05"):
+        respuesta = client.post("/api/pedido", json={
+            "id_us": 1, "id_item": 1, "fecha_pedido": fecha, "estado": "pagado", "medio_pago": "tarjeta",
+        })
+        assert respuesta.status_code == 201
+
+    datos = client.get("/api/stats/pedidos?group_by=week").get_json()
+    assert datos["week"] == ["2020-W53", "2021-W01", "2025-W01"]
+    assert datos["pedidos"] == [1, 1, 2]
@@ -0,0 +1,53 @@
+# tests/test_idempotencia.py
+# Idempotency-Key en las altas: repetición de la respuesta y claves cuya vista
+# confirmó sus escrituras pero no llegó a guardar la respuesta.
+from sqlalchemy import text
+
+from db import db
+
+CLAVE = {"Idempotency-Key": "alta-1"}
+
+
+def contar_usuarios(app):
+    with app.app_context(), db.engines[None].connect() as conexion:
+        return conexion.execute(text("SELECT count(*) FROM usuario")).scalar()
+
+
+def test_reintento_repite_la_respuesta(app, client):
+    primera = client.post("/api/usuarios", json={"nombre": "ana", "contrasena": "x"}, headers=CLAVE)
+    segunda = client.post("/api/usuarios", json={"nombre": "ana", "contrasena": "x"}, headers=CLAVE)
+    assert primera.status_code == segunda.status_code == 201
+    assert segunda.get_json() == primera.get_json()
+    assert segunda.headers["Idempotent-Replayed"] == "true"
+    assert contar_usuarios(app) == 1
+
+    otra = client.post("/api/usuarios", json={"nombre": "beto", "contrasena": "x"}, headers=CLAVE)
+    assert otra.status_code == 422
+
+
+def test_confirmada_sin_respuesta_no_se_reclama(app, client):
+    app.config["IDEMPOTENCIA_ABANDONO"] = 0
+    assert client.post("/api/usuarios", json={"nombre": "ana", "contrasena": "x"}, headers=CLAVE).status_code == 201
+    with app.app_context(), db.engines[None].begin() as conexion:
+        fila = conexion.execute(text("SELECT estado, confirmada FROM idempotencia")).one()
+        assert tuple(fila) == (201, 1)
+        # El proceso murió entre el commit de la vista y el guardado de la respuesta
+        conexion.execute(text("UPDATE idempotencia SET estado = NULL, tipo = NULL, cuerpo = NULL"))
+
+    app.config["IDEMPOTENCIA_ESPERA"] = 0
+    respuesta = client.post("/api/usuarios", json={"nombre": "ana", "contrasena": "x"}, headers=CLAVE)
+    assert respuesta.status_code == 409
+    assert "Retry-After" not in respuesta.headers
+    assert contar_usuarios(app) == 1
+
+
+def test_sin_escrituras_no_se_confirma(app, client):
+    # Un 415 no escribe nada: la respuesta se guarda pero la clave no se confirma
+    assert client.post("/api/usuarios", data="x", headers=CLAVE).status_code == 415
+    with app.app_context(), db.engines[None].connect() as conexion:
+        assert conexion.execute(text("SELECT confirmada FROM idempotencia")).scalar() == 0
+
+
+def test_sin_purga_periodica_por_defecto(app):
+    assert app.config["IDEMPOTENCIA_INTERVALO"] == 0
+    assert "idempotencia" not in app.extensions.get("tareas", {})
@@ -0,0 +1,29 @@
+# tests/test_limites.py
+# Admisión de escrituras: LIMITES_ESCRITURAS y su cola son topes de toda la
+# aplicación, repartidos entre los workers de gunicorn.
+import limites
+
+
+def test_repartir_escrituras(app):
+    assert app.extensions["limites"]["admision"] is None  # sin tope por defecto
+
+    app.config.update(LIMITES_ESCRITURAS=8, LIMITES_COLA_ESCRITURAS=16)
+    limites.repartir_escrituras(app, 4)
+    admision = app.extensions["limites"]["admision"]
+    assert (admision.maximo, admision.cola) == (2, 4)
+
+    # Cada worker admite al menos una escritura
+    limites.repartir_escrituras(app, 16)
+    assert app.extensions["limites"]["admision"].maximo == 1
+
+
+def test_admision_rechaza_sobre_el_tope(app, client):
+    app.config.update(LIMITES_ESCRITURAS=1, LIMITES_COLA_ESCRITURAS=0)
+    limites.repartir_escrituras(app, 1)
+    admision = app.extensions["limites"]["admision"]
+    assert admision.entrar()  # otra escritura en curso
+    respuesta = client.post("/api/proveedores", json={"nombre": "prov"})
+    assert respuesta.status_code == 503
+    assert "Retry-After" in respuesta.headers
+    admision.salir()
+    assert client.post("/api/proveedores", json={"nombre": "prov"}).status_code == 201
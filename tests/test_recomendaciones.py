@@ -0,0 +1,34 @@
+# tests/test_recomendaciones.py
+# Índice de canciones similares con varios procesos: cada uno solo aplica sus
+# propios commits, así que con RECOMENDACIONES_MAX_EDAD se reconstruye al caducar.
+from sqlalchemy import text
+
+import recomendaciones
+from db import db
+from models import Cancion, Recopilacion, RecopilacionCancion, Usuario
+
+
+def similares(client, id_cancion):
+    return [s["id_cancion"] for s in client.get(f"/api/canciones/{id_cancion}/similares").get_json()["similares"]]
+
+
+def test_reconstruye_al_caducar(app, client):
+    app.config["RECOMENDACIONES_MAX_EDAD"] = 60
+    with app.app_context():
+        db.session.add_all([
+            Usuario(id_usuario=1, nombre="ana", contrasena="x"),
+            *(Cancion(id_cancion=i, nombre=str(i), tamano=1) for i in (1, 2, 3)),
+            Recopilacion(id_recopilacion=1, nombre="a", id_us=1, publica=True),
+            RecopilacionCancion(id_recopilacion=1, id_cancion=1),
+            RecopilacionCancion(id_recopilacion=1, id_cancion=2),
+        ])
+        db.session.commit()
+    assert similares(client, 1) == [2]
+
+    # Commit de otro proceso: no pasa por los eventos de la sesión de este
+    with app.app_context(), db.engines[None].begin() as conexion:
+        conexion.execute(text('INSERT INTO "recopilacionCancion" VALUES (1, 3)'))
+    assert similares(client, 1) == [2]  # todavía vigente
+
+    recomendaciones.indice.construido_en -= 61
+    assert sorted(similares(client, 1)) == [2, 3]
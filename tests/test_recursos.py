@@ -0,0 +1,180 @@
+# tests/test_recursos.py
+# Paridad de las rutas generadas por recursos.RECURSOS con las respuestas de
+# los handlers escritos a mano: estado y cuerpo de alta, listado, consulta,
+# actualización y baja de cada recurso, y las peculiaridades que se conservan.
+import pytest
+
+CANCION_1 = {"duracion": "00:03:30", "id_cancion": 1, "nombre": "uno", "tamano": 4.5}
+CON_CANCION = {"num_canciones": 1, "duracion_total": "00:03:30"}  # álbum con CANCION_1
+ALBUMES = {"discomp3", "vinilo", "recopilaciones"}
+
+# (recurso, datos del alta, cuerpo esperado) en orden de dependencias
+ALTAS = [
+    ("usuarios", {"nombre": "ana", "contrasena": "x"}, {"contrasena": "x", "id_usuario": 1, "nombre": "ana"}),
+    ("usuarios", {"nombre": "beto", "contrasena": "y"}, {"contrasena": "y", "id_usuario": 2, "nombre": "beto"}),
+    ("items", {"tipo_item": "vinilo", "cantidad": 3}, {"cantidad": 3, "id": 1, "tipo_item": "vinilo"}),
+    ("canciones", {"nombre": "uno", "duracion": "00:03:30", "tamano": 4.5}, CANCION_1),
+    ("canciones", {"nombre": "dos", "duracion": "00:01:00", "tamano": 1},
+     {"duracion": "00:01:00", "id_cancion": 2, "nombre": "dos", "tamano": 1.0}),
+    ("proveedores", {"nombre": "prov"}, {"id": 1, "nombre": "prov"}),
+    ("proveedores", {"nombre": "otro"}, {"id": 2, "nombre": "otro"}),
+    ("telefonos", {"telefono": "555-1", "id_us": 1}, {"id_us": 1, "telefono": "555-1"}),
+    ("correos", {"correo": "a@example.com", "id_us": 1}, {"correo": "a@example.com", "id_us": 1}),
+    ("pedido", {"id_us": 1, "fecha_pedido": "2024-02-03", "estado": "nuevo", "medio_pago": "tarjeta", "id_item": 1},
+     {"estado": "nuevo", "fecha_pedido": "Sat, 03 Feb 2024 00:00:00 GMT", "id_item": 1, "id_pedido": 1,
+      "id_us": 1, "medio_pago": "tarjeta"}),
+    ("valoraciones", {"id_pedido": 1, "id_us": 1, "descripcion": "bien", "puntuacion": 4},
+     {"descripcion": "bien", "id_pedido": 1, "id_us": 1, "id_val": 1, "puntuacion": 4}),
+    ("discomp3", {"nombre": "disco", "duracion": "00:40:00", "tamano": 80.5, "precio": 9.5, "id_item": 1},
+     {"duracion": "00:40:00", "duracion_total": "00:00:00", "id_discoMp3": 1, "id_item": 1, "nombre": "disco",
+      "num_canciones": 0, "precio": 9.5, "tamano": 80.5}),
+    ("vinilo", {"nombre": "lp", "artista": "art", "anio_salida": 1999, "precio_unitario": 20.0,
+                "id_cancion": 1, "id_proveedor": 1, "id_item": 1},
+     {"anio_salida": 1999, "artista": "art", "duracion_total": "00:00:00", "id_cancion": 1, "id_proveedor": 1,
+      "id_vinilo": 1, "nombre": "lp", "num_canciones": 0, "precio_unitario": 20.0}),
+    ("recopilaciones", {"nombre": "lista", "id_us": 1, "publica": True},
+     {"duracion_total": "00:00:00", "id_recopilacion": 1, "id_us": 1, "nombre": "lista", "num_canciones": 0,
+      "publica": True}),
+    ("correos_proveedor", {"correo": "p@example.com", "id_proveedor": 1}, {"correo": "p@example.com", "id_proveedor": 1}),
+    ("telefonos_proveedor", {"telefono": "555-2", "id_proveedor": 1}, {"id_proveedor": 1, "telefono": "555-2"}),
+    ("discomp3cancion", {"id_discoMp3": 1, "id_cancion": 1}, {"id_cancion": 1, "id_discoMp3": 1}),
+    ("vinilocancion", {"id_vinilo": 1, "id_cancion": 1}, {"id_cancion": 1, "id_vinilo": 1}),
+    ("recopilacioncancion", {"id_recopilacion": 1, "id_cancion": 1}, {"id_cancion": 1, "id_recopilacion": 1}),
+]
+
+# recurso -> (ruta del registro 1, cambio, campos esperados tras el cambio)
+REGISTROS = {
+    "usuarios": ("/api/usuarios/1", {"nombre": "ana maría"}, {"nombre": "ana maría"}),
+    "items": ("/api/items/1", {"cantidad": 7}, {"cantidad": 7}),
+    "canciones": ("/api/canciones/1", {"nombre": "uno bis"}, {"nombre": "uno bis"}),
+    "proveedores": ("/api/proveedores/1", {"nombre": "prov sa"}, {"nombre": "prov sa"}),
+    "telefonos": ("/api/telefonos/555-1", {"id_us": 2}, {"id_us": 2}),
+    "correos": ("/api/correos/a@example.com", {"id_us": 2}, {"id_us": 2}),
+    "pedido": ("/api/pedido/1", {"estado": "pagado"}, {"estado": "pagado"}),
+    "valoraciones": ("/api/valoraciones/1", {"puntuacion": 5}, {"puntuacion": 5}),
+    "discomp3": ("/api/discomp3/1", {"precio": 7.5}, {"precio": 7.5}),
+    "vinilo": ("/api/vinilo/1", {"artista": "otro"}, {"artista": "otro"}),
+    "recopilaciones": ("/api/recopilaciones/1", {"publica": False}, {"publica": False}),
+    "correos_proveedor": ("/api/correos_proveedor/p@example.com", {"id_proveedor": 2}, {"id_proveedor": 2}),
+    "telefonos_proveedor": ("/api/telefonos_proveedor/555-2", {"id_proveedor": 2}, {"id_proveedor": 2}),
+}
+
+ASOCIACIONES = {
+    "discomp3cancion": "/api/discomp3cancion/1/1",
+    "vinilocancion": "/api/vinilocancion/1/1",
+    "recopilacioncancion": "/api/recopilacioncancion/1/1",
+}
+
+# Recopilación se actualizaba con PUT (ahora también acepta PATCH)
+METODO_ACTUALIZAR = {"recopilaciones": "put"}
+
+# Listados en orden descendente de clave (como los handlers originales)
+ORDEN_DESC = {"usuarios", "canciones"}
+
+
+def version(recurso):
+    # Agregar CANCION_1 a un álbum cambia sus contadores y sube su versión
+    return 2 if recurso in ALBUMES else 1
+
+
+def esperado(recurso):
+    # Registros del recurso tras sembrar ALTAS (los álbumes ya tienen CANCION_1)
+    filas = [cuerpo for nombre, _, cuerpo in ALTAS if nombre == recurso]
+    if recurso in ALBUMES:
+        filas = [{**f, **CON_CANCION} for f in filas]
+    return filas[::-1] if recurso in ORDEN_DESC else filas
+
+
+@pytest.fixture
+def sembrado(client):
+    for recurso, datos, cuerpo in ALTAS:
+        respuesta = client.post(f"/api/{recurso}", json=datos)
+        assert respuesta.status_code == 201, (recurso, respuesta.get_json())
+        assert respuesta.get_json() == [cuerpo], recurso
+    return client
+
+
+@pytest.mark.parametrize("recurso", sorted({nombre for nombre, _, _ in ALTAS}))
+def test_listar(sembrado, recurso):
+    respuesta = sembrado.get(f"/api/{recurso}")
+    assert respuesta.status_code == 200
+    assert respuesta.get_json() == esperado(recurso)
+
+
+@pytest.mark.parametrize("recurso", sorted(REGISTROS))
+def test_obtener(sembrado, recurso):
+    ruta = REGISTROS[recurso][0]
+    respuesta = sembrado.get(ruta)
+    assert respuesta.status_code == 200
+    assert respuesta.get_json() == esperado(recurso)[-1 if recurso in ORDEN_DESC else 0]
+    assert respuesta.headers["ETag"] == f'"{version(recurso)}"'
+
+
+@pytest.mark.parametrize("recurso", sorted(REGISTROS))
+def test_actualizar(sembrado, recurso):
+    ruta, cambio, campos = REGISTROS[recurso]
+    antes = sembrado.get(ruta).get_json()
+    respuesta = getattr(sembrado, METODO_ACTUALIZAR.get(recurso, "patch"))(ruta, json=cambio)
+    assert respuesta.status_code == 200
+    assert respuesta.get_json() == {**antes, **campos}
+    assert respuesta.headers["ETag"] == f'"{version(recurso) + 1}"'
+    assert sembrado.get(ruta).get_json() == {**antes, **campos}
+
+
+@pytest.mark.parametrize("recurso", sorted(REGISTROS))
+def test_eliminar(sembrado, recurso):
+    ruta = REGISTROS[recurso][0]
+    respuesta = sembrado.delete(ruta)
+    assert respuesta.status_code == 200
+    if recurso == "recopilaciones":
+        assert respuesta.get_json() == {"message": "Recopilación 1 eliminada"}
+    else:
+        assert respuesta.get_json() == {"ok": True}
+    assert sembrado.get(ruta).status_code == 404
+
+
+@pytest.mark.parametrize("recurso", sorted(ASOCIACIONES))
+def test_eliminar_asociacion(sembrado, recurso):
+    respuesta = sembrado.delete(ASOCIACIONES[recurso])
+    assert respuesta.status_code == 200
+    assert respuesta.get_json() == {"ok": True}
+    assert sembrado.get(f"/api/{recurso}").get_json() == []
+    assert sembrado.delete(ASOCIACIONES[recurso]).status_code == 404
+
+
+@pytest.mark.parametrize("recurso", sorted(REGISTROS))
+def test_no_encontrado(client, recurso):
+    ruta = REGISTROS[recurso][0].rsplit("/", 1)[0] + "/999"
+    for metodo in ("get", METODO_ACTUALIZAR.get(recurso, "patch"), "delete"):
+        respuesta = getattr(client, metodo)(ruta, json={})
+        assert respuesta.status_code == 404
+        if recurso == "recopilaciones":
+            assert respuesta.get_json() == {"error": "Recopilación no encontrada"}
+        else:
+            assert respuesta.get_json() is None  # página 404 estándar de Flask
+
+
+def test_put_solo_en_recopilaciones(sembrado):
+    respuesta = sembrado.put("/api/recopilaciones/1", json={"nombre": "renombrada"})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()["nombre"] == "renombrada"
+    assert sembrado.put("/api/usuarios/1", json={"nombre": "x"}).status_code == 405
+
+
+def test_errores_de_alta(client):
+    assert client.post("/api/telefonos", data="x").status_code == 415
+    respuesta = client.post("/api/telefonos", json=[])
+    assert respuesta.status_code == 400
+    assert respuesta.get_json() == {"error": "Debe enviar al menos un registro JSON"}
+    respuesta = client.post("/api/telefonos", json={"telefono": "555-9"})
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()["error"] == "El registro #1: el campo 'id_us' es requerido"
+
+
+def test_no_encontrado_en_patch_directo(client):
+    # pedido.estado se actualiza con un UPDATE directo; id_us pasa por el ORM
+    rapido = client.patch("/api/pedido/999", json={"estado": "pagado"})
+    orm = client.patch("/api/pedido/999", json={"id_us": 1})
+    assert rapido.status_code == orm.status_code == 404
+    assert rapido.get_data() == orm.get_data()
+    assert rapido.content_type == orm.content_type
@@ -0,0 +1,106 @@
+# tests/test_replica.py
+# Réplica de lectura (LECTURA_DATABASE_URI): refresco atómico del archivo y
+# caché de bibliotecas calculada siempre en la base principal.
+import pytest
+from sqlalchemy import text
+
+from db import BIND_LECTURA, db, refrescar_replica
+from models import Cancion, DiscoMp3, DiscoMp3Cancion, Item, Pedido, Usuario
+
+
+@pytest.fixture
+def app_replica(tmp_path, monkeypatch, request):
+    monkeypatch.setenv("FLASK_LECTURA_DATABASE_URI", f"sqlite:///{tmp_path / 'lectura.db'}")
+    app = request.getfixturevalue("app")
+    with app.app_context():
+        db.session.add_all([
+            Usuario(id_usuario=1, nombre="ana", contrasena="x"),
+            Item(id=1, tipo_item="discoMp3", cantidad=1),
+            Item(id=2, tipo_item="discoMp3", cantidad=1),
+            Cancion(id_cancion=1, nombre="uno", tamano=1),
+            Cancion(id_cancion=2, nombre="dos", tamano=1),
+            DiscoMp3(id_discoMp3=1, nombre="a", tamano=1, id_item=1),
+            DiscoMp3(id_discoMp3=2, nombre="b", tamano=1, id_item=2),
+            DiscoMp3Cancion(id_discoMp3=1, id_cancion=1),
+            DiscoMp3Cancion(id_discoMp3=2, id_cancion=2),
+            Pedido(id_pedido=1, id_us=1, estado="pagado", id_item=1),
+        ])
+        db.session.commit()
+        refrescar_replica()
+    return app
+
+
+def contar(motor, tabla):
+    with motor.connect() as conexion:
+        return conexion.execute(text(f'SELECT count(*) FROM "{tabla}"')).scalar()
+
+
+def test_refrescar_sustituye_el_archivo(app_replica):
+    with app_replica.app_context():
+        motor = db.engines[BIND_LECTURA]
+        abierta = motor.connect()  # lectura en curso durante el refresco
+        assert abierta.execute(text("SELECT count(*) FROM pedido")).scalar() == 1
+
+        db.session.add(Pedido(id_pedido=2, id_us=1, estado="pagado", id_item=2))
+        db.session.commit()
+        assert contar(motor, "pedido") == 1  # la réplica va por detrás
+        refrescar_replica()
+
+        # La lectura en curso sigue con su archivo; las nuevas ven la copia nueva
+        assert abierta.execute(text("SELECT count(*) FROM pedido")).scalar() == 1
+        abierta.close()
+        assert contar(motor, "pedido") == 2
+        assert motor.connect().exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+
+
+def test_conexiones_de_otro_proceso_ven_la_copia_nueva(app_replica):
+    # Otro proceso refresca la réplica: el pool de este no se ha vaciado, pero
+    # sus conexiones al archivo anterior se descartan al sacarlas del pool
+    with app_replica.app_context():
+        motor = db.engines[BIND_LECTURA]
+        assert contar(motor, "pedido") == 1
+        db.session.add(Pedido(id_pedido=2, id_us=1, estado="pagado", id_item=2))
+        db.session.commit()
+        dispose = motor.dispose
+        motor.dispose = lambda *a, **k: None
+        try:
+            refrescar_replica()
+        finally:
+            motor.dispose = dispose
+        assert contar(motor, "pedido") == 2
+
+
+def test_biblioteca_en_cache_se_calcula_en_la_principal(app_replica, client):
+    assert [c["id_cancion"] for c in client.get("/api/usuarios/1/biblioteca").get_json()["canciones"]] == [1]
+
+    # Nuevo pedido: invalida la caché, pero la réplica todavía no lo tiene
+    respuesta = client.post("/api/pedido", json={
+        "id_us": 1, "id_item": 2, "fecha_pedido": "2024-01-01", "estado": "pagado", "medio_pago": "tarjeta",
+    })
+    assert respuesta.status_code == 201
+    with app_replica.app_context():
+        assert contar(db.engines[BIND_LECTURA], "pedido") == 1
+
+    canciones = client.get("/api/usuarios/1/biblioteca").get_json()["canciones"]
+    assert [c["id_cancion"] for c in canciones] == [1, 2]
+
+
+def test_similares_se_construyen_en_la_principal(app_replica, client):
+    from models import Recopilacion, RecopilacionCancion
+
+    # Recopilaciones escritas después del último refresco: la réplica no las tiene
+    with app_replica.app_context():
+        db.session.add_all([
+            Recopilacion(id_recopilacion=1, nombre="r1", id_us=1),
+            Recopilacion(id_recopilacion=2, nombre="r2", id_us=1),
+            RecopilacionCancion(id_recopilacion=1, id_cancion=1),
+            RecopilacionCancion(id_recopilacion=1, id_cancion=2),
+            RecopilacionCancion(id_recopilacion=2, id_cancion=1),
+            RecopilacionCancion(id_recopilacion=2, id_cancion=2),
+        ])
+        db.session.commit()
+        assert contar(db.engines[BIND_LECTURA], "recopilacionCancion") == 0
+
+    respuesta = client.get("/api/canciones/1/similares")
+    assert respuesta.status_code == 200
+    assert 2 in [c["id_cancion"] for c in respuesta.get_json()["similares"]]
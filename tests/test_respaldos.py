@@ -0,0 +1,46 @@
+# tests/test_respaldos.py
+# db.copiar_base: copia por tramos sin WAL, que se abandona y reintenta (nunca
+# de una pasada) si otra conexión no deja de escribir en el origen.
+import sqlite3
+
+import pytest
+
+import db as modulo_db
+from db import CopiaReiniciada, copiar_base
+
+
+@pytest.fixture
+def origen(tmp_path):
+    ruta = str(tmp_path / "origen.db")
+    conexion = sqlite3.connect(ruta)
+    conexion.execute("CREATE TABLE t (x TEXT)")
+    conexion.executemany("INSERT INTO t VALUES (?)", [("x" * 1000,) for _ in range(100)])
+    conexion.commit()
+    conexion.close()
+    return ruta
+
+
+def test_copia_por_tramos(origen, tmp_path):
+    total, reinicios = copiar_base(origen, str(tmp_path / "copia.db"), paginas=4, pausa=0.001)
+    assert reinicios == 0
+    copia = sqlite3.connect(tmp_path / "copia.db")
+    assert copia.execute("SELECT count(*) FROM t").fetchone()[0] == 100
+    assert copia.execute("PRAGMA page_count").fetchone()[0] == total
+
+
+def test_escrituras_continuas_agotan_los_intentos(origen, tmp_path, monkeypatch):
+    # Cada pausa entre tramos escribe en el origen: la copia se reinicia siempre
+    escritor = sqlite3.connect(origen, isolation_level=None)
+    esperas = []
+
+    def dormir(segundos):
+        if segundos == 0.001:
+            escritor.execute("INSERT INTO t VALUES ('y')")
+        else:
+            esperas.append(segundos)
+
+    monkeypatch.setattr(modulo_db.time, "sleep", dormir)
+    with pytest.raises(CopiaReiniciada):
+        copiar_base(origen, str(tmp_path / "copia.db"), paginas=4, pausa=0.001, max_reinicios=2, intentos=3, espera=0.5)
+    assert esperas == [0.5, 1.0]  # espera entre intentos, duplicada
+    escritor.close()